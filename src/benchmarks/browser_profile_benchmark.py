@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.fixture_site import FixtureSite
+from scrapper.BrowserProfile import BrowserProfile
+from scrapper.PageReadiness import wait_for_elements
+
+# Define ANSI escape codes for colors
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+
+def network_usage(performance_log):
+    """Bytes received, requests sent and requests blocked, read from the DevTools events of the performance log."""
+    usage = {"bytes": 0, "requests": 0, "blocked": 0}
+    for entry in performance_log:
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.requestWillBeSent":
+            usage["requests"] += 1
+        elif message["method"] == "Network.loadingFinished":
+            usage["bytes"] += message["params"].get("encodedDataLength", 0)
+        elif message["method"] == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            usage["blocked"] += 1
+    return usage
+
+
+def measure_profile(profile_name, driver_path, pages, runs, full_headless):
+    """Loads each page runs times with the profile, returns the time and the network usage of each load."""
+    browser_profile = BrowserProfile(profile_name)
+    options = browser_profile.options()
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if profile_name == BrowserProfile.FULL and full_headless:
+        options.add_argument("--headless=new")
+    driver = browser_profile.create_driver(driver_path, options)
+    loads = []
+    try:
+        for _ in range(runs):
+            for url, css_selector in pages:
+                # the log is drained by each read, what is left belongs to the previous page
+                driver.get_log("performance")
+                start = time.perf_counter()
+                driver.get(url)
+                ready = wait_for_elements(driver, css_selector)
+                seconds = time.perf_counter() - start
+                load = network_usage(driver.get_log("performance"))
+                load.update({"url": url, "seconds": seconds, "ready": ready})
+                loads.append(load)
+    finally:
+        driver.quit()
+    return loads
+
+
+def summarize(profile_name, loads):
+    return {
+        "profile": profile_name,
+        "pages": len(loads),
+        "not_ready": sum(not load["ready"] for load in loads),
+        "median_seconds_per_page": round(statistics.median(load["seconds"] for load in loads), 4),
+        "kilobytes_per_page": round(statistics.mean(load["bytes"] for load in loads) / 1024, 1),
+        "requests_per_page": round(statistics.mean(load["requests"] for load in loads), 1),
+        "blocked_per_page": round(statistics.mean(load["blocked"] for load in loads), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the time per page and the bytes transferred by the full and the lean browser profiles.")
+    parser.add_argument("--page", nargs=2, action="append", default=[], metavar=("URL", "SELECTOR"),
+                        help="Page to load and the CSS selector of the element the scrapper waits for on it. Repeat for several pages. Without --page, a local fixture site with images, fonts, stylesheets and telemetry is used")
+    parser.add_argument("--runs", type=int, default=3, help="Loads of each page per profile (default: 3)")
+    parser.add_argument("--full-headless", action="store_true", help="Run the full profile headless too, on machines without a display")
+    parser.add_argument("--json", help="Also write the measures to this JSON file")
+    args = parser.parse_args()
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    driver_path = ChromeDriverManager().install()
+    fixture_site = None
+    work_dir = None
+    if args.page:
+        pages = [tuple(page) for page in args.page]
+    else:
+        work_dir = tempfile.mkdtemp(prefix="trainforcert-browser-profile-")
+        fixture_site = FixtureSite(work_dir, learning_paths=3, modules=1, units=1, assets=True)
+        fixture_site.generate()
+        root_url = fixture_site.serve().rsplit("/", 1)[0]
+        pages = [(f"{root_url}/{path}", css_selector) for path, css_selector in fixture_site.sample_pages()]
+
+    try:
+        summaries = [summarize(profile_name, measure_profile(profile_name, driver_path, pages, args.runs, args.full_headless))
+                     for profile_name in [BrowserProfile.FULL, BrowserProfile.LEAN]]
+    finally:
+        if fixture_site is not None:
+            fixture_site.shutdown()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'profile':<10}{'pages':>7}{'s/page':>10}{'KB/page':>10}{'requests':>10}{'blocked':>9}")
+    for summary in summaries:
+        color = RED if summary["not_ready"] else GREEN
+        print(f"{color}{summary['profile']:<10}{summary['pages']:>7}{summary['median_seconds_per_page']:>10.3f}{summary['kilobytes_per_page']:>10.1f}"
+              f"{summary['requests_per_page']:>10.1f}{summary['blocked_per_page']:>9.1f}{RESET}")
+    full, lean = summaries
+    if full["median_seconds_per_page"] and full["kilobytes_per_page"]:
+        print(f"lean profile: {1 - lean['median_seconds_per_page'] / full['median_seconds_per_page']:.0%} less time per page, "
+              f"{1 - lean['kilobytes_per_page'] / full['kilobytes_per_page']:.0%} fewer bytes per page")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(summaries, file, indent=4)
+    if any(summary["not_ready"] for summary in summaries):
+        print(f"{RED}Some pages never showed the element the scrapper waits for.{RESET}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import re
+import json
+import time
+import threading
+from collections import deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+UNIT_PATTERN = re.compile(r'<unit id="(\d+)">\s*(.*?)\s*</unit>', re.DOTALL)
+CHARACTERS_PER_TOKEN = 4
+
+
+class FakeOpenAIServer:
+    """
+    An Azure OpenAI compatible chat completions endpoint answering from the request itself, without a model.
+    Cleaning requests get their content back, question requests get one question per unit, packed requests keep their unit tags.
+    Each response waits latency_seconds plus seconds_per_token for every completion token. Over requests_per_minute,
+    requests are refused with a 429 and a Retry-After, as Azure OpenAI does when a deployment runs out of quota.
+    Batch jobs are served by the files and batches endpoints, their requests answered one after the other in a background thread,
+    without rate limit. With batch_fail_every, every batch_fail_every-th request of a job fails and is left out of the output file.
+    """
+    def __init__(self, latency_seconds=0.05, seconds_per_token=0.0, requests_per_minute=0, batch_fail_every=0):
+        self.latency_seconds = latency_seconds
+        self.seconds_per_token = seconds_per_token
+        self.requests_per_minute = requests_per_minute
+        self.batch_fail_every = batch_fail_every
+        self._lock = threading.Lock()
+        self._request_times = deque()
+        self._files = {}
+        self._batches = {}
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0, "max_in_flight": 0, "batch_jobs": 0, "batch_requests": 0}
+            self._in_flight = 0
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def acquire_rate(self):
+        """Records a request, returns the seconds to wait before retrying when it is over the rate limit, None otherwise."""
+        with self._lock:
+            if self.requests_per_minute > 0:
+                now = time.monotonic()
+                while self._request_times and self._request_times[0] <= now - 60:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.requests_per_minute:
+                    self.stats["rate_limited"] += 1
+                    return self._request_times[0] + 60 - now
+                self._request_times.append(now)
+            self.stats["requests"] += 1
+            return None
+
+    def complete(self, body):
+        content = body["messages"][-1]["content"]
+        prompt_text = "".join(message["content"] for message in body["messages"])
+        if "response_format" in body:
+            output = json.dumps(FakeOpenAIServer._questions(content, body["response_format"]))
+        elif UNIT_PATTERN.search(content):
+            output = "\n".join(f'<unit id="{unit_id}">\n{text}\n</unit>' for unit_id, text in UNIT_PATTERN.findall(content))
+        else:
+            output = content
+        usage = {"prompt_tokens": len(prompt_text) // CHARACTERS_PER_TOKEN + 1, "completion_tokens": len(output) // CHARACTERS_PER_TOKEN + 1}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self._lock:
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+            # requests answered at the same time, to check the concurrency limits of the clients
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        try:
+            time.sleep(self.latency_seconds + self.seconds_per_token * usage["completion_tokens"])
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return {
+            "id": f"chatcmpl-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": output}}],
+            "usage": usage,
+        }
+
+    def create_file(self, filename, purpose, content):
+        with self._lock:
+            file_id = f"file-{len(self._files) + 1}"
+            self._files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def file_content(self, file_id):
+        with self._lock:
+            return self._files.get(file_id)
+
+    def create_batch(self, body):
+        """Starts the batch job of the input file of body, returns the batch object, None when the input file does not exist."""
+        input_content = self.file_content(body["input_file_id"])
+        if input_content is None:
+            return None
+        lines = [json.loads(line) for line in input_content.decode("utf-8").splitlines() if line.strip()]
+        with self._lock:
+            batch_id = f"batch-{len(self._batches) + 1}"
+            batch = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"],
+                "completion_window": body["completion_window"],
+                "status": "in_progress",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            }
+            self._batches[batch_id] = batch
+            self.stats["batch_jobs"] += 1
+        threading.Thread(target=self._run_batch, args=(batch_id, lines), daemon=True).start()
+        return self.batch(batch_id)
+
+    def batch(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return json.loads(json.dumps(batch)) if batch is not None else None
+
+    def _run_batch(self, batch_id, lines):
+        output_lines = []
+        error_lines = []
+        for i, line in enumerate(lines, start=1):
+            if self.batch_fail_every and i % self.batch_fail_every == 0:
+                error = {"code": "server_error", "message": "The fake endpoint failed this request."}
+                error_lines.append({"id": f"batch-req-{i}", "custom_id": line["custom_id"], "response": {"status_code": 500, "body": {"error": error}}, "error": error})
+                counter = "failed"
+            else:
+                with self._lock:
+                    self.stats["requests"] += 1
+                    self.stats["batch_requests"] += 1
+                body = self.complete(line["body"])
+                output_lines.append({"id": f"batch-req-{i}", "custom_id": line["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+                counter = "completed"
+            with self._lock:
+                self._batches[batch_id]["request_counts"][counter] += 1
+        output_file = self.create_file(f"{batch_id}_output.jsonl", "batch_output", "".join(json.dumps(line) + "\n" for line in output_lines).encode("utf-8"))
+        error_file = self.create_file(f"{batch_id}_error.jsonl", "batch_output", "".join(json.dumps(line) + "\n" for line in error_lines).encode("utf-8")) if error_lines else None
+        with self._lock:
+            batch = self._batches[batch_id]
+            batch["output_file_id"] = output_file["id"]
+            batch["error_file_id"] = error_file["id"] if error_file else None
+            batch["status"] = "completed"
+
+    @staticmethod
+    def _questions(content, response_format):
+        def question(text):
+            words = text.split()
+            return {
+                "question": f"Which statement about {' '.join(words[:12])} is correct?",
+                "answers": [" ".join(words[12:24]) or "a", " ".join(words[24:36]) or "b", " ".join(words[36:48]) or "c"],
+                "correct_answer": " ".join(words[12:24]) or "a",
+                "explanation": " ".join(words[:30]),
+            }
+        # PackedUnitQuestions has a units property, Questions a questions property
+        if "units" in json.dumps(response_format.get("json_schema", {}).get("schema", {}).get("properties", {})):
+            return {"units": [{"unit_id": unit_id, "questions": [question(text)]} for unit_id, text in UNIT_PATTERN.findall(content)]}
+        return {"questions": [question(content)]}
+
+    def serve(self, port=0):
+        """Serves the endpoint from a background thread on 127.0.0.1, on a free port by default."""
+        server = self
+
+        class Handler(FakeOpenAIRequestHandler):
+            fake_server = server
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.endpoint
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class FakeOpenAIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake_server = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_not_found(self):
+        self._send_json(404, {"error": {"code": "NotFound", "message": f"{self.path} is not served by the fake endpoint"}})
+
+    def _upload(self, body):
+        # files.create sends the batch file as multipart/form-data, the email parser reads its parts
+        message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        file_part = fields["file"]
+        return self.fake_server.create_file(file_part.get_filename(), fields["purpose"].get_content().strip(), file_part.get_payload(decode=True))
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.startswith("/openai/batches/"):
+            batch = self.fake_server.batch(path.rsplit("/", 1)[1])
+            if batch is not None:
+                self._send_json(200, batch)
+                return
+        elif path.startswith("/openai/files/") and path.endswith("/content"):
+            content = self.fake_server.file_content(path.split("/")[-2])
+            if content is not None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+        self._send_not_found()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/openai/files":
+            self._send_json(200, self._upload(body))
+            return
+        if path == "/openai/batches":
+            batch = self.fake_server.create_batch(json.loads(body))
+            if batch is None:
+                self._send_not_found()
+                return
+            self._send_json(200, batch)
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_not_found()
+            return
+        retry_after = self.fake_server.acquire_rate()
+        if retry_after is not None:
+            self._send_json(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                            {"Retry-After": str(max(1, round(retry_after))), "retry-after-ms": str(max(1, int(retry_after * 1000)))})
+            return
+        self._send_json(200, self.fake_server.complete(json.loads(body)))
@@ -0,0 +1,136 @@
+import os
+import time
+import random
+import threading
+import http.server
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+# words the unit paragraphs are drawn from, the content only has to look like course text to the LLM stages
+WORDS = (
+    "azure resource group virtual machine network storage account identity access policy role deployment pipeline "
+    "container registry cluster monitor alert metric log query workspace subscription region availability zone backup "
+    "recovery vault key secret certificate endpoint gateway firewall load balancer database replica scale cost budget"
+).split()
+
+
+class FixtureSite:
+    """
+    A certification course written as static pages with the DOM the scrapper reads on learn.microsoft.com:
+    the learning-paths-list of the certification page, the data-bi-name="module" cards of the learning path pages,
+    the unit-list of the module pages and the unit-inner-section of the unit pages.
+    The text is drawn from a seeded generator, two sites with the same sizes are identical.
+    With assets, every page also loads an image, a stylesheet with a web font and a telemetry script, as the Learn pages do.
+    page_latency delays every page response, to stand for the time a browser takes to load and render a Learn page.
+    """
+    # name and size in bytes of the assets of each page
+    ASSETS = {"hero.png": 120 * 1024, "site.css": 40 * 1024, "font.woff2": 60 * 1024, "telemetry.js": 80 * 1024}
+
+    def __init__(self, directory, learning_paths=4, modules=3, units=5, unit_words=300, seed=0, assets=False, page_latency=0.0):
+        self.directory = directory
+        self.learning_paths = learning_paths
+        self.modules = modules
+        self.units = units
+        self.unit_words = unit_words
+        self.seed = seed
+        self.assets = assets
+        self.page_latency = page_latency
+        self._server = None
+        self._thread = None
+
+    @property
+    def page_count(self):
+        module_count = self.learning_paths * self.modules
+        return 1 + self.learning_paths + module_count + module_count * self.units
+
+    @property
+    def certification_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/index.html"
+
+    def sample_pages(self):
+        """One page of each level and the selector the scrapper waits for on it, relative to the site root."""
+        return [
+            ("index.html", 'a[id^="learn.wwl"]'),
+            ("lp/0.html", '[data-bi-name="module"]'),
+            ("m/0-0.html", '[id="unit-list"]'),
+            ("u/0-0-0.html", '[id="unit-inner-section"]'),
+        ]
+
+    def generate(self):
+        generator = random.Random(self.seed)
+        if self.assets:
+            self._write_assets(generator)
+        for directory in ("lp", "m", "u"):
+            os.makedirs(os.path.join(self.directory, directory), exist_ok=True)
+        learning_path_links = "\n".join(
+            f'<li><a id="learn.wwl.fixture-{lp}" class="card-title" href="lp/{lp}.html">Learning path {lp}</a></li>'
+            for lp in range(self.learning_paths))
+        # the certification page needs at least three learn.wwl links, like the real ones
+        self._write("index.html", f'<h1 class="title">Fixture Certification</h1>\n<ul id="learning-paths-list">\n{learning_path_links}\n</ul>')
+        for lp in range(self.learning_paths):
+            module_cards = "\n".join(
+                f'<div data-bi-name="module"><a href="../m/{lp}-{m}.html">Module {lp}.{m}</a></div>'
+                for m in range(self.modules))
+            self._write(f"lp/{lp}.html", f"<h1>Learning path {lp}</h1>\n{module_cards}")
+            for m in range(self.modules):
+                unit_links = "\n".join(
+                    f'<li><a href="../u/{lp}-{m}-{u}.html">Unit {lp}.{m}.{u}</a></li>'
+                    for u in range(self.units))
+                self._write(f"m/{lp}-{m}.html", f'<h1>Module {lp}.{m}</h1>\n<ul id="unit-list">\n{unit_links}\n</ul>')
+                for u in range(self.units):
+                    paragraphs = "\n".join(
+                        f"<p>{' '.join(generator.choice(WORDS) for _ in range(50))}.</p>"
+                        for _ in range(max(1, self.unit_words // 50)))
+                    self._write(f"u/{lp}-{m}-{u}.html", f'<nav>Previous Next</nav>\n<div id="unit-inner-section">\n<h1>Unit {lp}.{m}.{u}</h1>\n{paragraphs}\n</div>')
+
+    def _write_assets(self, generator):
+        os.makedirs(os.path.join(self.directory, "assets"), exist_ok=True)
+        for name, size in FixtureSite.ASSETS.items():
+            if name == "site.css":
+                # the rules fill the size, the font is only downloaded through the stylesheet
+                content = "@font-face { font-family: fixture; src: url(font.woff2); }\nbody { font-family: fixture; }\n"
+                content += "".join(f".rule-{index} {{ margin: {index % 16}px; }}\n" for index in range(size // 32))
+                data = content.encode("utf-8")
+            elif name == "telemetry.js":
+                data = ("/* telemetry */\n" + "var t=0;\n" * (size // 8)).encode("utf-8")
+            else:
+                data = generator.randbytes(size)
+            with open(os.path.join(self.directory, "assets", name), "wb") as file:
+                file.write(data)
+
+    def _write(self, relative_path, body):
+        head = '<meta charset="utf-8">'
+        if self.assets:
+            head += '<link rel="stylesheet" href="/assets/site.css"><script async src="/assets/telemetry.js"></script>'
+            body = f'<img src="/assets/hero.png" alt="">\n{body}'
+        with open(os.path.join(self.directory, relative_path), "w", encoding="utf-8") as file:
+            file.write(f"<!DOCTYPE html>\n<html><head>{head}</head><body>\n{body}\n</body></html>\n")
+
+    def serve(self, port=0):
+        """Serves the site from a background thread on 127.0.0.1, on a free port by default."""
+        handler = partial(QuietHttpRequestHandler, directory=self.directory, page_latency=self.page_latency)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.certification_url
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class QuietHttpRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args, page_latency=0.0, **kwargs):
+        # set before the base class handles the request, in its constructor
+        self.page_latency = page_latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.page_latency and self.path.split("?", 1)[0].endswith(".html"):
+            time.sleep(self.page_latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
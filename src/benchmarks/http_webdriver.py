@@ -0,0 +1,65 @@
+import requests
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from scrapper.PageExtraction import parse_html
+
+
+class HttpWebElement:
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def text(self):
+        # read on demand, the readiness waits only count the elements
+        return self.tag.get_text(strip=True)
+
+    def get_attribute(self, name):
+        return self.tag.get(name)
+
+
+class HttpWebDriver:
+    """
+    The part of the selenium WebDriver used by the scrapper, over plain HTTP: pages are downloaded with requests and
+    elements are looked up in the downloaded HTML. It stands in for Chrome when the fixture site is scrapped, so that the
+    benchmark measures the scrapper rather than the browser, and runs where Chrome is not installed.
+    """
+    SELECTORS = {
+        By.ID: lambda value: f'[id="{value}"]',
+        By.CSS_SELECTOR: lambda value: value,
+        By.CLASS_NAME: lambda value: f".{value}",
+        By.TAG_NAME: lambda value: value,
+    }
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.current_url = None
+        self.page_source = ""
+        self._soup = None
+        self.page_loads = 0
+
+    def get(self, url):
+        try:
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise WebDriverException(str(e))
+        self.page_loads += 1
+        self.current_url = response.url
+        self.page_source = response.text
+        self._soup = None
+
+    def find_elements(self, by, value):
+        if by not in HttpWebDriver.SELECTORS:
+            raise WebDriverException(f"HttpWebDriver does not support locating elements by {by}")
+        if self._soup is None:
+            self._soup = parse_html(self.page_source)
+        return [HttpWebElement(tag) for tag in self._soup.select(HttpWebDriver.SELECTORS[by](value))]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element matches {by}={value}")
+        return elements[0]
+
+    def quit(self):
+        self.session.close()
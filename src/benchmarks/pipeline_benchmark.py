@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import yaml
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.fixture_site import FixtureSite
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+# Define ANSI escape codes for colors
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+CERTIFICATION_CODE = "BENCH"
+CERTIFICATION_TITLE = "Fixture Certification"
+STAGES = ["scrap", "clean", "generate-questions", "pipeline"]
+# the fake endpoint completes a batch job in about its latency per request, not in hours
+BATCH_POLL_INTERVAL_SECONDS = 0.2
+
+
+def prepare_work_directory(work_dir, fake_openai_endpoint, llm_max_concurrency, stream_window_units=None):
+    """Lays out work_dir like the repository, src with its config.yml next to microsoft_certifications, and returns the src directory."""
+    with open(os.path.join(SRC_DIR, "config.yml"), "r") as file:
+        config = yaml.safe_load(file)
+    # every request has to reach the fake endpoint, a cached response would not be measured
+    config["llm_cache_max_size_mb"] = 0
+    config["llm_max_concurrency"] = llm_max_concurrency
+    config["llm_batch_poll_interval_seconds"] = BATCH_POLL_INTERVAL_SECONDS
+    if stream_window_units is not None:
+        config["stream_window_units"] = stream_window_units
+    work_src_dir = os.path.join(work_dir, "src")
+    os.makedirs(work_src_dir)
+    os.makedirs(os.path.join(work_dir, "microsoft_certifications"))
+    with open(os.path.join(work_src_dir, "config.yml"), "w") as file:
+        yaml.safe_dump(config, file)
+    # set before Course loads the .env of src, which does not override them
+    os.environ["AZURE_OPENAI_ENDPOINT"] = fake_openai_endpoint
+    os.environ["AZURE_OPENAI_KEY"] = "benchmark"
+    return work_src_dir
+
+
+def reset_peak_memory():
+    # Linux resets the peak resident set size of the process on demand, elsewhere the peak is the one of the whole run
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory_bytes():
+    """Returns the peak resident set size of the process since the last reset_peak_memory, where the system allows the reset."""
+    try:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def run_stage(name, stage, fake_openai_server, verbose):
+    """Runs stage() and returns its measures: wall time, page loads, LLM requests and tokens per second, peak memory."""
+    from scrapper.course_structure.AbstractScrappable import AbstractScrappable
+    AbstractScrappable.page_load_counter.reset()
+    fake_openai_server.reset_stats()
+    reset_peak_memory()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    succeeded = True
+    start = time.perf_counter()
+    with output:
+        try:
+            stage()
+        except (Exception, SystemExit) as e:
+            succeeded = False
+            error = e
+    seconds = time.perf_counter() - start
+    peak_memory = peak_memory_bytes()
+    if not succeeded:
+        print(f"{RED}{name} failed: {error!r}{RESET}")
+    llm_stats = fake_openai_server.snapshot()
+    pages = sum(AbstractScrappable.page_load_counter.counts.values())
+    tokens = llm_stats["prompt_tokens"] + llm_stats["completion_tokens"]
+    return {
+        "stage": name,
+        "succeeded": succeeded,
+        "seconds": round(seconds, 3),
+        "pages": pages,
+        "pages_per_second": round(pages / seconds, 2),
+        "llm_requests": llm_stats["requests"],
+        "llm_requests_per_second": round(llm_stats["requests"] / seconds, 2),
+        "llm_rate_limited": llm_stats["rate_limited"],
+        "llm_batch_jobs": llm_stats["batch_jobs"],
+        "llm_batch_requests": llm_stats["batch_requests"],
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / seconds, 1),
+        "peak_rss_mb": round(peak_memory / (1024 * 1024), 2),
+    }
+
+
+def print_report(results):
+    print(f"{'stage':<20}{'seconds':>9}{'pages/s':>10}{'LLM req/s':>11}{'tokens/s':>11}{'429s':>6}{'peak RSS MB':>13}")
+    for result in results:
+        color = GREEN if result["succeeded"] else RED
+        print(f"{color}{result['stage']:<20}{result['seconds']:>9.2f}{result['pages_per_second']:>10.1f}{result['llm_requests_per_second']:>11.1f}"
+              f"{result['tokens_per_second']:>11.0f}{result['llm_rate_limited']:>6}{result['peak_rss_mb']:>13.1f}{RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure each stage of Course against a local fixture site and a fake Azure OpenAI endpoint, without network access.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run, in order (default: all)")
+    parser.add_argument("--learning-paths", type=int, default=4, help="Learning paths of the fixture certification, at least 3 (default: 4)")
+    parser.add_argument("--modules", type=int, default=3, help="Modules per learning path (default: 3)")
+    parser.add_argument("--units", type=int, default=5, help="Units per module (default: 5)")
+    parser.add_argument("--unit-words", type=int, default=300, help="Words per unit (default: 300)")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Seconds the fixture site waits before each page, the load time of a page in a browser (default: 0)")
+    parser.add_argument("--workers", type=int, default=1, help="Browser sessions of the scrap and pipeline stages (default: 1)")
+    parser.add_argument("--fetch-engine", choices=["selenium", "http"], default="selenium", help="Fetch engine of the scrap and pipeline stages (default: selenium)")
+    parser.add_argument("--browser", choices=["http", "chrome"], default="http", help="Scrap with a WebDriver reading pages over HTTP, or with Chrome (default: http)")
+    parser.add_argument("--extraction", choices=["browser", "parse"], default="browser", help="Extraction mode of the scrap and pipeline stages, the http browser has no script engine and always parses (default: browser)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="Processes parsing the captured unit pages during the scrap and pipeline stages, 0 parses them in the scrapping thread (default: 2)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake endpoint waits before each response (default: 0.05)")
+    parser.add_argument("--llm-seconds-per-token", type=float, default=0.0, help="Seconds the fake endpoint waits per completion token (default: 0)")
+    parser.add_argument("--llm-requests-per-minute", type=int, default=0, help="Requests per minute accepted by the fake endpoint before answering 429, 0 for no limit (default: 0)")
+    parser.add_argument("--llm-max-concurrency", type=int, default=8, help="llm_max_concurrency of the benchmarked configuration (default: 8)")
+    parser.add_argument("--batch", action="store_true", help="Send the requests of the clean and generate-questions stages as batch jobs, as trainforcert.py --batch does")
+    parser.add_argument("--batch-fail-every", type=int, default=0, help="Every n-th request of a batch job fails on the fake endpoint and is sent again online, 0 for none (default: 0)")
+    parser.add_argument("--stream-window-units", type=int, help="stream_window_units of the benchmarked configuration (default: the one of config.yml)")
+    parser.add_argument("--json", help="Also write the measures to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory with the fixture site and the generated files")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the stages")
+    args = parser.parse_args()
+    if args.learning_paths < 3:
+        parser.error("the certification page of the fixture site needs at least 3 learning paths")
+
+    work_dir = tempfile.mkdtemp(prefix="trainforcert-benchmark-")
+    fixture_site = FixtureSite(os.path.join(work_dir, "site"), args.learning_paths, args.modules, args.units, args.unit_words, page_latency=args.page_latency)
+    fixture_site.generate()
+    certification_url = fixture_site.serve()
+    fake_openai_server = FakeOpenAIServer(args.llm_latency, args.llm_seconds_per_token, args.llm_requests_per_minute, args.batch_fail_every)
+    fake_openai_endpoint = fake_openai_server.serve()
+    json_path = os.path.abspath(args.json) if args.json else None
+    initial_dir = os.getcwd()
+    os.chdir(prepare_work_directory(work_dir, fake_openai_endpoint, args.llm_max_concurrency, args.stream_window_units))
+    print(f"Fixture certification of {fixture_site.page_count} pages served at {certification_url}, fake Azure OpenAI at {fake_openai_endpoint}")
+
+    from course import Course
+    # the subsystems are imported before the measures, their import time is measured by startup_benchmark.py
+    import openai
+    import scrapper.CertificationScrapperService
+    driver_factory = None
+    if args.browser == "http":
+        from benchmarks.http_webdriver import HttpWebDriver
+        driver_factory = HttpWebDriver
+    scrap_options = {"workers": args.workers, "fetch_engine": args.fetch_engine, "page_cache": False, "driver_factory": driver_factory, "extraction_mode": args.extraction,
+                    "parse_workers": args.parse_workers}
+
+    def stage_function(name):
+        # each stage starts from a new Course, as each command of trainforcert.py does
+        course = Course(CERTIFICATION_CODE, CERTIFICATION_TITLE)
+        if name == "scrap":
+            return lambda: course.scrap(certification_url, **scrap_options)
+        if name == "clean":
+            return lambda: course.clean(batch=args.batch)
+        if name == "generate-questions":
+            return lambda: course.generate_questions(batch=args.batch)
+        return lambda: course.run_pipeline(certification_url, **scrap_options)
+
+    results = []
+    try:
+        for name in args.stages:
+            if name == "pipeline":
+                # the pipeline starts over, without the files written by the previous stages
+                shutil.rmtree(os.path.join(work_dir, "microsoft_certifications", CERTIFICATION_CODE), ignore_errors=True)
+            results.append(run_stage(name, stage_function(name), fake_openai_server, args.verbose))
+    finally:
+        fixture_site.shutdown()
+        fake_openai_server.shutdown()
+        os.chdir(initial_dir)
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump({"fixture_pages": fixture_site.page_count, "options": vars(args), "stages": results}, file, indent=4)
+    if args.keep:
+        print(f"Work directory kept in {work_dir}")
+    if not all(result["succeeded"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Define ANSI escape codes for colors
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# commands that must start without the heavy subsystems, and what they run
+STARTUP_CASES = {
+    "--help": ["trainforcert.py", "--help"],
+    "courses": ["trainforcert.py", "courses"],
+    "run-questions --help": ["trainforcert.py", "run-questions", "--help"],
+    "import course": ["-c", "import course"],
+}
+# subsystems that take seconds to import, only the commands using them may import them
+HEAVY_MODULES = ["openai", "selenium", "webdriver_manager", "azure"]
+
+
+def measure(arguments, runs):
+    """Returns the median wall time of the command over runs, in seconds, and whether every run succeeded."""
+    durations = []
+    succeeded = True
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable] + arguments, cwd=SRC_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+        succeeded = succeeded and completed.returncode == 0
+    return statistics.median(durations), succeeded
+
+
+def imported_heavy_modules(arguments):
+    """Returns the heavy top-level modules imported by the command, read from the -X importtime trace."""
+    completed = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=SRC_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        module = line.rsplit("|", 1)[-1].strip().split(".")[0]
+        if module in HEAVY_MODULES:
+            imported.add(module)
+    return sorted(imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the startup time of the trainforcert commands that must start fast, fail on regression.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command, the median is reported (default: 5)")
+    parser.add_argument("--max-seconds", type=float, default=0.5, help="Startup time budget of each command (default: 0.5)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'command':<24}{'median':>10}  heavy imports")
+    for name, arguments in STARTUP_CASES.items():
+        median, succeeded = measure(arguments, args.runs)
+        heavy_modules = imported_heavy_modules(arguments)
+        regression = not succeeded or median > args.max_seconds or heavy_modules
+        failed = failed or regression
+        color = RED if regression else GREEN
+        print(f"{color}{name:<24}{median:>9.3f}s  {', '.join(heavy_modules) or '-'}{'' if succeeded else '  (command failed)'}{RESET}")
+    if failed:
+        print(f"{RED}Startup regression: a command fails, exceeds {args.max_seconds}s or imports a heavy subsystem.{RESET}")
+        sys.exit(1)
+    print(f"{GREEN}Startup within budget.{RESET}")
+
+
+if __name__ == "__main__":
+    main()
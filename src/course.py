@@ -1,18 +1,28 @@
 import os
-import socketserver
+import time
+import queue
+import asyncio
+import threading
 import sys
 import yaml
 import re
 import json
+import contextlib
+from functools import wraps
+from http.server import ThreadingHTTPServer
 from dotenv import load_dotenv
-from openai import AzureOpenAI
 
-from scrapper.course_structure.Certification import Certification
-from scrapper.CertificationScrapperService import CertificationScrapperService
-
-from deploy.deploy import Deploy
-from question.question import Questions, CertificationQuestions
-from web.webserver import MyHttpRequestHandler
+# openai, selenium and the Azure SDKs take seconds to import, they are imported by the methods that need them
+from question.question import Questions, PackedUnitQuestions, LearningPathQuestions, CertificationQuestions, LearningPathQuestionsFile, CertificationQuestionsManifest
+from question.question_shard_store import QuestionShardStore
+from question.question_dedup import QuestionDeduplicator
+from web.webserver import MyHttpRequestHandler, precompress_assets, PORT
+from llm.llm_executor import LLMExecutor
+from llm.llm_cache import LLMResponseCache
+from llm.llm_batch import LLMBatchJob
+from llm.request_planner import RequestPlanner
+from storage.course_material_store import CourseMaterialStore, AbstractCourseMaterialFormat, COURSE_MATERIAL_FORMATS
+from telemetry.run_telemetry import run_telemetry, telemetry_stage
 
 
 # Define ANSI escape codes for colors
@@ -21,21 +31,43 @@ RED = "\033[91m"
 RESET = "\033[0m"
 
 
+def closes_llm_session(method):
+    """Closes the LLM client and the event loop of the course once the command is done, even when it fails."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._close_llm_session()
+    return wrapper
+
+
 
 class Course:
     DIRECTORY_OFFICIAL_COURSE = "official_course_material"
+    DIRECTORY_PAGE_CACHE = "page_cache"
+    CHECKPOINT_FILE_SUFFIX = ".checkpoint.jsonl"
     DIRECTORY_CLEANED_COURSE = "cleaned_course_material"
     DIRECTORY_QUESTIONS = "question_files"
+    DIRECTORY_UNIT_QUESTIONS = "unit_questions"
+    DIRECTORY_BATCH_FILES = "batch_files"
     QUESTION_FILENAME = "questions.json"
+    DEDUP_REPORT_FILENAME = "dedup_report.json"
+    LLM_CACHE_FILE_PATH = "../microsoft_certifications/llm_cache.sqlite"
     WEB_DIRECTORY= "web/public"
+    DIRECTORY_WEB_LEARNING_PATHS = "learning_paths"
+    DIRECTORY_WEB_QUESTIONS = "web_question_files"
     DIRECTORY_SSML_FILES = "ssml_files"
     DIRECTORY_WAV_FILES = "wav_files"
+    DIRECTORY_TELEMETRY = "telemetry"
+    # SharedSlots set in the worker processes of a catalog refresh, limiting the browser sessions and the LLM requests of all the certifications
+    shared_browser_slots = None
+    shared_llm_slots = None
 
     def __init__(self, certification_code, certification_title, verbose=False):
         load_dotenv()
         self.certification_code = certification_code
         self.certification_title = certification_title
-        self.official_course_file_name = f"{self.certification_code}.yml"
         self.verbose = verbose
         self.input_token_count = 0
         self.output_token_count = 0
@@ -46,13 +78,47 @@ class Course:
             print("config.yml file not found.")
             sys.exit(1)
 
-        self.llm_client = AzureOpenAI(
-            azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT"), 
-            api_key=os.getenv("AZURE_OPENAI_KEY"),  
-            api_version="2024-08-01-preview"
-        )
-
-
+        # the LLM client and cache are built on first use, by the commands that call the LLM
+        self._llm_client = None
+        self._llm_cache = None
+        self._llm_cache_opened = False
+        # requests to the LLM are sent concurrently, up to llm_max_concurrency at a time
+        self.llm_executor = LLMExecutor(self.config.get("llm_max_concurrency", 8))
+        # small units share a request, oversized units are split over several requests
+        self.request_planner = RequestPlanner(
+            self.config.get("llm_pack_unit_max_tokens", 300),
+            self.config.get("llm_pack_request_max_tokens", 3000),
+            self.config.get("llm_split_unit_max_tokens", 8000))
+        # course material is written in course_material_format and read in whatever format it was written in
+        course_material_format = self.config.get("course_material_format", "jsonl")
+        if course_material_format not in COURSE_MATERIAL_FORMATS:
+            print(f"{RED}course_material_format must be one of {', '.join(COURSE_MATERIAL_FORMATS)} in config.yml.{RESET}")
+            sys.exit(1)
+        self.course_material_store = CourseMaterialStore(course_material_format)
+        # clean-only and generate-questions hold at most this many units in memory
+        self.stream_window_units = self.config.get("stream_window_units", 1000)
+
+
+
+    @property
+    def llm_client(self):
+        if self._llm_client is None:
+            from openai import AsyncAzureOpenAI
+            self._llm_client = AsyncAzureOpenAI(
+                azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT"), 
+                api_key=os.getenv("AZURE_OPENAI_KEY"),  
+                api_version="2024-08-01-preview"
+            )
+        return self._llm_client
+
+    @property
+    def llm_cache(self):
+        if not self._llm_cache_opened:
+            # responses already paid for are reused, shared by every certification since the key covers model, prompt and content
+            llm_cache_max_size_mb = self.config.get("llm_cache_max_size_mb", 512)
+            self._llm_cache = LLMResponseCache(Course.LLM_CACHE_FILE_PATH, llm_cache_max_size_mb * 1024 * 1024) if llm_cache_max_size_mb > 0 else None
+            self._llm_cache_opened = True
+        return self._llm_cache
 
     @staticmethod
     def check_common_requirements():
@@ -79,58 +145,150 @@ class Course:
         return files_content
     
     
-    def _get_azure_openai_response(self, llm_model, system_prompt, content):
-        response = self.llm_client.chat.completions.create(
-            model=llm_model,
-            max_tokens=16384,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": content,
-                }
-            ]
-        )
+    async def _get_azure_openai_response(self, llm_model, system_prompt, content, operation="llm", packed_contents=None):
+        cache_key = LLMResponseCache.key(llm_model, system_prompt, content)
+        if self.llm_cache is not None:
+            cached_response = self.llm_cache.get(cache_key)
+            if cached_response is not None:
+                run_telemetry.record_llm_request(operation, llm_model, content, None, 0, 0, cached=True, packed_contents=packed_contents)
+                return cached_response
+        async with self._shared_llm_slot():
+            request_start = time.perf_counter()
+            response = await self.llm_client.chat.completions.create(
+                model=llm_model,
+                max_tokens=16384,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt,
+                    },
+                    {
+                        "role": "user",
+                        "content": content,
+                    }
+                ]
+            )
         self.input_token_count += response.usage.prompt_tokens
         self.output_token_count += response.usage.completion_tokens
-        return response.choices[0].message.content.strip()
+        run_telemetry.record_llm_request(operation, llm_model, content, time.perf_counter() - request_start, response.usage.prompt_tokens, response.usage.completion_tokens, packed_contents=packed_contents)
+        content = response.choices[0].message.content.strip()
+        if self.llm_cache is not None:
+            self.llm_cache.put(cache_key, content)
+        return content
     
-    def _get_azure_openai_response_structured_output(self, llm_model, system_prompt, content, expected_output_format):
-        response = self.llm_client.beta.chat.completions.parse(
-            model=llm_model,
-            max_tokens=16384,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": content,
-                }
-            ],
-            #response_format=list[Question]
-            response_format=expected_output_format
+    async def _get_azure_openai_response_structured_output(self, llm_model, system_prompt, content, expected_output_format, operation="llm", packed_contents=None):
+        cache_key = LLMResponseCache.key(llm_model, system_prompt, content, expected_output_format)
+        if self.llm_cache is not None:
+            cached_response = self.llm_cache.get(cache_key)
+            if cached_response is not None:
+                run_telemetry.record_llm_request(operation, llm_model, content, None, 0, 0, cached=True, packed_contents=packed_contents)
+                return expected_output_format.model_validate_json(cached_response)
+        async with self._shared_llm_slot():
+            request_start = time.perf_counter()
+            response = await self.llm_client.beta.chat.completions.parse(
+                model=llm_model,
+                max_tokens=16384,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt,
+                    },
+                    {
+                        "role": "user",
+                        "content": content,
+                    }
+                ],
+                #response_format=list[Question]
+                response_format=expected_output_format
             
-        )
+            )
         self.input_token_count += response.usage.prompt_tokens
         self.output_token_count += response.usage.completion_tokens
-        return response.choices[0].message.parsed
-    
-
-    def clean(self):
-        self.input_token_count = 0
-        self.output_token_count = 0
-        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}/{self.official_course_file_name}', 'r') as file:
-            course_content = yaml.safe_load(file)
+        run_telemetry.record_llm_request(operation, llm_model, content, time.perf_counter() - request_start, response.usage.prompt_tokens, response.usage.completion_tokens, packed_contents=packed_contents)
+        parsed = response.choices[0].message.parsed
+        if self.llm_cache is not None:
+            self.llm_cache.put(cache_key, parsed.model_dump_json())
+        return parsed
+
+    def _close_llm_session(self):
+        # the client is bound to the event loop of the executor, both are closed at the end of a command and reopened by the next one
+        if self._llm_client is not None:
+            self.llm_executor.run_coroutine(self._llm_client.close())
+            self._llm_client = None
+        self.llm_executor.close()
+
+    def _shared_llm_slot(self):
+        # the latency recorded for a request does not include the wait for a slot
+        return Course.shared_llm_slots.hold_async() if Course.shared_llm_slots is not None else contextlib.nullcontext()
+
+    def _complete_unpacked_responses(self, responses, contents, request):
+        # units missing from the response of their packed request are sent again on their own
+        missing_contents = [content for content in dict.fromkeys(contents) if content not in responses]
+        if missing_contents:
+            print(f"{len(missing_contents)} units were missing from packed responses, sending them on their own.")
+            responses.update(self.llm_executor.run(request, missing_contents))
+
+    def _get_azure_openai_batch_responses(self, llm_model, system_prompt, contents, batch_name, online_request, expected_output_format=None):
+        """
+        Sends the contents missing from the LLM cache as a single batch job, returns the responses keyed by content.
+        Requests that fail in the batch job are sent again with online_request.
+        """
+        responses = {}
+        pending_contents = []
+        for content in dict.fromkeys(contents):
+            cache_key = LLMResponseCache.key(llm_model, system_prompt, content, expected_output_format)
+            cached_response = self.llm_cache.get(cache_key) if self.llm_cache is not None else None
+            if cached_response is None:
+                pending_contents.append(content)
+            elif expected_output_format is not None:
+                responses[content] = expected_output_format.model_validate_json(cached_response)
+            else:
+                responses[content] = cached_response
+        if not pending_contents:
+            return responses
+
+        batch_requests = []
+        for i, content in enumerate(pending_contents):
+            body = {
+                "model": llm_model,
+                "max_tokens": 16384,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": content},
+                ],
+            }
+            if expected_output_format is not None:
+                body["response_format"] = LLMBatchJob.response_format(expected_output_format)
+            batch_requests.append((f"{batch_name}-{i}", body))
+        batch_file_path = f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_BATCH_FILES}/{batch_name}.jsonl'
+        batch_job = LLMBatchJob(self.llm_client, batch_file_path, self.config.get("llm_batch_poll_interval_seconds", 60), self.llm_executor.run_coroutine)
+        batch_results = batch_job.run(batch_requests)
+
+        failed_contents = []
+        for (custom_id, body), content in zip(batch_requests, pending_contents):
+            result = batch_results.get(custom_id)
+            if result is None:
+                failed_contents.append(content)
+                continue
+            self.input_token_count += result["usage"]["prompt_tokens"]
+            self.output_token_count += result["usage"]["completion_tokens"]
+            run_telemetry.record_llm_request(batch_name, llm_model, content, None, result["usage"]["prompt_tokens"], result["usage"]["completion_tokens"], batch=True)
+            message_content = result["choices"][0]["message"]["content"]
+            if expected_output_format is not None:
+                responses[content] = expected_output_format.model_validate_json(message_content)
+                cached_response = responses[content].model_dump_json()
+            else:
+                responses[content] = message_content.strip()
+                cached_response = responses[content]
+            if self.llm_cache is not None:
+                self.llm_cache.put(LLMResponseCache.key(llm_model, system_prompt, content, expected_output_format), cached_response)
+        if failed_contents:
+            print(f"{RED}{len(failed_contents)} requests failed in the batch job, sending them again online.{RESET}")
+            responses.update(self.llm_executor.run(online_request, failed_contents))
+        return responses
     
-        if not course_content:
-            print(f"No file to clean. Make sure the official course material on the following path: microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}/{self.official_course_file_name}")
-            sys.exit(1)
 
+    def _get_cleaning_settings(self):
         if "llm_cleaning_model" not in self.config:
             print("llm_cleaning_model not found in config.yml.")
             sys.exit(1)
@@ -140,68 +298,363 @@ class Course:
             print("cleaning_prompt not found in config.yml.")
             sys.exit(1)
         cleaning_prompt =  self.config["cleaning_prompt"]
-        
+        return llm_cleaning_model, cleaning_prompt
+
+    def _get_question_settings(self):
+        if "llm_question_model" not in self.config:
+            print("llm_question_model not found in config.yml.")
+            sys.exit(1)
+        llm_question_model =  self.config["llm_question_model"]
+
+        if "question_prompt" not in self.config:
+            print("question_prompt not found in config.yml.")
+            sys.exit(1)
+        question_prompt =  self.config["question_prompt"]
+        return llm_question_model, question_prompt
+
+    def _get_question_shard_store(self, llm_question_model, question_prompt):
+        return QuestionShardStore(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.DIRECTORY_UNIT_QUESTIONS}', llm_question_model, question_prompt)
+
+    def _get_course_material_dir(self, directory_name):
+        return f'../microsoft_certifications/{self.certification_code}/{directory_name}'
+
+    def _write_cleaned_course(self, certification, cleaned_contents):
         if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}'):
             os.makedirs(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}')
 
-        certification = Certification.from_dict(course_content)
-
         def llm_cleaning_func(text):
-            return self._get_azure_openai_response(llm_cleaning_model, cleaning_prompt, text)
+            return cleaned_contents[text]
         certification.clean(llm_cleaning_func)
 
-        # Write the cleaned course content to a new YAML file
-        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}/{self.official_course_file_name}', 'w') as file:
-            yaml.dump(certification.to_dict(), file, default_flow_style=False)
+        # Write the cleaned course content to a new course material file
+        cleaned_course_dir = self._get_course_material_dir(Course.DIRECTORY_CLEANED_COURSE)
+        self.course_material_store.dump(certification.to_dict(), self.course_material_store.file_path(cleaned_course_dir, self.certification_code))
+
+    def _write_questions(self, certification, unit_questions):
+        def llm_questionify_func(text):
+            return unit_questions[text]
+        
+        questions = certification.generate_questions(llm_questionify_func)
+        print(f"Generated {sum(len(learning_path['questions']) for learning_path in questions)} questions for {len(questions)} learning paths.")
+        self._dump_certification_questions(questions)
+
+    def _write_questions_from_shards(self, course_material_path, question_shard_store):
+        """Gathers the questions of each learning path from the shards of its units, reading the course material one node at a time."""
+        questions = []
+        for node in self.course_material_store.iter_nodes(course_material_path):
+            if node["level"] == 1:
+                questions.append(LearningPathQuestions(learning_path_title=node["learning_path_title"], questions=[]))
+            elif node["level"] == AbstractCourseMaterialFormat.UNIT_LEVEL:
+                questions[-1].questions.extend(question_shard_store.get(node["unit_content"]).questions)
+        self._dump_certification_questions(questions)
+
+    def _dump_certification_questions(self, questions):
+        if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}'):
+            os.makedirs(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}')
+        certificationQuestions = CertificationQuestions(certification_title=f'{self.certification_code} - {self.certification_title}', questions=questions)
+        question_dedup_threshold = self.config.get("question_dedup_threshold", 0.6)
+        if question_dedup_threshold > 0:
+            question_count = sum(len(learning_path_questions.questions) for learning_path_questions in certificationQuestions.questions)
+            certificationQuestions, removed_questions = QuestionDeduplicator(question_dedup_threshold).deduplicate(certificationQuestions)
+            with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.DEDUP_REPORT_FILENAME}', 'w') as file:
+                json.dump(removed_questions, file, indent=4)
+            print(f"Removed {len(removed_questions)} near-duplicate questions out of {question_count}, listed in ../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.DEDUP_REPORT_FILENAME}")
+        # write questions to a single json file
+        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}', 'w') as file:
+            json.dump(certificationQuestions.model_dump(), file, indent=4)
+
+    def _write_web_question_files(self, output_dir):
+        """
+        Splits questions.json into a small manifest, written as questions.json in output_dir, and one file per learning path.
+        The quiz only downloads the file of the learning path being played. Returns the paths of the written files, relative to output_dir.
+        """
+        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}', 'r') as file:
+            certification_questions = CertificationQuestions.model_validate(json.load(file))
+        learning_paths_dir = os.path.join(output_dir, Course.DIRECTORY_WEB_LEARNING_PATHS)
+        # files of a previously served certification may outnumber the learning paths of this one
+        if os.path.exists(learning_paths_dir):
+            for filename in os.listdir(learning_paths_dir):
+                os.remove(os.path.join(learning_paths_dir, filename))
+        else:
+            os.makedirs(learning_paths_dir)
+
+        learning_path_files = []
+        for index, learning_path_questions in enumerate(certification_questions.questions):
+            learning_path_file = f'{Course.DIRECTORY_WEB_LEARNING_PATHS}/learning_path_{index}.json'
+            with open(os.path.join(output_dir, learning_path_file), 'w') as file:
+                json.dump(learning_path_questions.model_dump(), file, separators=(',', ':'))
+            learning_path_files.append(LearningPathQuestionsFile(
+                learning_path_title=learning_path_questions.learning_path_title,
+                question_count=len(learning_path_questions.questions),
+                file=learning_path_file))
+        manifest = CertificationQuestionsManifest(certification_title=certification_questions.certification_title, learning_paths=learning_path_files)
+        with open(os.path.join(output_dir, Course.QUESTION_FILENAME), 'w') as file:
+            json.dump(manifest.model_dump(), file, indent=4)
+        return [Course.QUESTION_FILENAME] + [learning_path_file.file for learning_path_file in learning_path_files]
+
+    def _clean_unit_contents(self, unit_contents, llm_cleaning_model, cleaning_prompt, batch=False):
+        """Returns the cleaned content of each unit content, keyed by content."""
+        async def llm_cleaning_request(text):
+            return await self._get_azure_openai_response(llm_cleaning_model, cleaning_prompt, text, operation="cleaning")
+        if batch:
+            return self._get_azure_openai_batch_responses(llm_cleaning_model, cleaning_prompt, unit_contents, "cleaning", llm_cleaning_request)
+        request_plan = self.request_planner.plan(unit_contents)
+
+        async def llm_planned_cleaning_request(text):
+            if request_plan.is_packed(text):
+                return await self._get_azure_openai_response(llm_cleaning_model, cleaning_prompt + RequestPlanner.PACKED_TEXT_INSTRUCTIONS, text, operation="cleaning", packed_contents=request_plan.packed_requests[text])
+            return await llm_cleaning_request(text)
+        # all the requests are sent concurrently, then written back into the certification in their original order
+        responses = self.llm_executor.run(llm_planned_cleaning_request, request_plan.request_texts())
+        cleaned_contents = request_plan.assemble(responses, RequestPlanner.unpack_text, lambda chunks: "\n".join(chunks))
+        self._complete_unpacked_responses(cleaned_contents, unit_contents, llm_cleaning_request)
+        return cleaned_contents
+
+    @telemetry_stage("clean")
+    @closes_llm_session
+    def clean(self, batch=False):
+        self.input_token_count = 0
+        self.output_token_count = 0
+        official_course_path = self.course_material_store.find(self._get_course_material_dir(Course.DIRECTORY_OFFICIAL_COURSE), self.certification_code)
+        if official_course_path is None:
+            print(f"No file to clean. Make sure the official course material on the following path: microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}/{self.certification_code}{self.course_material_store.course_material_format.FILE_EXTENSION}")
+            sys.exit(1)
+
+        llm_cleaning_model, cleaning_prompt = self._get_cleaning_settings()
+        cleaned_course_path = self.course_material_store.file_path(self._get_course_material_dir(Course.DIRECTORY_CLEANED_COURSE), self.certification_code)
+
+        def clean_unit_contents(unit_contents):
+            return self._clean_unit_contents(unit_contents, llm_cleaning_model, cleaning_prompt, batch)
+        # the units are streamed from the official to the cleaned course material, stream_window_units at a time.
+        # a batch job takes them all at once, one job per window would wait for each job in turn
+        window_size = None if batch else self.stream_window_units
+        unit_count = self.course_material_store.transform_units(official_course_path, cleaned_course_path, clean_unit_contents, window_size)
+        print(f"{unit_count} units cleaned.")
 
         print(f"Cleaning has consumed {self.input_token_count} input tokens and {self.output_token_count} output tokens.")
+        if self.llm_cache is not None:
+            print(self.llm_cache.summary())
         print(f"{GREEN}Cleaning completed successfully.{RESET}")
 
                     
-    def scrap(self, certification_url):
+    @telemetry_stage("scrap")
+    def scrap(self, certification_url, workers=1, parallel_level=None, fetch_engine=None, page_cache=True, resume=False, reset_checkpoint=False, on_unit_scrapped=None, driver_factory=None, browser_profile=None, extraction_mode=None, parse_workers=None):
+        from scrapper.course_structure.Certification import Certification
+        from scrapper.CertificationScrapperService import CertificationScrapperService
+        from scrapper.BrowserProfile import BrowserProfile
+        from scrapper.PageExtraction import EXTRACTION_BROWSER
+        if parallel_level is None:
+            parallel_level = Certification.PARALLEL_LEVEL_LEARNING_PATH
+        if fetch_engine is None:
+            fetch_engine = CertificationScrapperService.FETCH_ENGINE_SELENIUM
+        if browser_profile is None:
+            browser_profile = BrowserProfile.LEAN
+        if extraction_mode is None:
+            extraction_mode = EXTRACTION_BROWSER
+        if parse_workers is None:
+            parse_workers = CertificationScrapperService.DEFAULT_PARSE_WORKERS
         if not os.path.exists(f'../microsoft_certifications/{self.certification_code}'):
             os.makedirs(f'../microsoft_certifications/{self.certification_code}')
         if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}'):
             os.makedirs(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}')
-        outputfilepath = f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}/{self.official_course_file_name}'
-        certificationScrapperService = CertificationScrapperService(certification_url)
-        certificationScrapperService.scrap_course_content(outputfilepath)
+        outputfilepath = self.course_material_store.file_path(self._get_course_material_dir(Course.DIRECTORY_OFFICIAL_COURSE), self.certification_code)
+        page_cache_dir = f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_PAGE_CACHE}' if page_cache else None
+        checkpoint_path = f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_OFFICIAL_COURSE}/{self.certification_code}{Course.CHECKPOINT_FILE_SUFFIX}'
+        browser_session_count = CertificationScrapperService.browser_session_count(workers, fetch_engine)
+        # every browser session the scrap may start is reserved before the first one starts, and given back once they are all closed
+        with Course.shared_browser_slots.hold(browser_session_count) if Course.shared_browser_slots is not None else contextlib.nullcontext():
+            certificationScrapperService = CertificationScrapperService(certification_url, workers=workers, parallel_level=parallel_level, fetch_engine=fetch_engine, page_cache_dir=page_cache_dir, driver_factory=driver_factory, browser_profile=browser_profile, extraction_mode=extraction_mode, parse_workers=parse_workers)
+            return certificationScrapperService.scrap_course_content(outputfilepath, checkpoint_path, resume=resume, reset_checkpoint=reset_checkpoint, on_unit_scrapped=on_unit_scrapped, course_material_store=self.course_material_store)
 
 
             
-    def generate_questions(self):
+    def _generate_unit_questions(self, unit_contents, llm_question_model, question_prompt, batch=False):
+        """Returns the questions of each unit content, keyed by content."""
+        async def llm_questionify_request(text):
+            return await self._get_azure_openai_response_structured_output(llm_question_model, question_prompt, text, Questions, operation="questions")
+        if batch:
+            return self._get_azure_openai_batch_responses(llm_question_model, question_prompt, unit_contents, "questions", llm_questionify_request, Questions)
+        request_plan = self.request_planner.plan(unit_contents)
+
+        async def llm_planned_questionify_request(text):
+            if request_plan.is_packed(text):
+                return await self._get_azure_openai_response_structured_output(llm_question_model, question_prompt + RequestPlanner.PACKED_QUESTIONS_INSTRUCTIONS, text, PackedUnitQuestions, operation="questions", packed_contents=request_plan.packed_requests[text])
+            return await llm_questionify_request(text)
+
+        def unpack_questions(packed_unit_questions):
+            return {unit.unit_id: Questions(questions=unit.questions) for unit in packed_unit_questions.units}
+
+        def merge_questions(chunk_questions):
+            return Questions(questions=[question for questions in chunk_questions for question in questions.questions])
+        responses = self.llm_executor.run(llm_planned_questionify_request, request_plan.request_texts())
+        unit_questions = request_plan.assemble(responses, unpack_questions, merge_questions)
+        self._complete_unpacked_responses(unit_questions, unit_contents, llm_questionify_request)
+        return unit_questions
+
+    @telemetry_stage("generate_questions")
+    @closes_llm_session
+    def generate_questions(self, batch=False):
+        self.input_token_count = 0
+        self.output_token_count = 0
         # check if file exists
-        if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}/{self.official_course_file_name}'):
-            print(f"File not found: ../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}/{self.official_course_file_name}")
+        cleaned_course_path = self.course_material_store.find(self._get_course_material_dir(Course.DIRECTORY_CLEANED_COURSE), self.certification_code)
+        if cleaned_course_path is None:
+            print(f"File not found: ../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}/{self.certification_code}{self.course_material_store.course_material_format.FILE_EXTENSION}")
             print(' Please run the clean command first.')
             sys.exit(1)
 
-        if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}'):
-            os.makedirs(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}')
-        
-        if "llm_question_model" not in self.config:
-            print("llm_question_model not found in config.yml.")
-            sys.exit(1)
-        llm_question_model =  self.config["llm_question_model"]
-
-        if "question_prompt" not in self.config:
-            print("question_prompt not found in config.yml.")
+        llm_question_model, question_prompt = self._get_question_settings()
+        # only the units whose cleaned content or prompt changed since the last run need new questions
+        question_shard_store = self._get_question_shard_store(llm_question_model, question_prompt)
+        unit_keys = set()
+        unchanged_count = 0
+        generated_count = 0
+        # the units are streamed from the cleaned course material, stream_window_units at a time, their questions go to their shard.
+        # a batch job takes them all at once, one job per window would wait for each job in turn
+        window_size = None if batch else self.stream_window_units
+        for units in self.course_material_store.iter_unit_windows(cleaned_course_path, window_size):
+            unit_contents = list(dict.fromkeys(unit.unit_content for unit in units))
+            unit_keys.update(question_shard_store.key(content) for content in unit_contents)
+            changed_contents = [content for content in unit_contents if not question_shard_store.has(content)]
+            unchanged_count += len(unit_contents) - len(changed_contents)
+            generated_count += len(changed_contents)
+            if changed_contents:
+                new_unit_questions = self._generate_unit_questions(changed_contents, llm_question_model, question_prompt, batch)
+                for content, questions in new_unit_questions.items():
+                    question_shard_store.put(content, questions)
+        print(f"{unchanged_count} units unchanged since the last run, generated questions for {generated_count} units.")
+        question_shard_store.prune_keys(unit_keys)
+
+        self._write_questions_from_shards(cleaned_course_path, question_shard_store)
+
+        print(f"Question generation has consumed {self.input_token_count} input tokens and {self.output_token_count} output tokens.")
+        if self.llm_cache is not None:
+            print(self.llm_cache.summary())
+
+    @telemetry_stage("pipeline")
+    @closes_llm_session
+    def run_pipeline(self, certification_url, **scrap_options):
+        """
+        Streams each unit through scraping, cleaning and question generation. The three stages run at the same time,
+        connected by bounded queues, and write the same files as scrap-only, clean-only and generate-questions.
+        """
+        self.input_token_count = 0
+        self.output_token_count = 0
+        llm_cleaning_model, cleaning_prompt = self._get_cleaning_settings()
+        llm_question_model, question_prompt = self._get_question_settings()
+        question_shard_store = self._get_question_shard_store(llm_question_model, question_prompt)
+        queue_size = self.config.get("pipeline_queue_size", 32)
+        scrapped_contents = queue.Queue(maxsize=queue_size)
+        llm_stages_failed = threading.Event()
+        cleaned_contents = {}
+        unit_questions = {}
+
+        def put_scrapped_content(content):
+            # blocks the scrap while the queue is full, unless the LLM stages stopped reading it
+            while not llm_stages_failed.is_set():
+                try:
+                    scrapped_contents.put(content, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scrap_stage():
+            try:
+                return self.scrap(certification_url, on_unit_scrapped=lambda unit: put_scrapped_content(unit.unit_content), **scrap_options)
+            finally:
+                # no more units are coming, even if the scrap failed
+                put_scrapped_content(None)
+
+        async def run_stages():
+            loop = asyncio.get_running_loop()
+            llm_semaphore = asyncio.Semaphore(self.llm_executor.max_concurrency)
+            contents_to_clean = asyncio.Queue(maxsize=queue_size)
+            contents_to_questionify = asyncio.Queue(maxsize=queue_size)
+            scrap_future = loop.run_in_executor(None, scrap_stage)
+
+            async def feed_cleaning_stage():
+                while True:
+                    content = await loop.run_in_executor(None, scrapped_contents.get)
+                    if content is None:
+                        break
+                    if content not in cleaned_contents:
+                        cleaned_contents[content] = None
+                        await contents_to_clean.put(content)
+
+            async def cleaning_worker():
+                while True:
+                    content = await contents_to_clean.get()
+                    if content is None:
+                        break
+                    async with llm_semaphore:
+                        cleaned_contents[content] = await self._get_azure_openai_response(llm_cleaning_model, cleaning_prompt, content, operation="cleaning")
+                    if cleaned_contents[content] not in unit_questions:
+                        unit_questions[cleaned_contents[content]] = None
+                        await contents_to_questionify.put(cleaned_contents[content])
+
+            async def question_worker():
+                while True:
+                    content = await contents_to_questionify.get()
+                    if content is None:
+                        break
+                    unit_questions[content] = question_shard_store.get(content)
+                    if unit_questions[content] is None:
+                        async with llm_semaphore:
+                            unit_questions[content] = await self._get_azure_openai_response_structured_output(llm_question_model, question_prompt, content, Questions, operation="questions")
+                        question_shard_store.put(content, unit_questions[content])
+
+            cleaning_workers = [asyncio.create_task(cleaning_worker()) for _ in range(self.llm_executor.max_concurrency)]
+            question_workers = [asyncio.create_task(question_worker()) for _ in range(self.llm_executor.max_concurrency)]
+            try:
+                await feed_cleaning_stage()
+                for _ in cleaning_workers:
+                    await contents_to_clean.put(None)
+                await asyncio.gather(*cleaning_workers)
+                for _ in question_workers:
+                    await contents_to_questionify.put(None)
+                await asyncio.gather(*question_workers)
+            except BaseException:
+                llm_stages_failed.set()
+                print(f"{RED}The LLM stages failed, waiting for the scrap to complete so the course material is saved.{RESET}")
+                raise
+            return await scrap_future
+
+        certification = self.llm_executor.run_coroutine(run_stages())
+        from scrapper.course_structure.Certification import Certification
+        # the scrapped certification keeps the official content, the cleaned course is a copy of it
+        cleaned_certification = Certification.from_dict(certification.to_dict())
+        self._write_cleaned_course(cleaned_certification, cleaned_contents)
+        question_shard_store.prune([unit.unit_content for unit in cleaned_certification.get_units()])
+        self._write_questions(cleaned_certification, unit_questions)
+
+        print(f"The pipeline has consumed {self.input_token_count} input tokens and {self.output_token_count} output tokens.")
+        if self.llm_cache is not None:
+            print(self.llm_cache.summary())
+        print(f"{GREEN}Pipeline completed successfully.{RESET}")
+
+    def write_telemetry_report(self, command):
+        """Writes the measures of the run as <command>.json and <command>.prom in the telemetry directory of the certification."""
+        json_path, prometheus_path = run_telemetry.write(self._get_course_material_dir(Course.DIRECTORY_TELEMETRY), command)
+        print(f"Run report written to {json_path} and {prometheus_path}")
+
+    def convert_course_material(self, format_name):
+        """Rewrites the official and cleaned course material of the certification in another format, YAML for instance."""
+        converted = False
+        for directory_name in [Course.DIRECTORY_OFFICIAL_COURSE, Course.DIRECTORY_CLEANED_COURSE]:
+            file_path = self.course_material_store.find(self._get_course_material_dir(directory_name), self.certification_code)
+            if file_path is None:
+                continue
+            converted = True
+            if CourseMaterialStore.detect_format(file_path).NAME == format_name:
+                print(f"{file_path} is already in {format_name} format.")
+                continue
+            converted_file_path = self.course_material_store.convert(file_path, format_name)
+            print(f"Converted {file_path} to {converted_file_path}")
+        if not converted:
+            print(f"{RED}No course material found for {self.certification_code}.{RESET}")
+            print(' Please run the scrap-only command first.')
             sys.exit(1)
-        question_prompt =  self.config["question_prompt"]
-
-        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_CLEANED_COURSE}/{self.official_course_file_name}', 'r') as file:
-            cleaned_content = yaml.safe_load(file)
-        certification = Certification.from_dict(cleaned_content)
-
-        def llm_questionify_func(text):
-            return self._get_azure_openai_response_structured_output(llm_question_model, question_prompt, text, Questions)
-        
-        questions = certification.generate_questions(llm_questionify_func)
-        print(questions)
-        certificationQuestions = CertificationQuestions(certification_title=f'{self.certification_code} - {self.certification_title}', questions=questions)
-        # write questions to a single json file
-        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}', 'w') as file:
-            json.dump(certificationQuestions.model_dump(), file, indent=4)
+        print(f"{GREEN}Conversion completed successfully.{RESET}")
 
     def run_webserver_locally(self):
         # check if questions.json exist for the certification
@@ -209,24 +662,31 @@ class Course:
             print(f"File not found: ../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}")
             print(' Please run the generate_questions command first.')
             sys.exit(1)
-        # copy questions.json to web/public
-        with open(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}', 'r') as file:
-            questions = json.load(file)
-        with open(f'./{Course.WEB_DIRECTORY}/{Course.QUESTION_FILENAME}', 'w') as file:
-            json.dump(questions, file, indent=4)
+        # write the questions manifest and the learning path files to web/public
+        self._write_web_question_files(f'./{Course.WEB_DIRECTORY}')
+        print(f"Precompressed {precompress_assets(f'./{Course.WEB_DIRECTORY}')} web assets.")
         handler = MyHttpRequestHandler
-        with socketserver.TCPServer(("", 8000), handler) as httpd:
-            print(f"Serving at port {8000}")
+        # each request is served in its own thread, clients of a shared session do not queue behind one another
+        with ThreadingHTTPServer(("", PORT), handler) as httpd:
+            print(f"Serving at port {PORT}")
             httpd.serve_forever()
     
+    @telemetry_stage("deploy")
     def deploy_questions_on_azure(self):
         # check if directory exists
         if not os.path.exists(f'./{Course.WEB_DIRECTORY}'):
             print(f"{RED} web Directory not found: ./{Course.WEB_DIRECTORY}{RESET}")
             print(' Please run the generate_questions command first.')
             sys.exit(1)
+        if not os.path.exists(f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}'):
+            print(f"{RED}File not found: ../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.QUESTION_FILENAME}{RESET}")
+            print(' Please run the generate_questions command first.')
+            sys.exit(1)
+        web_question_dir_path = f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}/{Course.DIRECTORY_WEB_QUESTIONS}'
+        self._write_web_question_files(web_question_dir_path)
+        from deploy.deploy import Deploy
         deploy = Deploy()
-        deploy.deploy(question_dir_path=f'../microsoft_certifications/{self.certification_code}/{Course.DIRECTORY_QUESTIONS}', question_file_name=Course.QUESTION_FILENAME)
+        deploy.deploy(question_dir_path=web_question_dir_path)
 
     '''
     def speechify(self):
@@ -1,11 +1,19 @@
 import os
 import sys
+import time
+import gzip
+import json
 import yaml
+import hashlib
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from azure.identity import DefaultAzureCredential
 from azure.core.exceptions import ResourceNotFoundError
 from azure.mgmt.storage import StorageManagementClient
 from azure.storage.blob import BlobServiceClient, ContentSettings, StaticWebsite
 
+from telemetry.run_telemetry import run_telemetry
+
 # Define ANSI escape codes for colors
 GREEN = "\033[92m"
 RED = "\033[91m"
@@ -13,6 +21,15 @@ RESET = "\033[0m"
 
 
 class Deploy:
+    WEB_DIRECTORY = "./web/public"
+    CONTAINER_NAME = "$web"
+    # the quiz itself, error.html is the 404 page of the static website when there is one
+    STATIC_ASSETS = ("index.html", "error.html", "script.js", "styles.css")
+    MANIFEST_FILENAME = "questions.json"
+    COMPRESSIBLE_SUFFIXES = (".html", ".css", ".js", ".json", ".svg", ".txt")
+    # the files are not fingerprinted, browsers keep them but revalidate them on every use
+    CACHE_CONTROL = "no-cache"
+
     def __init__(self):
         # Determine the directory of the current script
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -24,33 +41,36 @@ class Deploy:
         except FileNotFoundError:
             print("deploy.yml file not found.")
             sys.exit(1)
-        if not self.config.get("subscription_id"):
-            print(f"{RED}subscription_id not found in configuration file{RESET}")
+        # a connection string targets an existing storage account directly, Azurite for instance
+        self.connection_string = self.config.get("connection_string")
+        self.upload_workers = self.config.get("upload_workers", 8)
+        self.content_encoding = self.config.get("content_encoding")
+        if self.content_encoding not in (None, "gzip"):
+            print(f"{RED}content_encoding must be gzip or left empty in configuration file{RESET}")
             exit = True
+        if not self.connection_string:
+            if not self.config.get("subscription_id"):
+                print(f"{RED}subscription_id not found in configuration file{RESET}")
+                exit = True
+            if not self.config.get("resource_group_name"):
+                print(f"{RED}resource_group_name not found in configuration file{RESET}")
+                exit = True
+            if not self.config.get("storage_account_name"):
+                print(f"{RED}storage_account_name not found in configuration file{RESET}")
+                exit = True
+            if not self.config.get("location"):
+                print(f"{RED}location not found in configuration file{RESET}")
+                exit = True
         self.subscription_id = self.config.get("subscription_id")
-        if not self.config.get("resource_group_name"):
-            print(f"{RED}resource_group_name not found in configuration file{RESET}")
-            exit = True
         self.resource_group_name = self.config.get("resource_group_name")
-        if not self.config.get("storage_account_name"):
-            print(f"{RED}storage_account_name not found in configuration file{RESET}")
-            exit = True
         self.storage_account_name = self.config.get("storage_account_name")
-        if not self.config.get("location"):
-            print(f"{RED}location not found in configuration file{RESET}")
-            exit = True
         self.location = self.config.get("location")
 
         if exit:
             sys.exit(1)
 
-    def deploy(self, question_dir_path, question_file_name):
-
-
-
-        # Authenticate with Azure
-        print(f"Authenticating with Azure...{RESET}")
-        credential = DefaultAzureCredential(exclude_interactive_browser_credential=False)
+    def _prepare_storage_account(self, credential):
+        """Creates the storage account if needed and returns the endpoint of its static website."""
         storage_client = StorageManagementClient(credential, self.subscription_id)
 
         # Check if the storage account already exists
@@ -59,9 +79,6 @@ class Deploy:
                 self.resource_group_name, self.storage_account_name
             )
             print(f"Storage account {self.storage_account_name} does exists.{RESET}")
-            properties = storage_client.blob_services.get_service_properties(self.resource_group_name, self.storage_account_name)
-            # check if the account has Storage blob data contrubutor role assigned
-
         except ResourceNotFoundError:
             print(f"Storage account {self.storage_account_name} does not exist. Creating it now...{RESET}")
             # Create the storage account
@@ -75,55 +92,131 @@ class Deploy:
                     "properties": {"isHnsEnabled": False},
                 },
             )
-        
-        blob_service_client = BlobServiceClient(
-            account_url=f"https://{self.storage_account_name}.blob.core.windows.net",
-            credential=credential,
-        )
-        properties = storage_client.blob_services.get_service_properties(self.resource_group_name, self.storage_account_name)
+            storage_account = storage_async_operation.result()
+        return storage_account.primary_endpoints.web
+
+    def _get_container_client(self, blob_service_client):
         static_website = StaticWebsite(enabled=True, index_document="index.html", error_document404_path="error.html")
         blob_service_client.set_service_properties(static_website=static_website)
 
-
-        # Create a BlobServiceClient
-        blob_service_client = BlobServiceClient(
-            account_url=f"https://{self.storage_account_name}.blob.core.windows.net",
-            credential=credential,
-        )
-
         # check if the container already exists
+        container_client = blob_service_client.get_container_client(Deploy.CONTAINER_NAME)
         try:
-            container_client = blob_service_client.get_container_client("$web")
             container_client.get_container_properties()
-            print(f"Container $web already exists.")
+            print(f"Container {Deploy.CONTAINER_NAME} already exists.")
         except ResourceNotFoundError:
-            print(f"Container $web does not exist. Creating it now...")
+            print(f"Container {Deploy.CONTAINER_NAME} does not exist. Creating it now...")
             container_client.create_container()
-            print(f"Container $web created successfully.")
-
-        # Upload static files to the container
-        local_path = "./web"
-        for root, dirs, files in os.walk(local_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                blob_client = container_client.get_blob_client(file)
-                with open(file_path, "rb") as data:
-                    blob_client.upload_blob(
-                        data,
-                        overwrite=True,
-                        content_settings=ContentSettings(content_type="text/html"),
-                    )
-        print(question_dir_path)
-        print(question_file_name)
-        question_file_path = os.path.join(question_dir_path, question_file_name)
-        blob_client = container_client.get_blob_client(question_file_name)
-        with open(question_file_path, "rb") as data:
-            print(f"Uploading {question_file_path} to the container...")
-            blob_client.upload_blob(
-                data=data,
-                overwrite=True,
-                content_settings=ContentSettings(content_type="application/json"))
-
-        # Get the primary endpoint for the static website
-        primary_endpoint = storage_account.primary_endpoints.web
-        print(f"{GREEN}Static website is available at: {primary_endpoint}{RESET}")
\ No newline at end of file
+            print(f"Container {Deploy.CONTAINER_NAME} created successfully.")
+        return container_client
+
+    @staticmethod
+    def _collect_files(question_dir_path):
+        """
+        Returns the local path of each file to deploy keyed by blob name: the static assets of the web directory,
+        the questions manifest and the learning path files it lists. Other files of the web directory are left out.
+        """
+        files = {}
+        for asset in Deploy.STATIC_ASSETS:
+            asset_path = os.path.join(Deploy.WEB_DIRECTORY, asset)
+            if os.path.exists(asset_path):
+                files[asset] = asset_path
+        manifest_path = os.path.join(question_dir_path, Deploy.MANIFEST_FILENAME)
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+        files[Deploy.MANIFEST_FILENAME] = manifest_path
+        for learning_path in manifest["learning_paths"]:
+            files[learning_path["file"]] = os.path.join(question_dir_path, learning_path["file"])
+        return files
+
+    def _prepare_upload(self, blob_name, file_path):
+        """Returns the bytes to upload for a file and their content settings, with the MD5 the blob will be compared with."""
+        with open(file_path, "rb") as file:
+            data = file.read()
+        content_type = mimetypes.guess_type(blob_name)[0] or "application/octet-stream"
+        content_encoding = None
+        if self.content_encoding == "gzip" and blob_name.endswith(Deploy.COMPRESSIBLE_SUFFIXES):
+            # mtime=0 so that unchanged content compresses to the same bytes and MD5
+            data = gzip.compress(data, compresslevel=9, mtime=0)
+            content_encoding = "gzip"
+        content_settings = ContentSettings(
+            content_type=content_type,
+            content_encoding=content_encoding,
+            cache_control=Deploy.CACHE_CONTROL,
+            content_md5=bytearray(hashlib.md5(data).digest()),
+        )
+        return data, content_settings
+
+    @staticmethod
+    def _is_unchanged(blob_properties, content_settings):
+        if blob_properties is None:
+            return False
+        blob_content_settings = blob_properties.content_settings
+        return (
+            blob_content_settings.content_md5 is not None
+            and bytes(blob_content_settings.content_md5) == bytes(content_settings.content_md5)
+            and blob_content_settings.content_type == content_settings.content_type
+            and blob_content_settings.content_encoding == content_settings.content_encoding
+        )
+
+    def upload_changed_files(self, container_client, files):
+        """Uploads in parallel the files whose content or settings differ from their blob, returns the number of uploaded and unchanged files."""
+        blobs = {blob.name: blob for blob in container_client.list_blobs()}
+
+        def upload(blob_name):
+            data, content_settings = self._prepare_upload(blob_name, files[blob_name])
+            if Deploy._is_unchanged(blobs.get(blob_name), content_settings):
+                run_telemetry.increment("deploy_files_total", result="unchanged")
+                return False
+            upload_start = time.perf_counter()
+            container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True, content_settings=content_settings)
+            run_telemetry.observe("deploy_upload_seconds", time.perf_counter() - upload_start)
+            run_telemetry.increment("deploy_files_total", result="uploaded")
+            run_telemetry.increment("deploy_uploaded_bytes_total", len(data))
+            print(f"Uploaded {blob_name} ({content_settings.content_type}{', ' + content_settings.content_encoding if content_settings.content_encoding else ''}).")
+            return True
+
+        # the container client and its connection pool are shared by the upload threads
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            uploaded = list(executor.map(upload, sorted(files)))
+        uploaded_count = sum(uploaded)
+        return uploaded_count, len(uploaded) - uploaded_count
+
+    def delete_stale_blobs(self, container_client, files):
+        """Deletes in parallel the blobs that are not in files, left by a previous deployment, returns their number."""
+        stale_blob_names = sorted(blob.name for blob in container_client.list_blobs() if blob.name not in files)
+
+        def delete(blob_name):
+            container_client.delete_blob(blob_name)
+            run_telemetry.increment("deploy_files_total", result="deleted")
+            print(f"Deleted {blob_name}.")
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            list(executor.map(delete, stale_blob_names))
+        return len(stale_blob_names)
+
+    def deploy(self, question_dir_path):
+        if self.connection_string:
+            blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            primary_endpoint = None
+        else:
+            # Authenticate with Azure
+            print(f"Authenticating with Azure...{RESET}")
+            credential = DefaultAzureCredential(exclude_interactive_browser_credential=False)
+            primary_endpoint = self._prepare_storage_account(credential)
+            blob_service_client = BlobServiceClient(
+                account_url=f"https://{self.storage_account_name}.blob.core.windows.net",
+                credential=credential,
+            )
+        container_client = self._get_container_client(blob_service_client)
+
+        files = Deploy._collect_files(question_dir_path)
+        uploaded_count, unchanged_count = self.upload_changed_files(container_client, files)
+        # deleted once the new manifest is uploaded, the site never lists a learning path file that is gone
+        deleted_count = self.delete_stale_blobs(container_client, files)
+        print(f"{uploaded_count} files uploaded, {unchanged_count} files unchanged, {deleted_count} stale files deleted.")
+
+        if primary_endpoint:
+            print(f"{GREEN}Static website is available at: {primary_endpoint}{RESET}")
+        else:
+            print(f"{GREEN}Static website deployed.{RESET}")
@@ -0,0 +1,84 @@
+import os
+import json
+import asyncio
+
+
+class LLMBatchJob:
+    """
+    Submits chat completion requests as a single Azure OpenAI batch job and waits for its results.
+    The requests are written to a JSONL batch file, one line per request identified by its custom_id.
+    """
+    ENDPOINT = "/chat/completions"
+    TERMINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+
+    def __init__(self, llm_client, batch_file_path, poll_interval_seconds=60, run_coroutine=asyncio.run):
+        self.llm_client = llm_client
+        # the event loop llm_client is used on, LLMExecutor.run_coroutine when the client is shared with online requests
+        self.run_coroutine = run_coroutine
+        self.batch_file_path = batch_file_path
+        self.poll_interval_seconds = poll_interval_seconds
+
+    @staticmethod
+    def response_format(output_format):
+        """The json_schema response_format of a pydantic model in strict mode, as the structured output of an online request sends it."""
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": output_format.__name__, "schema": LLMBatchJob._strict_schema(output_format.model_json_schema()), "strict": True},
+        }
+
+    @staticmethod
+    def _strict_schema(schema):
+        # strict mode wants every property required and no other property, in every object of the schema including its $defs
+        if isinstance(schema, list):
+            return [LLMBatchJob._strict_schema(item) for item in schema]
+        if not isinstance(schema, dict):
+            return schema
+        schema = {key: LLMBatchJob._strict_schema(value) for key, value in schema.items()}
+        if schema.get("type") == "object":
+            schema["additionalProperties"] = False
+            schema["required"] = list(schema.get("properties", {}))
+        return schema
+
+    def run(self, requests):
+        """requests is a list of (custom_id, body), returns the response body of each successful request keyed by custom_id."""
+        return self.run_coroutine(self._run(requests))
+
+    def _write_batch_file(self, requests):
+        directory = os.path.dirname(self.batch_file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.batch_file_path, "w", encoding="utf-8") as file:
+            for custom_id, body in requests:
+                line = {"custom_id": custom_id, "method": "POST", "url": LLMBatchJob.ENDPOINT, "body": body}
+                file.write(json.dumps(line) + "\n")
+
+    async def _run(self, requests):
+        self._write_batch_file(requests)
+        with open(self.batch_file_path, "rb") as file:
+            batch_file = await self.llm_client.files.create(file=file, purpose="batch")
+        batch = await self.llm_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=LLMBatchJob.ENDPOINT,
+            completion_window="24h",
+        )
+        print(f"Batch job {batch.id} submitted with {len(requests)} requests.")
+        while batch.status not in LLMBatchJob.TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval_seconds)
+            batch = await self.llm_client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            progress = f" ({counts.completed}/{counts.total} completed, {counts.failed} failed)" if counts else ""
+            print(f"Batch job {batch.id}: {batch.status}{progress}")
+
+        results = {}
+        if batch.output_file_id:
+            output = await self.llm_client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response")
+                if result.get("error") is None and response and response.get("status_code") == 200:
+                    results[result["custom_id"]] = response["body"]
+        if batch.status != "completed":
+            print(f"Batch job {batch.id} ended with status {batch.status}.")
+        return results
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of the LLM responses, keyed by a hash of the model, the system prompt, the content and the response format.
+    The least recently used responses are evicted when the cache grows over max_size_bytes.
+    """
+    def __init__(self, database_path, max_size_bytes):
+        directory = os.path.dirname(database_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.max_size_bytes = max_size_bytes
+        self.hit_count = 0
+        self.miss_count = 0
+        self.evicted_count = 0
+        # the certifications of a catalog refresh share the cache from several processes, a writer waits for the others
+        self.connection = sqlite3.connect(database_path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.connection.commit()
+        self.size_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(llm_model, system_prompt, content, response_format=None):
+        # the json schema of a pydantic response format changes whenever a field of the model changes
+        format_description = json.dumps(response_format.model_json_schema(), sort_keys=True) if response_format is not None else "text"
+        payload = json.dumps([llm_model, system_prompt, content, format_description])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.miss_count += 1
+            return None
+        self.hit_count += 1
+        self.connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.connection.commit()
+        return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode("utf-8"))
+        previous = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if previous is not None:
+            self.size_bytes -= previous[0]
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, response, size, time.time()))
+        self.size_bytes += size
+        self._evict()
+        self.connection.commit()
+
+    def _evict(self):
+        while self.size_bytes > self.max_size_bytes:
+            row = self.connection.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.size_bytes -= row[1]
+            self.evicted_count += 1
+
+    def summary(self):
+        return f"LLM cache: {self.hit_count} hits, {self.miss_count} misses, {self.evicted_count} evicted, {self.size_bytes / 1024 / 1024:.1f} MB stored."
+
+    def close(self):
+        self.connection.close()
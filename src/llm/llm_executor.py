@@ -0,0 +1,47 @@
+import asyncio
+
+
+class LLMExecutor:
+    """
+    Sends LLM requests concurrently on an asyncio event loop, with at most max_concurrency requests in flight.
+    Identical contents are only sent once.
+    Every call runs on the same event loop, the async client and its pooled connections are bound to the loop they were first used on.
+    """
+    def __init__(self, max_concurrency=8):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self._loop = None
+
+    def run_coroutine(self, coroutine):
+        """Runs coroutine to completion on the event loop of the executor, started on first use and kept until close."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+
+    def run(self, request_coroutine, contents):
+        """Awaits request_coroutine(content) for each distinct content, returns the responses keyed by content."""
+        distinct_contents = list(dict.fromkeys(contents))
+        responses = self.run_coroutine(self._gather(request_coroutine, distinct_contents))
+        return dict(zip(distinct_contents, responses))
+
+    async def _gather(self, request_coroutine, contents):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(content):
+            async with semaphore:
+                return await request_coroutine(content)
+
+        # gather returns the responses in the order of contents
+        return await asyncio.gather(*(limited(content) for content in contents))
+
+    def close(self):
+        """Closes the event loop, as asyncio.run does. The next call starts a new one."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        finally:
+            self._loop.close()
+            self._loop = None
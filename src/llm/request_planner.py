@@ -0,0 +1,118 @@
+import re
+
+
+class RequestPlan:
+    """
+    Requests planned for a list of unit contents, and the way back from their responses to each content.
+    A request text is either a content on its own, several small contents packed together or a chunk of an oversized content.
+    """
+    def __init__(self):
+        self.single_requests = []
+        # packed request text -> contents in the order of their ids in the request
+        self.packed_requests = {}
+        # content -> chunks, in order
+        self.split_requests = {}
+
+    def request_texts(self):
+        texts = list(self.single_requests) + list(self.packed_requests)
+        for chunks in self.split_requests.values():
+            texts.extend(chunks)
+        return texts
+
+    def is_packed(self, request_text):
+        return request_text in self.packed_requests
+
+    def assemble(self, responses, unpack, merge):
+        """
+        Maps the responses, keyed by request text, back to the contents.
+        unpack turns the response of a packed request into a dict of responses keyed by unit id,
+        merge joins the responses of the chunks of a split content.
+        Contents whose response cannot be found in their packed response are left out, the caller sends them on their own.
+        """
+        responses_by_content = {}
+        for content in self.single_requests:
+            responses_by_content[content] = responses[content]
+        for request_text, contents in self.packed_requests.items():
+            unpacked_responses = unpack(responses[request_text])
+            for unit_id, content in enumerate(contents, start=1):
+                if str(unit_id) in unpacked_responses:
+                    responses_by_content[content] = unpacked_responses[str(unit_id)]
+        for content, chunks in self.split_requests.items():
+            responses_by_content[content] = merge([responses[chunk] for chunk in chunks])
+        return responses_by_content
+
+
+class RequestPlanner:
+    """
+    Packs small units together into a single request up to a token budget and splits oversized units into several requests.
+    Tokens are estimated from the length of the text, about 4 characters per token for English.
+    """
+    CHARACTERS_PER_TOKEN = 4
+    PACKED_TEXT_INSTRUCTIONS = (
+        "\nThe content is made of several independent units, each one between <unit id=\"...\"> and </unit> tags. "
+        "Process each unit on its own and return every unit between the same tags, with the same id."
+    )
+    PACKED_QUESTIONS_INSTRUCTIONS = (
+        "\nThe content is made of several independent units, each one between <unit id=\"...\"> and </unit> tags. "
+        "Create the questions of each unit on its own and return them with the id of their unit."
+    )
+    PACKED_UNIT_PATTERN = re.compile(r'<unit id="(\d+)">\s*(.*?)\s*</unit>', re.DOTALL)
+
+    def __init__(self, pack_unit_max_tokens, pack_request_max_tokens, split_unit_max_tokens):
+        self.pack_unit_max_tokens = pack_unit_max_tokens
+        self.pack_request_max_tokens = pack_request_max_tokens
+        self.split_unit_max_tokens = split_unit_max_tokens
+
+    @staticmethod
+    def estimate_tokens(text):
+        return len(text) // RequestPlanner.CHARACTERS_PER_TOKEN + 1
+
+    def plan(self, contents):
+        request_plan = RequestPlan()
+        pack = []
+        pack_tokens = 0
+        for content in dict.fromkeys(contents):
+            tokens = RequestPlanner.estimate_tokens(content)
+            if tokens > self.split_unit_max_tokens:
+                request_plan.split_requests[content] = self._split(content)
+            elif tokens <= self.pack_unit_max_tokens:
+                if pack and pack_tokens + tokens > self.pack_request_max_tokens:
+                    self._add_pack(request_plan, pack)
+                    pack, pack_tokens = [], 0
+                pack.append(content)
+                pack_tokens += tokens
+            else:
+                request_plan.single_requests.append(content)
+        self._add_pack(request_plan, pack)
+        return request_plan
+
+    @staticmethod
+    def _add_pack(request_plan, pack):
+        if len(pack) == 1:
+            # nothing to pack a lone small unit with
+            request_plan.single_requests.append(pack[0])
+        elif pack:
+            request_text = "\n".join(f'<unit id="{unit_id}">\n{content}\n</unit>' for unit_id, content in enumerate(pack, start=1))
+            request_plan.packed_requests[request_text] = list(pack)
+
+    def _split(self, content):
+        max_characters = self.split_unit_max_tokens * RequestPlanner.CHARACTERS_PER_TOKEN
+        chunks = []
+        chunk = ""
+        # cut between sentences, the scrapped text has no line breaks
+        for sentence in re.split(r'(?<=[.!?])', content):
+            while len(sentence) > max_characters:
+                chunks.append(chunk + sentence[:max_characters - len(chunk)])
+                sentence = sentence[max_characters - len(chunk):]
+                chunk = ""
+            if len(chunk) + len(sentence) > max_characters:
+                chunks.append(chunk)
+                chunk = ""
+            chunk += sentence
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def unpack_text(response):
+        return {unit_id: text for unit_id, text in RequestPlanner.PACKED_UNIT_PATTERN.findall(response)}
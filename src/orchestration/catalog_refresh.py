@@ -0,0 +1,241 @@
+import os
+import time
+import asyncio
+import traceback
+import multiprocessing
+from contextlib import contextmanager, asynccontextmanager, redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from storage.certification_catalog import CertificationCatalog, CATALOG_FILE_PATH
+
+# Define ANSI escape codes for colors
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+STAGE_SCRAP = "scrap"
+STAGE_CLEAN = "clean"
+STAGE_GENERATE_QUESTIONS = "generate-questions"
+STAGE_PIPELINE = "pipeline"
+STAGES = [STAGE_SCRAP, STAGE_CLEAN, STAGE_GENERATE_QUESTIONS]
+# the run report of each stage is named after the trainforcert command running the same stage
+STAGE_COMMANDS = {STAGE_SCRAP: "scrap-only", STAGE_CLEAN: "clean-only", STAGE_GENERATE_QUESTIONS: "generate-questions", STAGE_PIPELINE: "pipeline"}
+CERTIFICATIONS_DIRECTORY = "../microsoft_certifications"
+REFRESH_LOG_FILENAME = "refresh.log"
+# a certification whose worker process died is given a new process once before being reported as failed
+MAX_WORKER_CRASHES = 2
+# characters of an error shown in the summary table
+ERROR_MAX_LENGTH = 100
+
+
+class SharedSlots:
+    """
+    Counting semaphore shared by the worker processes of a catalog refresh, capacity slots of a resource used by every certification,
+    browser sessions or LLM requests in flight. Handed to the workers when they start, as multiprocessing semaphores must be.
+    """
+    POLL_INTERVAL_SECONDS = 0.05
+
+    def __init__(self, capacity, context):
+        if capacity < 1:
+            raise ValueError("SharedSlots capacity must be at least 1")
+        self.capacity = capacity
+        self._semaphore = context.BoundedSemaphore(capacity)
+        # a caller taking several slots takes them all before the next one starts, two callers never hold half of them each
+        self._lock = context.Lock()
+
+    @contextmanager
+    def hold(self, count=1):
+        count = max(1, min(count, self.capacity))
+        with self._lock:
+            for _ in range(count):
+                self._semaphore.acquire()
+        try:
+            yield
+        finally:
+            for _ in range(count):
+                self._semaphore.release()
+
+    @asynccontextmanager
+    async def hold_async(self):
+        # polled, a blocking acquire would stop the other requests of the event loop
+        while not self._semaphore.acquire(block=False):
+            await asyncio.sleep(SharedSlots.POLL_INTERVAL_SECONDS)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+# queue of the certification codes started by the workers of this process's pool, set by _init_worker
+_started_codes = None
+
+
+def _init_worker(browser_slots, llm_slots, started_codes):
+    global _started_codes
+    from course import Course
+    Course.shared_browser_slots = browser_slots
+    Course.shared_llm_slots = llm_slots
+    _started_codes = started_codes
+
+
+def _refresh_started_certification(certification_code, *args):
+    # written to the pipe before the certification runs, the parent knows it started even if its worker dies
+    _started_codes.put(certification_code)
+    return refresh_certification(certification_code, *args)
+
+
+def _run_stage(course, stage, certification_url, scrap_options, batch):
+    if stage == STAGE_SCRAP:
+        course.scrap(certification_url, **scrap_options)
+    elif stage == STAGE_CLEAN:
+        course.clean(batch=batch)
+    elif stage == STAGE_GENERATE_QUESTIONS:
+        course.generate_questions(batch=batch)
+    else:
+        course.run_pipeline(certification_url, **scrap_options)
+
+
+def refresh_certification(certification_code, stages, scrap_options, batch=False, catalog_path=CATALOG_FILE_PATH):
+    """
+    Runs the stages of one certification in a worker process, with its output in the refresh.log of the certification.
+    A failing stage, including a sys.exit of the course, stops this certification only and is reported in the returned result.
+    """
+    from course import Course
+    from telemetry.run_telemetry import run_telemetry
+    start = time.perf_counter()
+    certification_directory = os.path.join(CERTIFICATIONS_DIRECTORY, certification_code)
+    os.makedirs(certification_directory, exist_ok=True)
+    result = {
+        "certification_code": certification_code,
+        "succeeded": False,
+        "stages": {},
+        "failed_stage": None,
+        "error": None,
+        "seconds": None,
+        "log": os.path.join(certification_directory, REFRESH_LOG_FILENAME),
+    }
+    with open(result["log"], "w", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        stage = None
+        try:
+            entry = CertificationCatalog(catalog_path).get(certification_code)
+            if entry is None:
+                raise ValueError(f"Certification code {certification_code} not found in {catalog_path}")
+            course = Course(certification_code, entry["certification_title"])
+            for stage in stages:
+                print(f"Running {stage} for certification: {certification_code}")
+                # each stage has its own run report, as when it is run by its own command
+                run_telemetry.reset()
+                stage_start = time.perf_counter()
+                try:
+                    _run_stage(course, stage, entry["course_path"], scrap_options, batch)
+                finally:
+                    course.write_telemetry_report(STAGE_COMMANDS[stage])
+                result["stages"][stage] = round(time.perf_counter() - stage_start, 1)
+            result["succeeded"] = True
+        except (Exception, SystemExit) as e:
+            result["failed_stage"] = stage
+            result["error"] = f"exit status {e.code}" if isinstance(e, SystemExit) else CatalogRefresh.short_error(e)
+            traceback.print_exc()
+    result["seconds"] = round(time.perf_counter() - start, 1)
+    return result
+
+
+class CatalogRefresh:
+    """
+    Refreshes several certifications of the catalog, each one in its own worker process, processes certifications at a time.
+    Every certification shares the same max_browser_sessions browser sessions and max_llm_concurrency LLM requests in flight.
+    """
+    def __init__(self, certification_codes, stages=STAGES, processes=2, max_browser_sessions=4, max_llm_concurrency=8, scrap_options=None, batch=False, catalog_path=CATALOG_FILE_PATH):
+        # the codes as written in the catalog, the course directories are named after them, unknown codes fail in their worker
+        catalog = CertificationCatalog(catalog_path)
+        entries = [catalog.get(code) for code in certification_codes]
+        certification_codes = [entry["certification_id"] if entry is not None else code for code, entry in zip(certification_codes, entries)]
+        # a certification listed twice is only refreshed once
+        self.certification_codes = list(dict.fromkeys(certification_codes))
+        self.stages = stages
+        self.processes = max(1, min(processes, len(self.certification_codes)))
+        self.max_browser_sessions = max_browser_sessions
+        self.max_llm_concurrency = max_llm_concurrency
+        self.scrap_options = scrap_options if scrap_options is not None else {}
+        self.batch = batch
+        self.catalog_path = catalog_path
+
+    def run(self):
+        """Returns the result of each certification, in the order of certification_codes."""
+        os.makedirs(CERTIFICATIONS_DIRECTORY, exist_ok=True)
+        results = {}
+        crashes = {}
+        pending_codes = list(self.certification_codes)
+        while pending_codes:
+            # spawned workers, each certification in a new process, and new slots: a dead worker may have kept some
+            context = multiprocessing.get_context("spawn")
+            browser_slots = SharedSlots(self.max_browser_sessions, context)
+            llm_slots = SharedSlots(self.max_llm_concurrency, context)
+            started_codes = context.SimpleQueue()
+            started = set()
+            crashed_codes = []
+            with ProcessPoolExecutor(max_workers=min(self.processes, len(pending_codes)), mp_context=context, initializer=_init_worker,
+                                     initargs=(browser_slots, llm_slots, started_codes), max_tasks_per_child=1) as executor:
+                futures = {executor.submit(_refresh_started_certification, code, self.stages, self.scrap_options, self.batch, self.catalog_path): code
+                           for code in pending_codes}
+                for future in as_completed(futures):
+                    code = futures[future]
+                    try:
+                        results[code] = future.result()
+                    except BrokenProcessPool:
+                        while not started_codes.empty():
+                            started.add(started_codes.get())
+                        if code not in started:
+                            # still queued when the pool broke, it never ran and is started again without counting a crash
+                            crashed_codes.append(code)
+                            continue
+                        # the pool cannot tell which worker died, every certification that was running is started again
+                        crashes[code] = crashes.get(code, 0) + 1
+                        if crashes[code] < MAX_WORKER_CRASHES:
+                            crashed_codes.append(code)
+                            continue
+                        results[code] = {"certification_code": code, "succeeded": False, "stages": {}, "failed_stage": None,
+                                         "error": "worker process died", "seconds": None,
+                                         "log": os.path.join(CERTIFICATIONS_DIRECTORY, code, REFRESH_LOG_FILENAME)}
+                    CatalogRefresh._print_progress(results[code], len(results), len(self.certification_codes))
+            pending_codes = crashed_codes
+            if pending_codes:
+                print(f"{RED}A worker process died, restarting {len(pending_codes)} certifications{RESET}")
+        return [results[code] for code in self.certification_codes]
+
+    @staticmethod
+    def short_error(exception):
+        # the first line only, the traceback is in the log of the certification
+        lines = str(exception).strip().splitlines()
+        message = f"{type(exception).__name__}: {lines[0] if lines else ''}"
+        return message if len(message) <= ERROR_MAX_LENGTH else message[:ERROR_MAX_LENGTH - 3] + "..."
+
+    @staticmethod
+    def _print_progress(result, done_count, total_count):
+        if result["succeeded"]:
+            print(f"{GREEN}[{done_count}/{total_count}] {result['certification_code']} refreshed in {result['seconds']}s{RESET}")
+        else:
+            print(f"{RED}[{done_count}/{total_count}] {result['certification_code']} failed: {result['error']}, see {result['log']}{RESET}")
+
+    def print_summary(self, results):
+        stage_width = max(len(stage) for stage in self.stages) + 2
+        code_width = max(len("certification"), *(len(result["certification_code"]) for result in results)) + 2
+        print(f"{'certification':<{code_width}}{'status':<8}" + "".join(f"{stage:>{stage_width}}" for stage in self.stages) + f"{'total s':>10}  error")
+        for result in results:
+            stage_cells = []
+            for stage in self.stages:
+                if stage in result["stages"]:
+                    stage_cells.append(f"{result['stages'][stage]:>{stage_width}.1f}")
+                else:
+                    stage_cells.append(f"{'failed' if stage == result['failed_stage'] else '-':>{stage_width}}")
+            color = GREEN if result["succeeded"] else RED
+            status = "ok" if result["succeeded"] else "failed"
+            total = f"{result['seconds']:.1f}" if result["seconds"] is not None else "-"
+            error = f"  {result['error']} ({result['log']})" if result["error"] else ""
+            print(f"{color}{result['certification_code']:<{code_width}}{status:<8}" + "".join(stage_cells) + f"{total:>10}{error}{RESET}")
+        failed_count = sum(not result["succeeded"] for result in results)
+        if failed_count:
+            print(f"{RED}{failed_count} of {len(results)} certifications failed.{RESET}")
+        else:
+            print(f"{GREEN}{len(results)} certifications refreshed.{RESET}")
@@ -10,6 +10,13 @@ class Question(BaseModel):
 class Questions(BaseModel):
     questions: list[Question]
 
+class UnitQuestions(BaseModel):
+    unit_id: str
+    questions: list[Question]
+
+class PackedUnitQuestions(BaseModel):
+    units: list[UnitQuestions]
+
 class LearningPathQuestions(BaseModel):
     learning_path_title: str
     questions: list[Question]
@@ -17,3 +24,12 @@ class LearningPathQuestions(BaseModel):
 class CertificationQuestions(BaseModel):
     certification_title: str
     questions: list[LearningPathQuestions]
+
+class LearningPathQuestionsFile(BaseModel):
+    learning_path_title: str
+    question_count: int
+    file: str
+
+class CertificationQuestionsManifest(BaseModel):
+    certification_title: str
+    learning_paths: list[LearningPathQuestionsFile]
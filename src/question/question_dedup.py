@@ -0,0 +1,120 @@
+import re
+import hashlib
+
+from question.question import CertificationQuestions, LearningPathQuestions
+
+
+def _probe_orders(signature_length):
+    """For each bin, the other bins in a pseudo-random order, the same for every question so that two questions with the same filled bins borrow alike."""
+    return [sorted((probed_bin for probed_bin in range(signature_length) if probed_bin != bin_index),
+                   key=lambda probed_bin: hashlib.blake2b(f"{bin_index}:{probed_bin}".encode("utf-8"), digest_size=8).digest())
+            for bin_index in range(signature_length)]
+
+
+class QuestionDeduplicator:
+    """
+    Removes the near-duplicate questions of a certification, keeping the first one in document order.
+    Each question is reduced to the set of character 4-grams of its text and correct answer, which survives rewordings such as
+    "recommended for participants" and "beneficial for participants". The MinHash signature of that set is split into bands indexed
+    in hash tables (locality-sensitive hashing), only the questions sharing a band with a kept question are compared with it.
+    """
+    WORD_PATTERN = re.compile(r"[a-z0-9]+")
+    SHINGLE_SIZE = 4
+    # one permutation hashing: a single hash per shingle, its low bits pick one of the bins of the signature, which keeps the smallest hash it receives
+    SIGNATURE_LENGTH = 64
+    EMPTY_BIN = 1 << 64
+    # hashes are 64-bit values divided by SIGNATURE_LENGTH, they are all below BIN_RANGE
+    BIN_RANGE = (1 << 64) // SIGNATURE_LENGTH
+    PROBE_ORDERS = _probe_orders(SIGNATURE_LENGTH)
+
+    def __init__(self, threshold=0.6, bands=16):
+        if QuestionDeduplicator.SIGNATURE_LENGTH % bands != 0:
+            raise ValueError(f"bands must divide {QuestionDeduplicator.SIGNATURE_LENGTH}")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = QuestionDeduplicator.SIGNATURE_LENGTH // bands
+        self.candidate_pair_count = 0
+
+    @staticmethod
+    def shingles(question):
+        text = " ".join(QuestionDeduplicator.WORD_PATTERN.findall(f"{question.question} {question.correct_answer}".lower()))
+        return {text[start:start + QuestionDeduplicator.SHINGLE_SIZE] for start in range(max(1, len(text) - QuestionDeduplicator.SHINGLE_SIZE + 1))}
+
+    @staticmethod
+    def signature(shingles, shingle_hashes):
+        """shingle_hashes caches the bin and hash of the shingles already seen, most 4-grams come back in many questions."""
+        signature = [QuestionDeduplicator.EMPTY_BIN] * QuestionDeduplicator.SIGNATURE_LENGTH
+        for shingle in shingles:
+            shingle_hash = shingle_hashes.get(shingle)
+            if shingle_hash is None:
+                value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+                shingle_hash = divmod(value, QuestionDeduplicator.SIGNATURE_LENGTH)
+                shingle_hashes[shingle] = shingle_hash
+            value, bin_index = shingle_hash
+            if value < signature[bin_index]:
+                signature[bin_index] = value
+        return QuestionDeduplicator._densify(signature)
+
+    @staticmethod
+    def _densify(signature):
+        """
+        A question of fewer shingles than bins leaves bins empty. Left empty, every short question would share the bands made only of
+        empty bins and be compared with every other one. Each empty bin takes the hash of the first filled bin of its own probe order:
+        neighbouring empty bins borrow from different bins, a band is not made of a single shingle.
+        """
+        densified = list(signature)
+        for bin_index, value in enumerate(signature):
+            if value != QuestionDeduplicator.EMPTY_BIN:
+                continue
+            for probed_bin in QuestionDeduplicator.PROBE_ORDERS[bin_index]:
+                if signature[probed_bin] != QuestionDeduplicator.EMPTY_BIN:
+                    # moved out of the range of the hashes, a borrowed hash never equals a hash of the bin itself
+                    densified[bin_index] = signature[probed_bin] + QuestionDeduplicator.BIN_RANGE
+                    break
+        return densified
+
+    def deduplicate(self, certification_questions):
+        """Returns the certification questions without their near-duplicates, and the report of each removed question."""
+        # kept questions compared with a new question, the cost LSH keeps far below all pairs
+        self.candidate_pair_count = 0
+        band_tables = [{} for _ in range(self.bands)]
+        shingle_hashes = {}
+        kept_shingles = []
+        kept_questions = []
+        removed = []
+        deduplicated = []
+        for learning_path_questions in certification_questions.questions:
+            questions = []
+            for question in learning_path_questions.questions:
+                shingles = QuestionDeduplicator.shingles(question)
+                signature = QuestionDeduplicator.signature(shingles, shingle_hashes)
+                band_keys = [tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+                candidates = {kept_index for band, band_key in enumerate(band_keys) for kept_index in band_tables[band].get(band_key, ())}
+                self.candidate_pair_count += len(candidates)
+                duplicate_of, similarity = None, 0.0
+                # the signature only preselects, the decision is taken on the exact Jaccard similarity of the shingles
+                for kept_index in sorted(candidates):
+                    candidate_shingles = kept_shingles[kept_index]
+                    # the similarity cannot exceed the ratio of the sizes of the two sets
+                    if min(len(shingles), len(candidate_shingles)) < self.threshold * max(len(shingles), len(candidate_shingles)):
+                        continue
+                    intersection_size = len(shingles & candidate_shingles)
+                    candidate_similarity = intersection_size / (len(shingles) + len(candidate_shingles) - intersection_size)
+                    if candidate_similarity >= self.threshold and candidate_similarity > similarity:
+                        duplicate_of, similarity = kept_index, candidate_similarity
+                if duplicate_of is not None:
+                    kept_learning_path_title, kept_question = kept_questions[duplicate_of]
+                    removed.append({
+                        "learning_path_title": learning_path_questions.learning_path_title,
+                        "question": question.question,
+                        "duplicate_of": {"learning_path_title": kept_learning_path_title, "question": kept_question.question},
+                        "similarity": round(similarity, 3),
+                    })
+                    continue
+                for band, band_key in enumerate(band_keys):
+                    band_tables[band].setdefault(band_key, []).append(len(kept_shingles))
+                kept_shingles.append(shingles)
+                kept_questions.append((learning_path_questions.learning_path_title, question))
+                questions.append(question)
+            deduplicated.append(LearningPathQuestions(learning_path_title=learning_path_questions.learning_path_title, questions=questions))
+        return CertificationQuestions(certification_title=certification_questions.certification_title, questions=deduplicated), removed
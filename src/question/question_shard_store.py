@@ -0,0 +1,64 @@
+import os
+import json
+import hashlib
+
+from question.question import Questions
+
+
+class QuestionShardStore:
+    """
+    Questions of each unit persisted in their own shard file, named after a hash of the model, the prompt and the cleaned content.
+    A unit whose content and prompt did not change keeps its shard, only the other units need new questions.
+    """
+    def __init__(self, directory, llm_model, question_prompt):
+        self.directory = directory
+        self.llm_model = llm_model
+        self.question_prompt = question_prompt
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def key(self, content):
+        payload = json.dumps([self.llm_model, self.question_prompt, content])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _shard_path(self, content):
+        return os.path.join(self.directory, f"{self.key(content)}.json")
+
+    def has(self, content):
+        return os.path.exists(self._shard_path(content))
+
+    def get(self, content):
+        try:
+            with open(self._shard_path(content), "r", encoding="utf-8") as file:
+                return Questions.model_validate(json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def put(self, content, questions):
+        shard_path = self._shard_path(content)
+        tmp_path = f"{shard_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(questions.model_dump(), file, indent=4)
+        os.replace(tmp_path, shard_path)
+
+    def load(self, contents):
+        """Returns the questions of the contents that already have a shard, keyed by content."""
+        unit_questions = {}
+        for content in dict.fromkeys(contents):
+            questions = self.get(content)
+            if questions is not None:
+                unit_questions[content] = questions
+        return unit_questions
+
+    def prune(self, contents):
+        """Deletes the shards of units that are no longer part of the course."""
+        return self.prune_keys({self.key(content) for content in contents})
+
+    def prune_keys(self, keys):
+        kept_files = {f"{key}.json" for key in keys}
+        removed_count = 0
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json") and filename not in kept_files:
+                os.remove(os.path.join(self.directory, filename))
+                removed_count += 1
+        return removed_count
@@ -0,0 +1,63 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+
+class BrowserProfile:
+    """
+    Settings of the Chrome sessions of a scrap. The scrapper only reads the DOM of the pages, the lean profile runs headless,
+    stops waiting for a page at DOMContentLoaded and does not download what the DOM does not need: images, media, fonts,
+    stylesheets and third party telemetry. The full profile is a headed browser loading every resource, the behaviour before profiles.
+    """
+    LEAN = "lean"
+    FULL = "full"
+    NAMES = [LEAN, FULL]
+    # the learning path lists are rendered by the scripts of the page, scripts are only blocked when they are telemetry
+    BLOCKED_URL_PATTERNS = [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*.mp4", "*.webm", "*.mp3",
+        "*.css",
+        "*.monitor.azure.com/*", "*.clarity.ms/*", "*.googletagmanager.com/*", "*.google-analytics.com/*", "*.doubleclick.net/*",
+        "*/telemetry*",
+    ]
+    # longer than any readiness wait, which resolves on its own timeout
+    SCRIPT_TIMEOUT_SECONDS = 60
+
+    def __init__(self, name=LEAN):
+        if name not in BrowserProfile.NAMES:
+            raise ValueError(f"Unknown browser profile {name}, expected one of {', '.join(BrowserProfile.NAMES)}")
+        self.name = name
+
+    def options(self):
+        options = webdriver.ChromeOptions()
+        if self.name == BrowserProfile.FULL:
+            return options
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1280,2000")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--no-first-run")
+        options.add_argument("--mute-audio")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+            "profile.managed_default_content_settings.notifications": 2,
+        })
+        # driver.get returns at DOMContentLoaded, the scrappables then wait for the element they read
+        options.page_load_strategy = "eager"
+        return options
+
+    def prepare(self, driver):
+        """Applies to a started session the settings that are not Chrome options."""
+        driver.set_script_timeout(BrowserProfile.SCRIPT_TIMEOUT_SECONDS)
+        if self.name == BrowserProfile.LEAN:
+            # requests matching a pattern fail in the browser before reaching the network
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BrowserProfile.BLOCKED_URL_PATTERNS})
+        return driver
+
+    def create_driver(self, driver_path, options=None):
+        """Starts a Chrome session with this profile, options are the ones of self.options() with extra settings."""
+        driver = webdriver.Chrome(service=Service(driver_path), options=options if options is not None else self.options())
+        return self.prepare(driver)
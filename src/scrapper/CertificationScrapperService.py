@@ -1,10 +1,20 @@
-import yaml
 import sys
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from webdriver_manager.chrome import ChromeDriverManager
 
+from scrapper.course_structure.AbstractScrappable import AbstractScrappable
 from scrapper.course_structure.Certification import Certification
+from scrapper.WebDriverPool import WebDriverPool
+from scrapper.BrowserProfile import BrowserProfile
+from scrapper.PageFetcher import HttpPageFetcher, SeleniumPageFetcher
+from scrapper.PageCache import PageCache
+from scrapper.PageExtraction import EXTRACTION_BROWSER
+from scrapper.ScrapCheckpoint import ScrapCheckpoint
+from storage.course_material_store import CourseMaterialStore
+from storage.certification_catalog import CertificationCatalog
+from telemetry.run_telemetry import run_telemetry
 
 # Define ANSI escape codes for colors
 GREEN = "\033[92m"
@@ -13,34 +23,159 @@ RESET = "\033[0m"
 
 
 class CertificationScrapperService:
-    def __init__(self, url):
+    # module and unit pages are either rendered in the browser or read over plain HTTP
+    FETCH_ENGINE_SELENIUM = 'selenium'
+    FETCH_ENGINE_HTTP = 'http'
+    # processes parsing the captured unit pages while the drivers navigate, 0 parses in the scrapping thread
+    DEFAULT_PARSE_WORKERS = 2
+
+    def __init__(self, url, workers=1, parallel_level=Certification.PARALLEL_LEVEL_LEARNING_PATH, fetch_engine=FETCH_ENGINE_SELENIUM, page_cache_dir=None, driver_factory=None, browser_profile=BrowserProfile.LEAN, extraction_mode=EXTRACTION_BROWSER, parse_workers=DEFAULT_PARSE_WORKERS):
         self.root_url = url
-        service = Service(ChromeDriverManager().install())
-        options = webdriver.ChromeOptions()
-        #options.add_argument('--headless')  # Run in headless mode if you don't need to see the browser
-        self.driver = webdriver.Chrome(service=service, options=options)
+        self.extraction_mode = extraction_mode
+        self.parse_workers = parse_workers
+        self.browser_profile = BrowserProfile(browser_profile)
+        # driver_factory replaces Chrome with another WebDriver, the benchmarks scrap their fixture site with one reading pages over HTTP
+        self.driver_factory = driver_factory
+        self.driver_path = ChromeDriverManager().install() if driver_factory is None else None
+        self.driver = self._create_driver()
+        load_start = time.perf_counter()
         self.driver.get(url)
+        run_telemetry.observe("page_navigation_seconds", time.perf_counter() - load_start, level=Certification.PAGE_LEVEL)
+        # with a single worker, everything is scrapped serially through self.driver
+        self.driver_pool = WebDriverPool(self._create_driver, workers) if workers > 1 else None
+        self.parallel_level = parallel_level
+        self.fetcher = None
+        self.fallback_driver_pool = None
+        self.page_cache = None
+        if fetch_engine == CertificationScrapperService.FETCH_ENGINE_HTTP:
+            # browser sessions for the fallback are only started if a page needs rendering
+            self.fallback_driver_pool = WebDriverPool(self._create_driver, workers)
+            # pages read over HTTP carry ETag/Last-Modified validators, re-scrapes only download what changed
+            self.page_cache = PageCache(page_cache_dir) if page_cache_dir is not None else None
+            self.fetcher = HttpPageFetcher(fallback_fetcher=SeleniumPageFetcher(self.fallback_driver_pool), pool_size=workers, page_cache=self.page_cache)
+
+    def _create_driver(self):
+        if self.driver_factory is not None:
+            return self.driver_factory()
+        return self.browser_profile.create_driver(self.driver_path)
+
+    @staticmethod
+    def browser_session_count(workers=1, fetch_engine=FETCH_ENGINE_SELENIUM):
+        """The most browser sessions a scrap with these options keeps open at the same time."""
+        session_count = 1 + (workers if workers > 1 else 0)
+        if fetch_engine == CertificationScrapperService.FETCH_ENGINE_HTTP:
+            session_count += workers
+        return session_count
+
+    @staticmethod
+    def create_driver(driver_path, browser_profile=BrowserProfile.LEAN):
+        return BrowserProfile(browser_profile).create_driver(driver_path)
+
+    def scrap_course_content(self, outputfile_path, checkpoint_path, resume=False, reset_checkpoint=False, on_unit_scrapped=None, course_material_store=None):
+        certification = Certification(self.driver, fetcher=self.fetcher)
+        Certification.page_load_counter.reset()
+        checkpoint = ScrapCheckpoint(checkpoint_path, resume=resume, reset=reset_checkpoint, on_unit_scrapped=on_unit_scrapped)
+        AbstractScrappable.checkpoint = checkpoint
+        AbstractScrappable.extraction_mode = self.extraction_mode
+        # the worker processes are only started by the first page handed over, pages extracted in the browser need none.
+        # spawned rather than forked, the scrapping process runs driver and HTTP threads
+        parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn")) if self.parse_workers > 0 else None
+        AbstractScrappable.parse_pool = parse_pool
+        try:
+            certification.scrap(driver_pool=self.driver_pool, parallel_level=self.parallel_level)
+            # the pool drivers are still alive here, the queued scrappables retry with the driver they were created with
+            still_failing = checkpoint.retry_failed()
+        finally:
+            AbstractScrappable.checkpoint = None
+            AbstractScrappable.extraction_mode = EXTRACTION_BROWSER
+            AbstractScrappable.parse_pool = None
+            if parse_pool is not None:
+                parse_pool.shutdown(cancel_futures=True)
+            checkpoint.close()
+            if self.driver_pool is not None:
+                self.driver_pool.quit()
+            if self.fetcher is not None:
+                self.fetcher.close()
+                self.fallback_driver_pool.quit()
+            self.driver.quit()
+        Certification.page_load_counter.report()
+        if self.page_cache is not None:
+            self.page_cache.report()
+        if still_failing:
+            print(f"{RED}{len(still_failing)} pages could not be scrapped:{RESET}")
+            for scrappable in still_failing:
+                print(f"{RED}  {scrappable.url}{RESET}")
+            print(f"The units scrapped so far are saved in {checkpoint_path}, run scrap-only again with --resume to complete the course.")
+            sys.exit(1)
+        if course_material_store is None:
+            course_material_store = CourseMaterialStore()
+        course_material_store.dump(certification.to_dict(), outputfile_path)
+        return certification
+
+    @staticmethod
+    def check_scrappability_of_urls(urls, workers=2, catalog=None):
+        """
+        Checks the certification URLs concurrently, each one with a browser session taken from a pool of workers sessions,
+        then upserts the scrappable certifications into the catalog in a single write. Returns the result of each URL, in order.
+        """
+        # a URL listed twice is only checked once
+        urls = list(dict.fromkeys(urls))
+        driver_path = ChromeDriverManager().install()
+        driver_pool = WebDriverPool(lambda: CertificationScrapperService.create_driver(driver_path), max(1, min(workers, len(urls))))
+
+        def check(url):
+            with driver_pool.driver() as driver:
+                return CertificationScrapperService._check_url(driver, url)
+
+        try:
+            with ThreadPoolExecutor(max_workers=driver_pool.size) as executor:
+                results = list(executor.map(check, urls))
+        finally:
+            driver_pool.quit()
+        CertificationScrapperService._record_check_results(results, catalog)
+        return results
+
+    @staticmethod
+    def _check_url(driver, url):
+        """Returns whether the certification at url can be scrapped, with its code and title when they could be read."""
+        result = {"url": url, "certification_code": None, "certification_title": None, "scrappable": False}
+        try:
+            driver.get(url)
+            certification = Certification(driver)
+            result["certification_code"], result["certification_title"] = certification.get_certification_metadata(url)
+            print(f"Certification code: {result['certification_code']} ({url})")
+            if result["certification_title"] is not None:
+                # the certification scrap raises PageScrapError when its learning paths are not found
+                certification.scrap(check_mode=True)
+                # If no exception is raised, the course is scrappable
+                result["scrappable"] = True
+        except (Exception, SystemExit):
+            pass
+        if result["scrappable"]:
+            print(f"{GREEN}The provided certification is scrappable: {url}{RESET}")
+        else:
+            print(f"{RED}The provided certification is not scrappable: {url}{RESET}")
+        return result
 
-    def scrap_course_content(self, outputfile_path):
-        certification = Certification(self.driver)
-        certification.scrap()
-        with open(outputfile_path, 'w') as outfile:
-            yaml.dump(certification.to_dict(), outfile, default_flow_style=False)
-        self.driver.quit()
-
-    def check_scrappability(self):
-        certification = Certification(self.driver)
-        try :
-            certifcation_code, certification_title = certification.get_certification_metadata(self.root_url)
-            print (f"Certification code: {certifcation_code}")
-            certification.scrap(check_mode=True)
-            # If no exception is raised, the course is scrappable
-            # dumps the course info into the csv file
-            with open('../../microsoft_certifications/microsoft_certifications_reference_list.csv', 'a') as file:
-                # certification_id, certification_title, course_title, course_path
-                file.write(f"{certifcation_code},{certification_title},{certification_title}, {self.root_url}\n")
-            print(f"{GREEN}The provided certification is scrappable: {self.root_url}{RESET}")
-        except:
-            # print exception message
-            
-            print(f"{RED}The provided certification is not scrappable: {self.root_url}{RESET}")
\ No newline at end of file
+    @staticmethod
+    def _record_check_results(results, catalog=None):
+        if catalog is None:
+            catalog = CertificationCatalog()
+        entries = []
+        for result in results:
+            if not result["scrappable"]:
+                continue
+            if result["certification_code"] is None:
+                print(f"{RED}The exam code of {result['url']} could not be found, add it manually to {catalog.file_path}{RESET}")
+                continue
+            entries.append({
+                "certification_id": result["certification_code"].upper(),
+                "certification_title": result["certification_title"],
+                "course_title": result["certification_title"],
+                "course_path": result["url"],
+            })
+        if entries:
+            added_count = catalog.upsert(entries)
+            print(f"{added_count} certifications added and {len(entries) - added_count} updated in {catalog.file_path}")
+        scrappable_count = sum(result["scrappable"] for result in results)
+        print(f"{scrappable_count} of {len(results)} certifications are scrappable.")
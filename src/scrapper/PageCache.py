@@ -0,0 +1,58 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class PageCache:
+    """
+    On-disk cache of the html of the pages, keyed by url.
+    Each entry keeps the ETag and Last-Modified headers of the response so it can be revalidated with a conditional request.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self._lock = threading.Lock()
+        self.revalidated_count = 0
+        self.downloaded_count = 0
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url):
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, url, html, etag=None, last_modified=None):
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "html": html}
+        entry_path = self._entry_path(url)
+        # write to a temporary file first so a crash never leaves a truncated entry
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, entry_path)
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_revalidated(self):
+        with self._lock:
+            self.revalidated_count += 1
+
+    def record_downloaded(self):
+        with self._lock:
+            self.downloaded_count += 1
+
+    def report(self):
+        print(f"Page cache: {self.revalidated_count} pages unchanged, {self.downloaded_count} pages downloaded")
@@ -0,0 +1,95 @@
+import time
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
+
+# the libxml2 parser tokenizes in C, faster than the pure-Python html.parser on long units
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+EXTRACTION_BROWSER = "browser"
+EXTRACTION_PARSE = "parse"
+EXTRACTION_MODES = [EXTRACTION_BROWSER, EXTRACTION_PARSE]
+
+# same text as BeautifulSoup get_text(strip=True): every text node stripped and concatenated, scripts and styles left out
+STRIPPED_TEXT_SCRIPT = """
+const strippedText = (element) => {
+    const walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT, {
+        acceptNode: (node) => node.parentElement.closest("script, style, template") ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    });
+    const parts = [];
+    while (walker.nextNode()) {
+        const text = walker.currentNode.nodeValue.trim();
+        if (text) {
+            parts.push(text);
+        }
+    }
+    return parts.join("");
+};
+"""
+
+# [text, absolute url] of the links of the first container, or of the first link with text of every container
+EXTRACT_LINKS_SCRIPT = STRIPPED_TEXT_SCRIPT + """
+const [containerSelector, linkSelector, everyContainer] = arguments;
+const containers = everyContainer ? Array.from(document.querySelectorAll(containerSelector)) : [document.querySelector(containerSelector)];
+const links = [];
+for (const container of containers) {
+    if (container === null) {
+        return null;
+    }
+    const containerLinks = Array.from(container.querySelectorAll(linkSelector));
+    const pickedLinks = everyContainer ? containerLinks.filter((link) => strippedText(link)).slice(0, 1) : containerLinks;
+    for (const link of pickedLinks) {
+        links.push([strippedText(link), link.href]);
+    }
+}
+return links;
+"""
+
+EXTRACT_TEXT_SCRIPT = STRIPPED_TEXT_SCRIPT + """
+const element = document.querySelector(arguments[0]);
+return element === null ? null : strippedText(element);
+"""
+
+
+def extracts_in_browser(driver, extraction_mode):
+    """Whether the page of driver is read by a script in the page, drivers that do not run scripts hand over their page_source."""
+    return extraction_mode == EXTRACTION_BROWSER and hasattr(driver, "execute_script")
+
+
+def extract_links(driver, container_selector, link_selector, every_container=False):
+    """
+    The [text, absolute url] of the links matching link_selector in the first element matching container_selector,
+    or of the first link with text in every element matching it. None when there is no container.
+    Only these strings cross the WebDriver connection, not the whole page.
+    """
+    try:
+        return driver.execute_script(EXTRACT_LINKS_SCRIPT, container_selector, link_selector, every_container)
+    except WebDriverException:
+        return None
+
+
+def extract_text(driver, css_selector):
+    """The stripped text of the first element matching css_selector, None when there is none."""
+    try:
+        return driver.execute_script(EXTRACT_TEXT_SCRIPT, css_selector)
+    except WebDriverException:
+        return None
+
+
+def parse_html(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def parse_element_text(html, element_id):
+    """
+    The stripped text of the element with id element_id, None when there is none, and the seconds the parse took.
+    A module level function of plain arguments, it also runs in the processes of the parse pool.
+    """
+    start = time.perf_counter()
+    element = parse_html(html).find(id=element_id)
+    text = element.get_text(strip=True) if element is not None else None
+    return text, time.perf_counter() - start
@@ -0,0 +1,82 @@
+import re
+from abc import ABC, abstractmethod
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from scrapper.PageCache import PageCache
+from scrapper.PageReadiness import wait_for_element_id
+
+
+class AbstractPageFetcher(ABC):
+    """
+    Backend used by the scrappables to read a page by url.
+    fetch returns the html of the page, or None if the element with id element_id is not in the page.
+    """
+    @abstractmethod
+    def fetch(self, url, element_id):
+        pass
+
+    @staticmethod
+    def has_element(html, element_id):
+        # cheap check on the raw markup, the caller parses the page anyway
+        return re.search(rf'id=["\']{re.escape(element_id)}["\']', html) is not None
+
+
+class SeleniumPageFetcher(AbstractPageFetcher):
+    """Renders the page in a browser session taken from a WebDriverPool."""
+    def __init__(self, driver_pool):
+        self.driver_pool = driver_pool
+
+    def fetch(self, url, element_id):
+        with self.driver_pool.driver() as driver:
+            driver.get(url)
+            if not wait_for_element_id(driver, element_id):
+                return None
+            return driver.page_source
+
+
+class HttpPageFetcher(AbstractPageFetcher):
+    """
+    Reads the static markup of the page over pooled keep-alive HTTP connections.
+    Falls back to fallback_fetcher when the element is not part of the static markup.
+    With a PageCache, cached pages are revalidated with a conditional request and only downloaded again if they changed.
+    """
+    USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+    def __init__(self, fallback_fetcher=None, pool_size=4, timeout=30, page_cache=None):
+        self.fallback_fetcher = fallback_fetcher
+        self.timeout = timeout
+        self.page_cache = page_cache
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": HttpPageFetcher.USER_AGENT})
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, url, element_id):
+        html = None
+        cached_entry = self.page_cache.get(url) if self.page_cache is not None else None
+        headers = PageCache.conditional_headers(cached_entry) if cached_entry is not None else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached_entry is not None:
+                self.page_cache.record_revalidated()
+                return cached_entry["html"]
+            if response.ok:
+                html = response.text
+                if self.page_cache is not None and AbstractPageFetcher.has_element(html, element_id):
+                    self.page_cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    self.page_cache.record_downloaded()
+        except requests.RequestException as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+        if html is not None and AbstractPageFetcher.has_element(html, element_id):
+            return html
+        if self.fallback_fetcher is None:
+            return None
+        print(f"No element with 'id={element_id}' in the static page, falling back to the browser: {url}")
+        return self.fallback_fetcher.fetch(url, element_id)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,36 @@
+import threading
+
+
+class PageLoadCounter:
+    """Thread-safe count of the pages loaded while scraping, per level of the course structure."""
+    LEVELS = ['certification', 'learning_path', 'module', 'unit']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = {level: 0 for level in PageLoadCounter.LEVELS}
+
+    def record(self, level):
+        with self._lock:
+            self.counts[level] += 1
+
+    def parent_page_loads(self):
+        # pages the scraper harvests links from
+        return self.counts['certification'] + self.counts['learning_path'] + self.counts['module']
+
+    def child_page_loads(self):
+        # pages reached by following a link from their parent page
+        return self.counts['learning_path'] + self.counts['module'] + self.counts['unit']
+
+    def report(self):
+        print("Page loads:")
+        for level in PageLoadCounter.LEVELS:
+            print(f"  {level}: {self.counts[level]}")
+        total = sum(self.counts.values())
+        # navigating to each child then driver.back() reloads the parent page once per child
+        back_and_forth_total = total + self.child_page_loads()
+        print(f"  parent pages: {self.parent_page_loads()}, child pages: {self.child_page_loads()}, total: {total}")
+        print(f"  a driver.back() traversal would have needed {back_and_forth_total} navigations")
@@ -0,0 +1,50 @@
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+DEFAULT_TIMEOUT_SECONDS = 10
+
+# resolves as soon as a DOM mutation brings the elements in, or with the last check when the timeout expires
+WAIT_FOR_ELEMENTS_SCRIPT = """
+const [selector, minCount, timeoutMs, done] = arguments;
+const ready = () => document.querySelectorAll(selector).length >= minCount;
+if (ready()) {
+    done(true);
+    return;
+}
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (ready()) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ["id", "class"]});
+timer = setTimeout(() => {
+    observer.disconnect();
+    done(ready());
+}, timeoutMs);
+"""
+
+
+def wait_for_elements(driver, css_selector, min_count=1, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Waits until the page of driver holds at least min_count elements matching css_selector, returns whether it does.
+    In a browser, the page itself reports when the elements are inserted, through a MutationObserver, instead of being polled.
+    Drivers that do not run scripts are polled.
+    """
+    if not hasattr(driver, "execute_async_script"):
+        try:
+            WebDriverWait(driver, timeout).until(lambda driver: len(driver.find_elements(By.CSS_SELECTOR, css_selector)) >= min_count)
+            return True
+        except TimeoutException:
+            return False
+    try:
+        return bool(driver.execute_async_script(WAIT_FOR_ELEMENTS_SCRIPT, css_selector, min_count, int(timeout * 1000)))
+    except WebDriverException:
+        return False
+
+
+def wait_for_element_id(driver, element_id, timeout=DEFAULT_TIMEOUT_SECONDS):
+    return wait_for_elements(driver, f'[id="{element_id}"]', timeout=timeout)
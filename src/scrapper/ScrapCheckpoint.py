@@ -0,0 +1,84 @@
+import os
+import json
+import threading
+
+from scrapper.course_structure.AbstractScrappable import PageScrapError
+
+# Define ANSI escape codes for colors
+GREEN = "\033[92m"
+RED = "\033[91m"
+RESET = "\033[0m"
+
+
+class ScrapCheckpoint:
+    """
+    Journal of the units scrapped so far, one JSON line per unit appended as soon as the unit is done,
+    and retry queue of the scrappables whose page failed to load.
+    With resume, the units already in the journal are not scrapped again.
+    The journal is kept from one run to the next, the units of a run without resume are appended to it and the last entry of a unit wins.
+    Only reset empties it.
+    on_unit_scrapped is called with every unit done, including the units taken from the journal.
+    """
+    def __init__(self, journal_path, resume=False, reset=False, on_unit_scrapped=None):
+        if resume and reset:
+            raise ValueError("A checkpoint journal cannot be both resumed and reset")
+        self.journal_path = journal_path
+        self.on_unit_scrapped = on_unit_scrapped
+        self._lock = threading.Lock()
+        self.scrapped_units = {}
+        self.retry_queue = []
+        if resume:
+            self._load()
+        mode = "w" if reset else "a"
+        self._journal = open(self.journal_path, mode, encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line may be truncated if the previous run was killed while writing it
+                    continue
+                self.scrapped_units[entry["url"]] = entry["unit_content"]
+        print(f"Resuming from {len(self.scrapped_units)} units already scrapped")
+
+    def get_unit_content(self, url):
+        return self.scrapped_units.get(url)
+
+    def record_unit(self, unit):
+        line = json.dumps({"url": unit.url, "unit_title": unit.unit_title, "unit_content": unit.unit_content})
+        with self._lock:
+            self.scrapped_units[unit.url] = unit.unit_content
+            self._journal.write(line + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self.notify_unit_done(unit)
+
+    def notify_unit_done(self, unit):
+        if self.on_unit_scrapped is not None:
+            self.on_unit_scrapped(unit)
+
+    def queue_retry(self, scrappable):
+        with self._lock:
+            self.retry_queue.append(scrappable)
+
+    def retry_failed(self, max_attempts=3):
+        """Scraps the queued scrappables again, returns the ones still failing after max_attempts."""
+        for attempt in range(1, max_attempts + 1):
+            if not self.retry_queue:
+                break
+            queued, self.retry_queue = self.retry_queue, []
+            print(f"Retrying {len(queued)} failed pages (attempt {attempt}/{max_attempts})")
+            for scrappable in queued:
+                try:
+                    scrappable.scrap()
+                except PageScrapError as e:
+                    print(f"{RED}{e}{RESET}")
+                    self.retry_queue.append(scrappable)
+        return self.retry_queue
+
+    def close(self):
+        self._journal.close()
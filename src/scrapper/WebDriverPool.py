@@ -0,0 +1,49 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class WebDriverPool:
+    """
+    Fixed-size pool of browser sessions shared by scraping worker threads.
+    Drivers are created lazily with driver_factory, the first time the pool runs out of idle ones.
+    """
+    def __init__(self, driver_factory, size):
+        if size < 1:
+            raise ValueError("WebDriverPool size must be at least 1")
+        self.driver_factory = driver_factory
+        self.size = size
+        self._idle_drivers = queue.Queue()
+        self._all_drivers = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle_drivers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all_drivers) < self.size:
+                driver = self.driver_factory()
+                self._all_drivers.append(driver)
+                return driver
+        # every driver has been created and is busy: wait for one to be released
+        return self._idle_drivers.get()
+
+    def release(self, driver):
+        self._idle_drivers.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def quit(self):
+        with self._lock:
+            for driver in self._all_drivers:
+                driver.quit()
+            self._all_drivers = []
+            self._idle_drivers = queue.Queue()
@@ -1,14 +1,44 @@
+import time
 from abc import ABC, abstractmethod
 from typing import Callable
 
 from urllib.parse import urljoin
+from selenium.common.exceptions import WebDriverException
 
 from question.question import Questions
+from scrapper.PageLoadCounter import PageLoadCounter
+from scrapper.PageExtraction import EXTRACTION_BROWSER, extracts_in_browser
+from telemetry.run_telemetry import run_telemetry
+
+# Define ANSI escape codes for colors
+RED = "\033[91m"
+RESET = "\033[0m"
+
+
+class PageScrapError(Exception):
+    """Raised when a page cannot be loaded or does not contain the expected element."""
+    pass
+
 
 class AbstractScrappable(ABC):
+    # level of the course structure, used to count page loads
+    PAGE_LEVEL = None
+    # shared by every scrappable, reset and reported by CertificationScrapperService
+    page_load_counter = PageLoadCounter()
+    # ScrapCheckpoint set by CertificationScrapperService, without it a page failure stops the scrap
+    checkpoint = None
+    # set by CertificationScrapperService: the browser returns the links or the text a page is read for, or its whole page_source is parsed
+    extraction_mode = EXTRACTION_BROWSER
+    # process pool set by CertificationScrapperService, parsing captured unit pages while the drivers navigate
+    parse_pool = None
+
     @abstractmethod
-    def __init__(self, driver):
+    def __init__(self, driver, fetcher=None, url=None):
         self.driver = driver
+        # optional AbstractPageFetcher: when set, pages are read by url instead of navigating self.driver
+        self.fetcher = fetcher
+        # absolute url of the page, children are visited directly by url and never through driver.back()
+        self.url = url
 
     @abstractmethod
     def scrap(self, driver):
@@ -29,13 +59,55 @@ class AbstractScrappable(ABC):
     def generate_questions(self, func: Callable[[str], str]) -> Questions:
         pass
 
+    @abstractmethod
+    def get_units(self):
+        pass
+
     @staticmethod
     @abstractmethod
     def from_dict(data):
         pass
 
-    def _goToPage(self, link):
+    def _absolute_url(self, link):
         link_href = link['href']
-        base_url = self.driver.current_url
-        full_url = urljoin(base_url, link_href)
-        self.driver.get(full_url)
\ No newline at end of file
+        base_url = self.driver.current_url if self.fetcher is None else self.url
+        return urljoin(base_url, link_href)
+
+    def _extracts_in_browser(self):
+        # pages read by a fetcher are only available as HTML
+        return self.fetcher is None and extracts_in_browser(self.driver, AbstractScrappable.extraction_mode)
+
+    def _observe_page_time(self, metric, start):
+        # page_load_seconds runs from the navigation to the expected element, page_parse_seconds covers the extraction or the parse of the HTML
+        run_telemetry.observe(metric, time.perf_counter() - start, level=self.PAGE_LEVEL)
+
+    def _open_page(self):
+        AbstractScrappable.page_load_counter.record(self.PAGE_LEVEL)
+        # with a fetcher, the page is read in scrap; without url, the driver is already on the page
+        if self.fetcher is None and self.url is not None:
+            try:
+                self.driver.get(self.url)
+            except WebDriverException as e:
+                raise PageScrapError(f"Unable to load {self.url}: {e.msg}")
+
+    @staticmethod
+    def _scrap_child(child, **kwargs):
+        return AbstractScrappable._run_page_step(child, child.scrap, **kwargs)
+
+    @staticmethod
+    def _finish_child(child):
+        # waits for the parse a child handed to the parse pool
+        return AbstractScrappable._run_page_step(child, child.finish_scrap)
+
+    @staticmethod
+    def _run_page_step(child, step, **kwargs):
+        # a page that fails goes on the retry queue of the checkpoint instead of stopping the whole scrap
+        try:
+            step(**kwargs)
+        except PageScrapError as e:
+            if AbstractScrappable.checkpoint is None:
+                raise
+            run_telemetry.increment("page_failures_total", level=child.PAGE_LEVEL)
+            print(f"{RED}{e}, queued for retry{RESET}")
+            AbstractScrappable.checkpoint.queue_retry(child)
+        return child
@@ -1,17 +1,23 @@
-import sys
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 from typing import List, Callable
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from question.question import LearningPathQuestions
-from .AbstractScrappable import AbstractScrappable
+from scrapper.PageReadiness import wait_for_elements
+from scrapper.PageExtraction import extract_links, parse_html
+from .AbstractScrappable import AbstractScrappable, PageScrapError
 from .LearningPath import LearningPath
 
 class Certification(AbstractScrappable):
-    def __init__(self, driver=None):
-        super().__init__(driver)
+    # parallel scraping distributes either whole learning paths or single modules over the driver pool
+    PARALLEL_LEVEL_LEARNING_PATH = 'learning_path'
+    PARALLEL_LEVEL_MODULE = 'module'
+    PAGE_LEVEL = 'certification'
+
+    def __init__(self, driver=None, fetcher=None):
+        super().__init__(driver, fetcher)
         self.certification_content = []
 
     def get_certification_metadata(self, root_url):
@@ -30,37 +36,58 @@ class Certification(AbstractScrappable):
 
         try:
             # wait for h1 of class title to be present
-            WebDriverWait(self.driver, 10).until(
-                lambda driver: EC.presence_of_element_located((By.CSS_SELECTOR, 'h1.title'))
-            )
+            wait_for_elements(self.driver, 'h1.title')
             certification_title = self.driver.find_element(By.CSS_SELECTOR, 'h1.title').text
         except:
             print("Unable to find certification title in the page")
             raise ValueError("Unable to find certification title in the page")
         return certification_code, certification_title
 
-    def scrap(self, check_mode=False):
-        try:
-            WebDriverWait(self.driver, 10).until(
-                lambda driver: len(driver.find_elements(By.CSS_SELECTOR, 'a[id^="learn.wwl"]')) >= 3)
-        except:
-            print("Scrapping failure: unable to find elements with id starting with 'learn.wwl'")
-            sys.exit(1)
-        html = self.driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        learning_paths_section = soup.find(id="learning-paths-list")
-        links = learning_paths_section.find_all('a', href=True, class_='card-title')
-        for i, link in enumerate(links):
-            learning_path_title = link.get_text(strip=True)
+    def scrap(self, check_mode=False, driver_pool=None, parallel_level=PARALLEL_LEVEL_LEARNING_PATH):
+        # the certification page is loaded by CertificationScrapperService
+        AbstractScrappable.page_load_counter.record(Certification.PAGE_LEVEL)
+        # the navigation is measured by CertificationScrapperService, the wait for the learning paths here
+        load_start = time.perf_counter()
+        if not wait_for_elements(self.driver, 'a[id^="learn.wwl"]', min_count=3):
+            raise PageScrapError(f"Unable to find elements with id starting with 'learn.wwl' in the DOM of {self.driver.current_url}")
+        html = None if self._extracts_in_browser() else self.driver.page_source
+        self._observe_page_time("page_load_seconds", load_start)
+        parse_start = time.perf_counter()
+        # harvest every learning path url in one pass before leaving the certification page
+        if html is None:
+            learning_path_pages = extract_links(self.driver, '[id="learning-paths-list"]', 'a.card-title[href]') or []
+        else:
+            learning_paths_section = parse_html(html).find(id="learning-paths-list")
+            links = learning_paths_section.find_all('a', href=True, class_='card-title')
+            base_url = self.driver.current_url
+            learning_path_pages = [(link.get_text(strip=True), urljoin(base_url, link['href'])) for link in links]
+        # check_mode is used to test the first 2 learning paths
+        if check_mode:
+            learning_path_pages = learning_path_pages[:2]
+        self._observe_page_time("page_parse_seconds", parse_start)
+        if driver_pool is not None and parallel_level == Certification.PARALLEL_LEVEL_LEARNING_PATH:
+            self._scrap_learning_paths_in_parallel(learning_path_pages, driver_pool)
+            return
+        module_driver_pool = driver_pool if parallel_level == Certification.PARALLEL_LEVEL_MODULE else None
+        for learning_path_title, learning_path_url in learning_path_pages:
+            print(f"# {learning_path_title}")
+            learning_path = LearningPath(learning_path_title=learning_path_title, driver=self.driver, url=learning_path_url, fetcher=self.fetcher)
+            self.certification_content.append(AbstractScrappable._scrap_child(learning_path, driver_pool=module_driver_pool))
+
+    def _scrap_learning_paths_in_parallel(self, learning_path_pages, driver_pool):
+        with ThreadPoolExecutor(max_workers=driver_pool.size) as executor:
+            # executor.map keeps the order of the learning paths as listed on the certification page
+            learning_paths = executor.map(
+                lambda page: Certification._scrap_learning_path(page[0], page[1], driver_pool, self.fetcher),
+                learning_path_pages)
+            self.certification_content.extend(learning_paths)
+
+    @staticmethod
+    def _scrap_learning_path(learning_path_title, learning_path_url, driver_pool, fetcher=None):
+        with driver_pool.driver() as driver:
             print(f"# {learning_path_title}")
-            self._goToPage(link)
-            learning_path = LearningPath(learning_path_title=learning_path_title, driver=self.driver)
-            learning_path.scrap()
-            self.certification_content.append(learning_path.to_dict())
-            self.driver.back()
-            # check_mode is used to test the first 2 learning paths
-            if (check_mode and i == 1):
-                break
+            learning_path = LearningPath(learning_path_title=learning_path_title, driver=driver, url=learning_path_url, fetcher=fetcher)
+            return AbstractScrappable._scrap_child(learning_path)
     
     def clean(self, func: Callable[[str], str]):
         for learning_path in self.certification_content:
@@ -82,17 +109,22 @@ class Certification(AbstractScrappable):
                 'learning_path_title': learning_path.learning_path_title,
                 'questions': learning_path.generate_questions(func)
             })
-            print(questions)
         return questions
             
 
+    def get_units(self):
+        units = []
+        for learning_path in self.certification_content:
+            units.extend(learning_path.get_units())
+        return units
+
     def to_dict(self):
         return {
             'certification_content': [lp.to_dict() for lp in self.certification_content]
         }
     
     def to_markdown(self):
-        return f'{[learning_path.to_markdown() for learning_path in self.certification_content]}'
+        return '\n'.join(learning_path.to_markdown() for learning_path in self.certification_content)
     
     @staticmethod
     def from_dict(data):
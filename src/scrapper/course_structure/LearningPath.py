@@ -1,44 +1,77 @@
-import sys
+import time
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Callable
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
 from question.question import Question
-from .AbstractScrappable import AbstractScrappable
+from scrapper.PageReadiness import wait_for_elements
+from scrapper.PageExtraction import extract_links, parse_html
+from .AbstractScrappable import AbstractScrappable, PageScrapError
 from .Module import Module
 
 class LearningPath(AbstractScrappable):
     # statiic constants
     CSS_SELECTOR = '[data-bi-name="module"]'
-    def __init__(self, learning_path_title: str, modules_in_learning_path: List[Module] = None, driver=None):
-        super().__init__(driver)
+    PAGE_LEVEL = 'learning_path'
+
+    def __init__(self, learning_path_title: str, modules_in_learning_path: List[Module] = None, driver=None, url: str = None, fetcher=None):
+        super().__init__(driver, fetcher, url)
         self.learning_path_title = learning_path_title
         self.modules_in_learning_path = modules_in_learning_path if modules_in_learning_path else []
 
-    def scrap(self):
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR,  LearningPath.CSS_SELECTOR)))
-        except:
-            print("No elements with '[data-bi-name=module] found.")
-            sys.exit(1)
-         # wait for 60 seconds
-        
-        html = self.driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        #time.sleep(60)
-        #divs = soup.find_all('div', class_='module')
-        divs = soup.find_all('div', {'data-bi-name': 'module'})
-        for div in divs:
-            link = div.find('a', href=True, text=True)
-            module_title = link.get_text(strip=True)
+    def scrap(self, driver_pool=None):
+        # learning path pages are rendered client side, they are always loaded in the browser
+        AbstractScrappable.page_load_counter.record(LearningPath.PAGE_LEVEL)
+        load_start = time.perf_counter()
+        if self.url is not None:
+            try:
+                self.driver.get(self.url)
+            except WebDriverException as e:
+                raise PageScrapError(f"Unable to load {self.url}: {e.msg}")
+        if not wait_for_elements(self.driver, LearningPath.CSS_SELECTOR):
+            raise PageScrapError(f"No elements with '[data-bi-name=module] found in the DOM of {self.url}")
+        html = None if self._extracts_in_browser() else self.driver.page_source
+        self._observe_page_time("page_load_seconds", load_start)
+        parse_start = time.perf_counter()
+        # harvest every module url in one pass before leaving the learning path page
+        if html is None:
+            module_pages = extract_links(self.driver, LearningPath.CSS_SELECTOR, 'a[href]', every_container=True)
+        else:
+            divs = parse_html(html).find_all('div', {'data-bi-name': 'module'})
+            links = [div.find('a', href=True, text=True) for div in divs]
+            base_url = self.driver.current_url
+            module_pages = [(link.get_text(strip=True), urljoin(base_url, link['href'])) for link in links if link is not None]
+        if module_pages is None:
+            raise PageScrapError(f"Unable to read the modules of {self.url}")
+        self._observe_page_time("page_parse_seconds", parse_start)
+        # a retried learning path starts over, units already done are taken from the checkpoint
+        self.modules_in_learning_path = []
+        if driver_pool is not None:
+            self._scrap_modules_in_parallel(module_pages, driver_pool)
+            return
+        for module_title, module_url in module_pages:
             print(f"  ## {module_title}")
-            self._goToPage(link)
-            module = Module(module_title=module_title, driver=self.driver)
-            module.scrap()
-            self.modules_in_learning_path.append(module)
-            self.driver.back()
+            module = Module(module_title=module_title, driver=self.driver, url=module_url, fetcher=self.fetcher)
+            self.modules_in_learning_path.append(AbstractScrappable._scrap_child(module))
+
+    def _scrap_modules_in_parallel(self, module_pages, driver_pool):
+        with ThreadPoolExecutor(max_workers=driver_pool.size) as executor:
+            # executor.map keeps the order of the modules as listed on the learning path page
+            modules = executor.map(
+                lambda page: LearningPath._scrap_module(page[0], page[1], driver_pool, self.fetcher),
+                module_pages)
+            self.modules_in_learning_path.extend(modules)
+
+    @staticmethod
+    def _scrap_module(module_title, module_url, driver_pool, fetcher=None):
+        print(f"  ## {module_title}")
+        if fetcher is not None:
+            # the fetcher reads the module page by url, no browser session needed
+            module = Module(module_title=module_title, url=module_url, fetcher=fetcher)
+            return AbstractScrappable._scrap_child(module)
+        with driver_pool.driver() as driver:
+            module = Module(module_title=module_title, driver=driver, url=module_url)
+            return AbstractScrappable._scrap_child(module)
 
     def clean(self, func: Callable[[str], str]):
         for module in self.modules_in_learning_path:
@@ -50,6 +83,12 @@ class LearningPath(AbstractScrappable):
             questions.extend( module.generate_questions(func))
         return questions
 
+    def get_units(self):
+        units = []
+        for module in self.modules_in_learning_path:
+            units.extend(module.get_units())
+        return units
+
     def to_dict(self):
         return {
             'learning_path_title': self.learning_path_title,
@@ -57,7 +96,7 @@ class LearningPath(AbstractScrappable):
         }
     
     def to_markdown(self):
-        return f'# {self.learning_path_title}\n{[module.to_markdown() for module in self.modules_in_learning_path]}'
+        return '\n'.join([f'# {self.learning_path_title}'] + [module.to_markdown() for module in self.modules_in_learning_path])
         
     
     @staticmethod
@@ -1,40 +1,52 @@
-import sys
+import time
 from typing import List, Callable
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from question.question import Question
-from .AbstractScrappable import AbstractScrappable
+from scrapper.PageReadiness import wait_for_element_id
+from scrapper.PageExtraction import extract_links, parse_html
+from .AbstractScrappable import AbstractScrappable, PageScrapError
 from .Unit import Unit
 
 class Module(AbstractScrappable):
-    def __init__(self, module_title: str, units_in_module: List[Unit] = None, driver=None):
-        super().__init__(driver)
+    PAGE_LEVEL = 'module'
+
+    def __init__(self, module_title: str, units_in_module: List[Unit] = None, driver=None, url: str = None, fetcher=None):
+        super().__init__(driver, fetcher, url)
         self.module_title = module_title
         self.units_in_module = units_in_module if units_in_module else []
 
     def scrap(self):
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, 'unit-list'))
-            )
-        except:
-            print("No element with 'id=unit-list' found in the DOM")
-            sys.exit(1)
-       
-        html = self.driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        units_section = soup.find(id="unit-list")
-        links = units_section.find_all('a', href=True)
-        for link in links:
-            unit_title = link.get_text(strip=True)
+        load_start = time.perf_counter()
+        self._open_page()
+        html = None
+        if self.fetcher is not None:
+            html = self.fetcher.fetch(self.url, 'unit-list')
+            if html is None:
+                raise PageScrapError(f"No element with 'id=unit-list' found in the DOM of {self.url}")
+        else:
+            if not wait_for_element_id(self.driver, 'unit-list'):
+                raise PageScrapError(f"No element with 'id=unit-list' found in the DOM of {self.url}")
+            if not self._extracts_in_browser():
+                html = self.driver.page_source
+        self._observe_page_time("page_load_seconds", load_start)
+        parse_start = time.perf_counter()
+        # harvest every unit url in one pass before leaving the module page
+        if html is None:
+            unit_pages = extract_links(self.driver, '[id="unit-list"]', 'a[href]')
+        else:
+            units_section = parse_html(html).find(id="unit-list")
+            unit_pages = [(link.get_text(strip=True), self._absolute_url(link)) for link in units_section.find_all('a', href=True)] if units_section is not None else None
+        if unit_pages is None:
+            raise PageScrapError(f"No element with 'id=unit-list' found in the DOM of {self.url}")
+        self._observe_page_time("page_parse_seconds", parse_start)
+        # a retried module starts over, units already done are taken from the checkpoint
+        self.units_in_module = []
+        for unit_title, unit_url in unit_pages:
             print(f"    ### {unit_title}")
-            self._goToPage(link)
-            unit = Unit(unit_title=unit_title, driver=self.driver)
-            unit.scrap()
-            self.units_in_module.append(unit)
-            self.driver.back()
+            unit = Unit(unit_title=unit_title, driver=self.driver, url=unit_url, fetcher=self.fetcher)
+            self.units_in_module.append(AbstractScrappable._scrap_child(unit, defer_parse=True))
+        # the units parsed in the parse pool are completed in order once every unit page of the module is loaded
+        for unit in self.units_in_module:
+            AbstractScrappable._finish_child(unit)
 
     def clean(self, func: Callable[[str], str]):
         for unit in self.units_in_module:
@@ -46,6 +58,9 @@ class Module(AbstractScrappable):
             questions.extend(unit.generate_questions(func))
         return questions
 
+    def get_units(self) -> List[Unit]:
+        return list(self.units_in_module)
+
     def to_dict(self):
         return {
             'module_title': self.module_title,
@@ -53,7 +68,7 @@ class Module(AbstractScrappable):
         }
 
     def to_markdown(self):
-        return f'## {self.module_title}\n{[unit.to_markdown() for unit in self.units_in_module]}'
+        return '\n'.join([f'## {self.module_title}'] + [unit.to_markdown() for unit in self.units_in_module])
     
     @staticmethod
     def from_dict(data):
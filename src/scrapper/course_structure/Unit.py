@@ -1,30 +1,71 @@
-import sys
+import time
 from typing import List, Callable
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from question.question import Question
-from .AbstractScrappable import AbstractScrappable
+from scrapper.PageReadiness import wait_for_element_id
+from scrapper.PageExtraction import extract_text, parse_element_text
+from telemetry.run_telemetry import run_telemetry
+from .AbstractScrappable import AbstractScrappable, PageScrapError
 
 class Unit(AbstractScrappable):
-    def __init__(self, unit_title: str, unit_content: str = None, driver=None):
-        super().__init__(driver)
+    PAGE_LEVEL = 'unit'
+
+    def __init__(self, unit_title: str, unit_content: str = None, driver=None, url: str = None, fetcher=None):
+        super().__init__(driver, fetcher, url)
         self.unit_title = unit_title
         self.unit_content = unit_content
+        # future of the parse handed to the parse pool by scrap(defer_parse=True)
+        self._pending_parse = None
+
+    def scrap(self, defer_parse=False):
+        checkpoint = AbstractScrappable.checkpoint
+        if checkpoint is not None and checkpoint.get_unit_content(self.url) is not None:
+            # already scrapped by a previous run
+            self.unit_content = checkpoint.get_unit_content(self.url)
+            checkpoint.notify_unit_done(self)
+            return
+        load_start = time.perf_counter()
+        self._open_page()
+        html = None
+        if self.fetcher is not None:
+            html = self.fetcher.fetch(self.url, 'unit-inner-section')
+            if html is None:
+                raise PageScrapError(f"No element with 'id=unit-inner-section' found in the DOM of {self.url}")
+        else:
+            if not wait_for_element_id(self.driver, 'unit-inner-section'):
+                raise PageScrapError(f"No element with 'id=unit-inner-section' found in the DOM of {self.url}")
+            if not self._extracts_in_browser():
+                html = self.driver.page_source
+        self._observe_page_time("page_load_seconds", load_start)
+        if html is None:
+            parse_start = time.perf_counter()
+            # only the text of the unit leaves the browser, long units are never serialized nor parsed in Python
+            unit_content = extract_text(self.driver, '[id="unit-inner-section"]')
+            parse_seconds = time.perf_counter() - parse_start
+        elif defer_parse and AbstractScrappable.parse_pool is not None:
+            # parsed in another process while the driver moves on to the next unit, finish_scrap collects the content
+            self._pending_parse = AbstractScrappable.parse_pool.submit(parse_element_text, html, 'unit-inner-section')
+            return
+        else:
+            unit_content, parse_seconds = parse_element_text(html, 'unit-inner-section')
+        self._complete(unit_content, parse_seconds)
 
-    def scrap(self):
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, 'unit-inner-section'))
-            )
-        except:
-            print("No element with 'id=unit-inner-section' found in the DOM")
-            sys.exit(1)
-        html = self.driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        unit_inner_section = soup.find(id="unit-inner-section")
-        self.unit_content = unit_inner_section.get_text(strip=True)
+    def finish_scrap(self):
+        if self._pending_parse is None:
+            return
+        pending_parse, self._pending_parse = self._pending_parse, None
+        wait_start = time.perf_counter()
+        unit_content, parse_seconds = pending_parse.result()
+        # the time the scrap waited for the pool, near zero when the parse fully overlapped the navigation
+        self._observe_page_time("page_parse_wait_seconds", wait_start)
+        self._complete(unit_content, parse_seconds)
+
+    def _complete(self, unit_content, parse_seconds):
+        if unit_content is None:
+            raise PageScrapError(f"No element with 'id=unit-inner-section' found in the DOM of {self.url}")
+        self.unit_content = unit_content
+        run_telemetry.observe("page_parse_seconds", parse_seconds, level=self.PAGE_LEVEL)
+        if AbstractScrappable.checkpoint is not None:
+            AbstractScrappable.checkpoint.record_unit(self)
 
     def clean(self, func: Callable[[str], str]):
         print(f"Cleaning unit: {self.unit_title}")
@@ -33,6 +74,9 @@ class Unit(AbstractScrappable):
     def generate_questions(self, func: Callable[[str], str]) -> List[Question]:
         return func(self.unit_content).questions
 
+    def get_units(self):
+        return [self]
+
     def to_dict(self):
         return {
             'unit_title': self.unit_title,
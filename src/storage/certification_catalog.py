@@ -0,0 +1,98 @@
+import os
+import csv
+import threading
+
+CATALOG_FILE_PATH = "../microsoft_certifications/microsoft_certifications_reference_list.csv"
+
+
+class CertificationCatalog:
+    """
+    The certifications supported by TrainForCert, one CSV row per certification.
+    The file is read once into an index keyed by certification code, and by course URL so that a course checked twice is updated in place.
+    Codes are matched case-insensitively, the values may be written with or without a space after the commas.
+    """
+    FIELDS = ["certification_id", "certification_title", "course_title", "course_path"]
+    # parsed catalogs keyed by file path, reused while the file keeps the same modification time and size
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, file_path=CATALOG_FILE_PATH):
+        self.file_path = file_path
+        self.entries = {}
+        self.url_index = {}
+        self._load()
+
+    @staticmethod
+    def _file_version(file_path):
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        with CertificationCatalog._lock:
+            version = CertificationCatalog._file_version(self.file_path) if os.path.exists(self.file_path) else None
+            loaded = CertificationCatalog._loaded.get(self.file_path)
+            if loaded is None or loaded[0] != version:
+                loaded = (version, CertificationCatalog._read(self.file_path) if version is not None else {})
+                CertificationCatalog._loaded[self.file_path] = loaded
+            self.entries = dict(loaded[1])
+            self.url_index = {CertificationCatalog._normalize_url(entry["course_path"]): key for key, entry in self.entries.items()}
+
+    @staticmethod
+    def _read(file_path):
+        entries = {}
+        with open(file_path, newline='', encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile, skipinitialspace=True)
+            next(reader, None)  # Skip the header
+            for row in reader:
+                if len(row) < len(CertificationCatalog.FIELDS) or not row[0].strip():
+                    continue
+                entry = dict(zip(CertificationCatalog.FIELDS, (value.strip() for value in row)))
+                entries[entry["certification_id"].upper()] = entry
+        return entries
+
+    @staticmethod
+    def _normalize_url(url):
+        return url.strip().rstrip("/").lower()
+
+    def get(self, certification_code):
+        """Returns the catalog entry of the certification as a dict of FIELDS, None if it is not in the catalog."""
+        return self.entries.get(certification_code.strip().upper())
+
+    def list(self):
+        """Returns the catalog entries in file order."""
+        return list(self.entries.values())
+
+    def upsert(self, entries):
+        """
+        Adds or updates entries, dicts of FIELDS, matched by certification code then by course URL, and rewrites the file atomically.
+        The file is read again under the lock so that concurrent upserts of the same process do not lose each other's entries.
+        Returns the number of entries added.
+        """
+        with CertificationCatalog._lock:
+            current = CertificationCatalog._read(self.file_path) if os.path.exists(self.file_path) else {}
+            url_index = {CertificationCatalog._normalize_url(entry["course_path"]): key for key, entry in current.items()}
+            added_count = 0
+            for entry in entries:
+                entry = {field: str(entry.get(field) or "").strip() for field in CertificationCatalog.FIELDS}
+                key = entry["certification_id"].upper()
+                existing_key = key if key in current else url_index.get(CertificationCatalog._normalize_url(entry["course_path"]))
+                if existing_key is None:
+                    added_count += 1
+                elif existing_key != key:
+                    # same course recorded under another code, the new code replaces it
+                    del current[existing_key]
+                current[key] = entry
+                url_index[CertificationCatalog._normalize_url(entry["course_path"])] = key
+
+            directory = os.path.dirname(self.file_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w", newline='', encoding="utf-8") as csvfile:
+                writer = csv.writer(csvfile, lineterminator="\n")
+                writer.writerow(CertificationCatalog.FIELDS)
+                writer.writerows([entry[field] for field in CertificationCatalog.FIELDS] for entry in current.values())
+            os.replace(tmp_path, self.file_path)
+            CertificationCatalog._loaded[self.file_path] = (CertificationCatalog._file_version(self.file_path), current)
+        self._load()
+        return added_count
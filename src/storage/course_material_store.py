@@ -0,0 +1,293 @@
+import os
+import json
+from abc import ABC, abstractmethod
+
+import yaml
+
+# the libyaml bindings are an order of magnitude faster than the pure-Python emitter and loader
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+
+class AbstractCourseMaterialFormat(ABC):
+    """
+    The course material is also handled as a stream of nodes, the certification then each learning path, module and unit in document order.
+    A node holds the fields of its level, without the children list, and its level: 0 for the certification down to UNIT_LEVEL.
+    """
+    NAME = None
+    FILE_EXTENSION = None
+    # key of the children list of each level, from the certification down to the modules
+    CHILDREN_KEYS = ["certification_content", "modules_in_learning_path", "units_in_module"]
+    UNIT_LEVEL = len(CHILDREN_KEYS)
+
+    @abstractmethod
+    def dump(self, data, file):
+        pass
+
+    @abstractmethod
+    def load(self, file):
+        pass
+
+    @abstractmethod
+    def matches(self, first_line):
+        """Tells whether a file starting with first_line is written in this format."""
+        pass
+
+    def read_nodes(self, file):
+        yield from AbstractCourseMaterialFormat.nodes_from_data(self.load(file))
+
+    def write_nodes(self, nodes, file):
+        self.dump(AbstractCourseMaterialFormat.data_from_nodes(nodes), file)
+
+    @staticmethod
+    def nodes_from_data(data, level=0):
+        node = {"level": level}
+        node.update({key: value for key, value in data.items() if key not in AbstractCourseMaterialFormat.CHILDREN_KEYS})
+        yield node
+        if level < AbstractCourseMaterialFormat.UNIT_LEVEL:
+            for child in data[AbstractCourseMaterialFormat.CHILDREN_KEYS[level]]:
+                yield from AbstractCourseMaterialFormat.nodes_from_data(child, level + 1)
+
+    @staticmethod
+    def data_from_nodes(nodes):
+        data = None
+        # parents[level] is the last node read at that level
+        parents = []
+        for node in nodes:
+            node = dict(node)
+            level = node.pop("level")
+            if level < AbstractCourseMaterialFormat.UNIT_LEVEL:
+                node[AbstractCourseMaterialFormat.CHILDREN_KEYS[level]] = []
+            if level == 0:
+                data = node
+            else:
+                del parents[level:]
+                parents[level - 1][AbstractCourseMaterialFormat.CHILDREN_KEYS[level - 1]].append(node)
+            parents.append(node)
+        return data
+
+
+class YamlCourseMaterialFormat(AbstractCourseMaterialFormat):
+    NAME = "yaml"
+    FILE_EXTENSION = ".yml"
+
+    def dump(self, data, file):
+        yaml.dump(data, file, Dumper=YamlDumper, default_flow_style=False, allow_unicode=True)
+
+    def load(self, file):
+        return yaml.load(file, Loader=YamlLoader)
+
+    def matches(self, first_line):
+        # anything that is not a line-delimited JSON header
+        return not first_line.startswith("{")
+
+
+class JsonLinesCourseMaterialFormat(AbstractCourseMaterialFormat):
+    """
+    One JSON line per node. The first line is the certification node, marked with the format and its version,
+    it is the only line that has to be read to detect the format. Nodes are read and written one line at a time.
+    """
+    NAME = "jsonl"
+    FILE_EXTENSION = ".jsonl"
+    FORMAT_ID = "trainforcert-course-material"
+    VERSION = 1
+
+    def dump(self, data, file):
+        self.write_nodes(AbstractCourseMaterialFormat.nodes_from_data(data), file)
+
+    def load(self, file):
+        return AbstractCourseMaterialFormat.data_from_nodes(self.read_nodes(file))
+
+    def write_nodes(self, nodes, file):
+        nodes = iter(nodes)
+        header = {"format": JsonLinesCourseMaterialFormat.FORMAT_ID, "version": JsonLinesCourseMaterialFormat.VERSION}
+        header.update({key: value for key, value in next(nodes).items() if key != "level"})
+        file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for node in nodes:
+            file.write(json.dumps(node, ensure_ascii=False) + "\n")
+
+    def read_nodes(self, file):
+        yield JsonLinesCourseMaterialFormat.parse_header(file.readline())
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def parse_header(first_line):
+        header = json.loads(first_line)
+        if header.get("format") != JsonLinesCourseMaterialFormat.FORMAT_ID or header.get("version") != JsonLinesCourseMaterialFormat.VERSION:
+            raise ValueError(f"Unsupported course material header: {header.get('format')} version {header.get('version')}")
+        node = {"level": 0}
+        node.update({key: value for key, value in header.items() if key not in ("format", "version")})
+        return node
+
+    def matches(self, first_line):
+        try:
+            header = json.loads(first_line)
+        except ValueError:
+            return False
+        return isinstance(header, dict) and header.get("format") == JsonLinesCourseMaterialFormat.FORMAT_ID
+
+
+COURSE_MATERIAL_FORMATS = {course_material_format.NAME: course_material_format for course_material_format in [JsonLinesCourseMaterialFormat(), YamlCourseMaterialFormat()]}
+
+
+class UnitNode:
+    """
+    A unit of a course material file and its place in the certification. With a JSON lines file only the position of the unit
+    in the file is kept, its content is read again each time it is needed so that an outline of a whole catalog stays small.
+    """
+    __slots__ = ("learning_path_index", "learning_path_title", "module_title", "unit_title", "_file_path", "_offset", "_unit_content")
+
+    def __init__(self, learning_path_index, learning_path_title, module_title, unit_title, file_path=None, offset=None, unit_content=None):
+        self.learning_path_index = learning_path_index
+        self.learning_path_title = learning_path_title
+        self.module_title = module_title
+        self.unit_title = unit_title
+        self._file_path = file_path
+        self._offset = offset
+        self._unit_content = unit_content
+
+    @property
+    def unit_content(self):
+        if self._unit_content is not None:
+            return self._unit_content
+        with open(self._file_path, "rb") as file:
+            file.seek(self._offset)
+            return json.loads(file.readline())["unit_content"]
+
+
+class CourseMaterialStore:
+    """
+    Reads and writes the course material of a certification, the output of Certification.to_dict.
+    Files are written in the configured format and read in whatever format they were written in.
+    """
+    def __init__(self, format_name=JsonLinesCourseMaterialFormat.NAME):
+        if format_name not in COURSE_MATERIAL_FORMATS:
+            raise ValueError(f"Unknown course material format {format_name}, expected one of {', '.join(COURSE_MATERIAL_FORMATS)}")
+        self.course_material_format = COURSE_MATERIAL_FORMATS[format_name]
+
+    def file_path(self, directory, certification_code, format_name=None):
+        course_material_format = COURSE_MATERIAL_FORMATS[format_name] if format_name else self.course_material_format
+        return os.path.join(directory, f"{certification_code}{course_material_format.FILE_EXTENSION}")
+
+    def find(self, directory, certification_code):
+        """Returns the path of the course material of the certification in directory, the most recent one when several formats exist, None if there is none."""
+        file_paths = [self.file_path(directory, certification_code, format_name) for format_name in COURSE_MATERIAL_FORMATS]
+        existing_file_paths = [file_path for file_path in file_paths if os.path.exists(file_path)]
+        if not existing_file_paths:
+            return None
+        return max(existing_file_paths, key=os.path.getmtime)
+
+    @staticmethod
+    def detect_format(file_path):
+        with open(file_path, "r", encoding="utf-8") as file:
+            first_line = file.readline()
+        for course_material_format in COURSE_MATERIAL_FORMATS.values():
+            if course_material_format.matches(first_line):
+                return course_material_format
+        return COURSE_MATERIAL_FORMATS[YamlCourseMaterialFormat.NAME]
+
+    def load(self, file_path):
+        course_material_format = CourseMaterialStore.detect_format(file_path)
+        with open(file_path, "r", encoding="utf-8") as file:
+            return course_material_format.load(file)
+
+    def dump(self, data, file_path, format_name=None):
+        self.write_nodes(AbstractCourseMaterialFormat.nodes_from_data(data), file_path, format_name)
+
+    def iter_nodes(self, file_path):
+        course_material_format = CourseMaterialStore.detect_format(file_path)
+        with open(file_path, "r", encoding="utf-8") as file:
+            yield from course_material_format.read_nodes(file)
+
+    def write_nodes(self, nodes, file_path, format_name=None):
+        course_material_format = COURSE_MATERIAL_FORMATS[format_name] if format_name else self.course_material_format
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            course_material_format.write_nodes(nodes, file)
+        os.replace(tmp_path, file_path)
+
+    def iter_units(self, file_path):
+        """Yields a UnitNode for each unit of the course material, in document order."""
+        learning_path_index, learning_path_title, module_title = -1, None, None
+        if isinstance(CourseMaterialStore.detect_format(file_path), JsonLinesCourseMaterialFormat):
+            # binary lines, their lengths give the offset of each unit
+            with open(file_path, "rb") as file:
+                offset = len(file.readline())
+                for line in file:
+                    node = json.loads(line) if line.strip() else {}
+                    level = node.get("level")
+                    if level == 1:
+                        learning_path_index, learning_path_title = learning_path_index + 1, node["learning_path_title"]
+                    elif level == 2:
+                        module_title = node["module_title"]
+                    elif level == AbstractCourseMaterialFormat.UNIT_LEVEL:
+                        yield UnitNode(learning_path_index, learning_path_title, module_title, node["unit_title"], file_path=file_path, offset=offset)
+                    offset += len(line)
+            return
+        for node in self.iter_nodes(file_path):
+            if node["level"] == 1:
+                learning_path_index, learning_path_title = learning_path_index + 1, node["learning_path_title"]
+            elif node["level"] == 2:
+                module_title = node["module_title"]
+            elif node["level"] == AbstractCourseMaterialFormat.UNIT_LEVEL:
+                yield UnitNode(learning_path_index, learning_path_title, module_title, node["unit_title"], unit_content=node["unit_content"])
+
+    def iter_unit_windows(self, file_path, window_size):
+        """Yields the units of the course material in lists of at most window_size units, in a single list when window_size is None."""
+        window = []
+        for unit in self.iter_units(file_path):
+            window.append(unit)
+            if len(window) == window_size:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def transform_units(self, source_path, target_path, transform_contents, window_size, format_name=None):
+        """
+        Copies the course material of source_path to target_path with new unit contents, without holding more than window_size units in memory
+        when both files are JSON lines. transform_contents receives the contents of a window of units and returns their new content keyed by content.
+        With window_size None, every unit is in a single window. Returns the number of units.
+        """
+        unit_count = 0
+
+        def transformed_nodes():
+            nonlocal unit_count
+            # nodes read since the last window was transformed, written once their units have their new content
+            pending_nodes = []
+            pending_units = []
+            for node in self.iter_nodes(source_path):
+                pending_nodes.append(node)
+                if node["level"] == AbstractCourseMaterialFormat.UNIT_LEVEL:
+                    pending_units.append(node)
+                if len(pending_units) == window_size:
+                    CourseMaterialStore._transform_window(pending_units, transform_contents)
+                    unit_count += len(pending_units)
+                    yield from pending_nodes
+                    pending_nodes, pending_units = [], []
+            if pending_units:
+                CourseMaterialStore._transform_window(pending_units, transform_contents)
+                unit_count += len(pending_units)
+            yield from pending_nodes
+
+        self.write_nodes(transformed_nodes(), target_path, format_name)
+        return unit_count
+
+    @staticmethod
+    def _transform_window(units, transform_contents):
+        new_contents = transform_contents([unit["unit_content"] for unit in units])
+        for unit in units:
+            unit["unit_content"] = new_contents[unit["unit_content"]]
+
+    def convert(self, file_path, format_name):
+        """Writes the course material of file_path in another format next to it and returns the path of the new file."""
+        converted_file_path = os.path.splitext(file_path)[0] + COURSE_MATERIAL_FORMATS[format_name].FILE_EXTENSION
+        self.write_nodes(self.iter_nodes(file_path), converted_file_path, format_name)
+        return converted_file_path
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+METRIC_PREFIX = "trainforcert"
+# upper bounds of the histogram buckets, in seconds, from a cached page to a slow LLM request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# requests listed in the report as the slowest and the most expensive ones
+TOP_REQUEST_COUNT = 10
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile, None beyond the last bucket or without observation."""
+        rank = q * self.count
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank and cumulative_count > 0:
+                return upper_bound
+        return None
+
+    def cumulative_counts(self):
+        cumulative_counts = []
+        cumulative_count = 0
+        for bucket_count in self.bucket_counts:
+            cumulative_count += bucket_count
+            cumulative_counts.append(cumulative_count)
+        return cumulative_counts
+
+
+class RunTelemetry:
+    """
+    Measures of a trainforcert command: wall time of each stage, histograms of page loads, page parses and LLM requests,
+    counters, and the latency and token usage of each LLM request with the unit it was sent for.
+    Shared by every thread of the run, written as a JSON report and in the Prometheus text exposition format.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = []
+            self.histograms = {}
+            self.counters = {}
+            self.llm_requests = []
+            self._llm_request_count = 0
+
+    @staticmethod
+    def _series_key(metric, labels):
+        return metric, tuple(sorted(labels.items()))
+
+    def observe(self, metric, value, **labels):
+        with self._lock:
+            key = RunTelemetry._series_key(metric, labels)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def increment(self, metric, value=1, **labels):
+        with self._lock:
+            key = RunTelemetry._series_key(metric, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, metric, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            with self._lock:
+                self.stages.append({"stage": name, "seconds": round(time.perf_counter() - start, 3), "succeeded": succeeded})
+
+    def record_llm_request(self, operation, model, content, latency_seconds, prompt_tokens, completion_tokens, cached=False, packed_contents=None, batch=False):
+        """
+        Records a request sent for a unit. latency_seconds is None for a batch job result.
+        A packed request is recorded once per unit of packed_contents, with the latency of the whole request and a share of its tokens
+        in proportion to the length of the unit. The counters and histograms count it once.
+        """
+        unit_contents = packed_contents if packed_contents else [content]
+        total_characters = sum(len(unit_content) for unit_content in unit_contents) or 1
+        requests = []
+        prompt_tokens_left, completion_tokens_left = prompt_tokens, completion_tokens
+        for i, unit_content in enumerate(unit_contents):
+            # the last unit takes the rounding remainder, the shares add up to the tokens of the request
+            last = i == len(unit_contents) - 1
+            unit_prompt_tokens = prompt_tokens_left if last else prompt_tokens * len(unit_content) // total_characters
+            unit_completion_tokens = completion_tokens_left if last else completion_tokens * len(unit_content) // total_characters
+            prompt_tokens_left -= unit_prompt_tokens
+            completion_tokens_left -= unit_completion_tokens
+            requests.append({
+                "operation": operation,
+                "model": model,
+                "unit": hashlib.sha256(unit_content.encode("utf-8")).hexdigest()[:16],
+                "characters": len(unit_content),
+                "latency_seconds": round(latency_seconds, 4) if latency_seconds is not None else None,
+                "prompt_tokens": unit_prompt_tokens,
+                "completion_tokens": unit_completion_tokens,
+                "cached": cached,
+                "packed": packed_contents is not None,
+                "request_units": len(unit_contents),
+                "batch": batch,
+            })
+        source = "cache" if cached else "batch" if batch else "online"
+        with self._lock:
+            # the units of a packed request share its request number
+            for request in requests:
+                request["request"] = self._llm_request_count
+            self._llm_request_count += 1
+            self.llm_requests.extend(requests)
+        self.increment("llm_requests_total", operation=operation, source=source)
+        if not cached:
+            self.increment("llm_tokens_total", prompt_tokens, operation=operation, type="prompt")
+            self.increment("llm_tokens_total", completion_tokens, operation=operation, type="completion")
+        if latency_seconds is not None and not cached:
+            self.observe("llm_request_seconds", latency_seconds, operation=operation)
+
+    def report(self):
+        with self._lock:
+            histograms = [{
+                "metric": metric,
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum_seconds": round(histogram.sum, 4),
+                "mean_seconds": round(histogram.sum / histogram.count, 4) if histogram.count else None,
+                "p50_seconds": histogram.quantile(0.5),
+                "p95_seconds": histogram.quantile(0.95),
+                "buckets": dict(zip([str(upper_bound) for upper_bound in histogram.buckets], histogram.bucket_counts)),
+            } for (metric, labels), histogram in sorted(self.histograms.items())]
+            counters = [{"metric": metric, "labels": dict(labels), "value": value} for (metric, labels), value in sorted(self.counters.items())]
+            llm_requests = list(self.llm_requests)
+            stages = list(self.stages)
+        sent_requests = [request for request in llm_requests if not request["cached"]]
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "stages": stages,
+            "histograms": histograms,
+            "counters": counters,
+            # one unit per packed request, its units all have the latency of the request
+            "slowest_llm_requests": sorted({request["request"]: request for request in sent_requests if request["latency_seconds"] is not None}.values(),
+                                           key=lambda request: request["latency_seconds"], reverse=True)[:TOP_REQUEST_COUNT],
+            "most_expensive_llm_requests": sorted(sent_requests, key=lambda request: request["prompt_tokens"] + request["completion_tokens"], reverse=True)[:TOP_REQUEST_COUNT],
+            "llm_requests": llm_requests,
+        }
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        formatted_labels = []
+        for name, value in labels:
+            escaped_value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            formatted_labels.append(f'{name}="{escaped_value}"')
+        return "{" + ",".join(formatted_labels) + "}"
+
+    def to_prometheus(self):
+        """The stage times, counters and histograms in the Prometheus text exposition format, for a textfile collector or a push gateway."""
+        lines = []
+        with self._lock:
+            stage_name = f"{METRIC_PREFIX}_stage_seconds"
+            lines.append(f"# HELP {stage_name} Wall time of each stage of the run.")
+            lines.append(f"# TYPE {stage_name} gauge")
+            # a stage run several times, the scrap of each certification for instance, is one series with their total time
+            stage_seconds = {}
+            for stage in self.stages:
+                labels = (("stage", stage["stage"]), ("succeeded", str(stage["succeeded"]).lower()))
+                stage_seconds[labels] = stage_seconds.get(labels, 0) + stage["seconds"]
+            for labels, seconds in stage_seconds.items():
+                lines.append(f"{stage_name}{RunTelemetry._format_labels(labels)} {round(seconds, 3)}")
+            declared_metrics = set()
+            for (metric, labels), value in sorted(self.counters.items()):
+                name = f"{METRIC_PREFIX}_{metric}"
+                if name not in declared_metrics:
+                    lines.append(f"# TYPE {name} counter")
+                    declared_metrics.add(name)
+                lines.append(f"{name}{RunTelemetry._format_labels(labels)} {value}")
+            for (metric, labels), histogram in sorted(self.histograms.items()):
+                name = f"{METRIC_PREFIX}_{metric}"
+                if name not in declared_metrics:
+                    lines.append(f"# TYPE {name} histogram")
+                    declared_metrics.add(name)
+                for upper_bound, cumulative_count in zip(histogram.buckets, histogram.cumulative_counts()):
+                    lines.append(f"{name}_bucket{RunTelemetry._format_labels(labels + (('le', str(upper_bound)),))} {cumulative_count}")
+                lines.append(f"{name}_bucket{RunTelemetry._format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{RunTelemetry._format_labels(labels)} {round(histogram.sum, 6)}")
+                lines.append(f"{name}_count{RunTelemetry._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, run_name):
+        """Writes run_name.json and run_name.prom in directory, each replaced atomically, and returns their paths."""
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        json_path = os.path.join(directory, f"{run_name}.json")
+        prometheus_path = os.path.join(directory, f"{run_name}.prom")
+        for path, text in [(json_path, json.dumps(self.report(), indent=4)), (prometheus_path, self.to_prometheus())]:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as file:
+                file.write(text)
+            os.replace(tmp_path, path)
+        return json_path, prometheus_path
+
+
+# shared by the course, the scrappables and the deployment of a run
+run_telemetry = RunTelemetry()
+
+
+def telemetry_stage(name):
+    """Decorator recording the wall time of each call of the function as stage name."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with run_telemetry.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,72 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# the modules import each other from src, as when trainforcert.py is run from there
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+from llm.request_planner import RequestPlanner
+from question.question import Question, LearningPathQuestions, CertificationQuestions
+
+
+@pytest.fixture
+def request_planner():
+    return RequestPlanner(pack_unit_max_tokens=10, pack_request_max_tokens=25, split_unit_max_tokens=50)
+
+
+@pytest.fixture
+def question_factory():
+    def create_question(text, correct_answer="Azure Policy"):
+        return Question(question=text, answers=[correct_answer, "Azure Monitor"], correct_answer=correct_answer, explanation="")
+    return create_question
+
+
+@pytest.fixture
+def certification_questions_factory():
+    # each learning path is given as a (title, questions) tuple
+    def create_certification_questions(*learning_paths):
+        return CertificationQuestions(certification_title="Fixture", questions=[
+            LearningPathQuestions(learning_path_title=title, questions=questions) for title, questions in learning_paths])
+    return create_certification_questions
+
+
+@pytest.fixture
+def catalog_entry_factory():
+    def create_catalog_entry(code, url, title="Title"):
+        return {"certification_id": code, "certification_title": title, "course_title": title, "course_path": url}
+    return create_catalog_entry
+
+
+@pytest.fixture
+def scrapped_unit_factory():
+    # the attributes of a scrapped Unit read by ScrapCheckpoint
+    def create_scrapped_unit(number):
+        return SimpleNamespace(url=f"https://learn.microsoft.com/unit-{number}", unit_title=f"Unit {number}", unit_content=f"Content {number}")
+    return create_scrapped_unit
+
+
+@pytest.fixture
+def course_material():
+    return {
+        "certification_content": [
+            {
+                "learning_path_title": "Manage identities",
+                "modules_in_learning_path": [
+                    {"module_title": "Users", "units_in_module": [
+                        {"unit_title": "Introduction", "unit_content": "Create users in Microsoft Entra ID."},
+                        {"unit_title": "Groups", "unit_content": "Groups are « dynamic » or assigned.\nSecond line."},
+                    ]},
+                    {"module_title": "Empty module", "units_in_module": []},
+                ],
+            },
+            {
+                "learning_path_title": "Storage",
+                "modules_in_learning_path": [
+                    {"module_title": "Accounts", "units_in_module": [{"unit_title": "Redundancy", "unit_content": "LRS, ZRS, GRS."}]},
+                ],
+            },
+        ]
+    }
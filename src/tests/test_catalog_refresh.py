@@ -0,0 +1,44 @@
+import textwrap
+
+from orchestration.catalog_refresh import CatalogRefresh
+from storage.certification_catalog import CertificationCatalog
+
+# imported by the spawned workers in place of course.py, the certification CRASH kills its worker
+STUB_COURSE_MODULE = textwrap.dedent("""
+    import os
+
+
+    class Course:
+        shared_browser_slots = None
+        shared_llm_slots = None
+
+        def __init__(self, certification_code, certification_title):
+            self.certification_code = certification_code
+
+        def scrap(self, certification_url, **scrap_options):
+            if self.certification_code == "CRASH":
+                os._exit(1)
+
+        def write_telemetry_report(self, command):
+            pass
+""")
+
+
+def test_a_crash_is_only_counted_against_the_certifications_that_were_running(tmp_path, monkeypatch, catalog_entry_factory):
+    stub_dir = tmp_path / "stub"
+    stub_dir.mkdir()
+    (stub_dir / "course.py").write_text(STUB_COURSE_MODULE, encoding="utf-8")
+    # the workers are spawned with the sys.path of this process
+    monkeypatch.syspath_prepend(str(stub_dir))
+    work_dir = tmp_path / "src"
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+    catalog_path = str(tmp_path / "catalog.csv")
+    codes = ["AZ-104", "CRASH", "AZ-204", "AZ-305"]
+    CertificationCatalog(catalog_path).upsert([catalog_entry_factory(code, f"https://learn.microsoft.com/{code}", code) for code in codes])
+
+    # one process: the certifications queued behind CRASH never start before its worker dies, twice
+    results = CatalogRefresh(codes, stages=["scrap"], processes=1, catalog_path=catalog_path).run()
+
+    assert {result["certification_code"]: result["succeeded"] for result in results} == {"AZ-104": True, "CRASH": False, "AZ-204": True, "AZ-305": True}
+    assert results[1]["error"] == "worker process died"
@@ -0,0 +1,55 @@
+import os
+import threading
+
+from storage.certification_catalog import CertificationCatalog
+
+
+def test_upsert_adds_then_updates_by_code(tmp_path, catalog_entry_factory):
+    catalog_path = str(tmp_path / "catalog.csv")
+    catalog = CertificationCatalog(catalog_path)
+    assert catalog.list() == []
+    assert catalog.upsert([catalog_entry_factory("AZ-104", "https://learn.microsoft.com/az-104/"), catalog_entry_factory("AZ-900", "https://learn.microsoft.com/az-900/")]) == 2
+    assert catalog.upsert([catalog_entry_factory("az-104", "https://learn.microsoft.com/az-104/", "New title")]) == 0
+    reloaded = CertificationCatalog(catalog_path)
+    assert [entry["certification_id"] for entry in reloaded.list()] == ["az-104", "AZ-900"]
+    assert reloaded.get("AZ-104")["certification_title"] == "New title"
+
+
+def test_upsert_replaces_a_course_recorded_under_another_code(tmp_path, catalog_entry_factory):
+    catalog = CertificationCatalog(str(tmp_path / "catalog.csv"))
+    catalog.upsert([catalog_entry_factory("XX-000", "https://learn.microsoft.com/az-104")])
+    assert catalog.upsert([catalog_entry_factory("AZ-104", "https://learn.microsoft.com/AZ-104/")]) == 0
+    assert catalog.get("XX-000") is None
+    assert catalog.get("AZ-104")["course_path"] == "https://learn.microsoft.com/AZ-104/"
+
+
+def test_upsert_replaces_the_file_without_leaving_a_temporary_file(tmp_path, catalog_entry_factory):
+    catalog_path = tmp_path / "nested" / "catalog.csv"
+    CertificationCatalog(str(catalog_path)).upsert([catalog_entry_factory("AZ-104", "https://learn.microsoft.com/az-104")])
+    assert os.listdir(catalog_path.parent) == ["catalog.csv"]
+    assert catalog_path.read_text(encoding="utf-8").splitlines() == [
+        "certification_id,certification_title,course_title,course_path",
+        "AZ-104,Title,Title,https://learn.microsoft.com/az-104",
+    ]
+
+
+def test_concurrent_upserts_keep_every_entry(tmp_path, catalog_entry_factory):
+    catalog_path = str(tmp_path / "catalog.csv")
+    # every thread starts from the empty catalog it loaded, the file is read again under the lock before each write
+    catalogs = [CertificationCatalog(catalog_path) for _ in range(8)]
+    threads = [threading.Thread(target=catalog.upsert, args=([catalog_entry_factory(f"AZ-{i:03}", f"https://learn.microsoft.com/az-{i:03}")],))
+               for i, catalog in enumerate(catalogs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(entry["certification_id"] for entry in CertificationCatalog(catalog_path).list()) == [f"AZ-{i:03}" for i in range(8)]
+
+
+def test_reads_values_written_with_a_space_after_the_commas(tmp_path, catalog_entry_factory):
+    catalog_path = tmp_path / "catalog.csv"
+    catalog_path.write_text("certification_id, certification_title, course_title, course_path\n"
+                            "AZ-104, Azure Administrator, Azure Administrator, https://learn.microsoft.com/az-104\n"
+                            ", missing code, , https://learn.microsoft.com/none\n", encoding="utf-8")
+    catalog = CertificationCatalog(str(catalog_path))
+    assert catalog.list() == [catalog_entry_factory("AZ-104", "https://learn.microsoft.com/az-104", "Azure Administrator")]
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from storage.course_material_store import CourseMaterialStore, JsonLinesCourseMaterialFormat, YamlCourseMaterialFormat, COURSE_MATERIAL_FORMATS
+
+@pytest.mark.parametrize("format_name", list(COURSE_MATERIAL_FORMATS))
+def test_dump_then_load_gives_back_the_course_material(tmp_path, course_material, format_name):
+    store = CourseMaterialStore(format_name)
+    file_path = store.file_path(str(tmp_path), "AZ-104")
+    store.dump(course_material, file_path)
+    assert file_path.endswith(COURSE_MATERIAL_FORMATS[format_name].FILE_EXTENSION)
+    assert CourseMaterialStore.detect_format(file_path) is COURSE_MATERIAL_FORMATS[format_name]
+    # read in the format it was written in, whatever the configured one
+    assert CourseMaterialStore().load(file_path) == course_material
+    assert CourseMaterialStore(YamlCourseMaterialFormat.NAME).load(file_path) == course_material
+
+
+@pytest.mark.parametrize("source_format, target_format", [("jsonl", "yaml"), ("yaml", "jsonl")])
+def test_convert_keeps_the_course_material(tmp_path, course_material, source_format, target_format):
+    store = CourseMaterialStore(source_format)
+    file_path = store.file_path(str(tmp_path), "AZ-104")
+    store.dump(course_material, file_path)
+    converted_file_path = store.convert(file_path, target_format)
+    assert converted_file_path == store.file_path(str(tmp_path), "AZ-104", target_format)
+    assert store.load(converted_file_path) == course_material
+
+
+@pytest.mark.parametrize("format_name", list(COURSE_MATERIAL_FORMATS))
+def test_iter_units_reads_each_unit_in_document_order(tmp_path, course_material, format_name):
+    store = CourseMaterialStore(format_name)
+    file_path = store.file_path(str(tmp_path), "AZ-104")
+    store.dump(course_material, file_path)
+    units = [(unit.learning_path_index, unit.learning_path_title, unit.module_title, unit.unit_title, unit.unit_content) for unit in store.iter_units(file_path)]
+    assert units == [
+        (0, "Manage identities", "Users", "Introduction", "Create users in Microsoft Entra ID."),
+        (0, "Manage identities", "Users", "Groups", "Groups are « dynamic » or assigned.\nSecond line."),
+        (1, "Storage", "Accounts", "Redundancy", "LRS, ZRS, GRS."),
+    ]
+
+
+def test_transform_units_writes_the_new_contents_window_by_window(tmp_path, course_material):
+    store = CourseMaterialStore()
+    source_path = store.file_path(str(tmp_path), "AZ-104")
+    target_path = str(tmp_path / "cleaned" / "AZ-104.jsonl")
+    store.dump(course_material, source_path)
+    window_sizes = []
+
+    def transform_contents(contents):
+        window_sizes.append(len(contents))
+        return {content: content.upper() for content in contents}
+
+    assert store.transform_units(source_path, target_path, transform_contents, window_size=2) == 3
+    assert window_sizes == [2, 1]
+    transformed = store.load(target_path)
+    units = [unit for learning_path in transformed["certification_content"] for module in learning_path["modules_in_learning_path"] for unit in module["units_in_module"]]
+    assert [unit["unit_content"] for unit in units] == ["CREATE USERS IN MICROSOFT ENTRA ID.", "GROUPS ARE « DYNAMIC » OR ASSIGNED.\nSECOND LINE.", "LRS, ZRS, GRS."]
+    assert [module["module_title"] for module in transformed["certification_content"][0]["modules_in_learning_path"]] == ["Users", "Empty module"]
+
+
+def test_without_window_size_every_unit_is_in_one_window(tmp_path, course_material):
+    store = CourseMaterialStore()
+    file_path = store.file_path(str(tmp_path), "AZ-104")
+    store.dump(course_material, file_path)
+    assert [len(window) for window in store.iter_unit_windows(file_path, None)] == [3]
+    window_sizes = []
+
+    def transform_contents(contents):
+        window_sizes.append(len(contents))
+        return {content: content for content in contents}
+
+    assert store.transform_units(file_path, str(tmp_path / "copy.jsonl"), transform_contents, window_size=None) == 3
+    assert window_sizes == [3]
+
+
+def test_jsonl_file_with_another_header_is_refused(tmp_path):
+    file_path = tmp_path / "AZ-104.jsonl"
+    file_path.write_text('{"format": "trainforcert-course-material", "version": 99}\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        CourseMaterialStore().load(str(file_path))
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        CourseMaterialStore("xml")
+
+
+def test_find_returns_the_most_recent_format(tmp_path, course_material):
+    store = CourseMaterialStore()
+    assert store.find(str(tmp_path), "AZ-104") is None
+    yaml_path = store.file_path(str(tmp_path), "AZ-104", YamlCourseMaterialFormat.NAME)
+    store.dump(course_material, yaml_path, YamlCourseMaterialFormat.NAME)
+    jsonl_path = store.file_path(str(tmp_path), "AZ-104", JsonLinesCourseMaterialFormat.NAME)
+    store.dump(course_material, jsonl_path)
+    os.utime(yaml_path, (1, 1))
+    assert store.find(str(tmp_path), "AZ-104") == jsonl_path
@@ -0,0 +1,15 @@
+from llm.llm_batch import LLMBatchJob
+from question.question import Questions
+
+
+def test_response_format_is_a_strict_json_schema():
+    response_format = LLMBatchJob.response_format(Questions)
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "Questions"
+    assert response_format["json_schema"]["strict"] is True
+    schema = response_format["json_schema"]["schema"]
+    question_schema = schema["$defs"]["Question"]
+    for object_schema in (schema, question_schema):
+        assert object_schema["additionalProperties"] is False
+        assert object_schema["required"] == list(object_schema["properties"])
+    assert question_schema["required"] == ["question", "answers", "correct_answer", "explanation"]
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from question.question_dedup import QuestionDeduplicator
+
+
+def test_removes_a_reworded_question_of_another_learning_path(question_factory, certification_questions_factory):
+    kept = question_factory("Which service is recommended for participants to enforce tagging rules on resources?")
+    reworded = question_factory("Which service is beneficial for participants to enforce tagging rules on resources?")
+    deduplicated, removed = QuestionDeduplicator().deduplicate(certification_questions_factory(("first", [kept]), ("second", [reworded])))
+    assert [path.questions for path in deduplicated.questions] == [[kept], []]
+    assert len(removed) == 1
+    assert removed[0]["learning_path_title"] == "second"
+    assert removed[0]["duplicate_of"] == {"learning_path_title": "first", "question": kept.question}
+    assert QuestionDeduplicator().threshold <= removed[0]["similarity"] < 1
+
+
+def test_keeps_the_first_of_exact_duplicates(question_factory, certification_questions_factory):
+    question = question_factory("What does a resource lock prevent?", "Accidental deletion")
+    deduplicated, removed = QuestionDeduplicator().deduplicate(certification_questions_factory(("first", [question, question.model_copy()])))
+    assert deduplicated.questions[0].questions == [question]
+    assert removed[0]["similarity"] == 1.0
+
+
+def test_keeps_distinct_questions(question_factory, certification_questions_factory):
+    questions = [
+        question_factory("Which service enforces tagging rules on resources?"),
+        question_factory("How many availability zones does a region with zone support have?", "Three"),
+        question_factory("Which tool moves on-premises virtual machines to Azure?", "Azure Migrate"),
+    ]
+    deduplicated, removed = QuestionDeduplicator().deduplicate(certification_questions_factory(("first", questions)))
+    assert deduplicated.questions[0].questions == questions
+    assert removed == []
+
+
+def test_same_question_with_another_correct_answer_is_kept(question_factory, certification_questions_factory):
+    first = question_factory("Which service should you use to meet the requirement?", "Azure Policy")
+    second = question_factory("Which service should you use to meet the requirement?", "Azure Blueprints with management group assignments")
+    deduplicated, removed = QuestionDeduplicator(threshold=0.9).deduplicate(certification_questions_factory(("first", [first, second])))
+    assert deduplicated.questions[0].questions == [first, second]
+    assert removed == []
+
+
+def test_short_unrelated_questions_are_not_compared(question_factory, certification_questions_factory):
+    # a handful of 4-grams each, most bins of their signatures are empty before densification
+    rng = random.Random(0)
+    questions = [question_factory("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(12)), "") for _ in range(500)]
+    deduplicator = QuestionDeduplicator()
+    deduplicated, removed = deduplicator.deduplicate(certification_questions_factory(("first", questions)))
+    assert removed == []
+    assert deduplicator.candidate_pair_count == 0
+
+
+def test_identical_shingles_have_identical_signatures(question_factory):
+    shingles = QuestionDeduplicator.shingles(question_factory("What does a resource lock prevent?"))
+    assert QuestionDeduplicator.signature(shingles, {}) == QuestionDeduplicator.signature(set(shingles), {})
+
+
+def test_bands_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        QuestionDeduplicator(bands=10)
@@ -0,0 +1,70 @@
+from llm.request_planner import RequestPlanner
+
+
+def text_of_tokens(tokens, letter="a"):
+    # estimate_tokens counts a token per 4 characters, plus one
+    return letter * ((tokens - 1) * RequestPlanner.CHARACTERS_PER_TOKEN)
+
+
+def test_packs_small_units_up_to_the_request_budget(request_planner):
+    contents = [text_of_tokens(9, letter) for letter in "abcd"]
+    request_plan = request_planner.plan(contents)
+    # 3 units of 9 tokens would exceed the budget of 25, so the units are packed 2 by 2
+    assert list(request_plan.packed_requests.values()) == [contents[:2], contents[2:]]
+    assert request_plan.single_requests == []
+    for request_text in request_plan.packed_requests:
+        assert request_plan.is_packed(request_text)
+
+
+def test_lone_small_unit_is_sent_on_its_own(request_planner):
+    content = text_of_tokens(5)
+    request_plan = request_planner.plan([content])
+    assert request_plan.single_requests == [content]
+    assert request_plan.packed_requests == {}
+
+
+def test_units_over_the_pack_limit_are_not_packed(request_planner):
+    content = text_of_tokens(11)
+    request_plan = request_planner.plan([content, text_of_tokens(5, "b")])
+    assert content in request_plan.single_requests
+    assert request_plan.packed_requests == {}
+
+
+def test_splits_oversized_units_into_chunks_under_the_limit(request_planner):
+    content = "One sentence. " * 40
+    request_plan = request_planner.plan([content])
+    chunks = request_plan.split_requests[content]
+    assert len(chunks) > 1
+    assert "".join(chunks) == content
+    assert all(len(chunk) <= request_planner.split_unit_max_tokens * RequestPlanner.CHARACTERS_PER_TOKEN for chunk in chunks)
+
+
+def test_splits_a_sentence_longer_than_the_limit(request_planner):
+    content = "x" * 500
+    chunks = request_planner.plan([content]).split_requests[content]
+    assert "".join(chunks) == content
+    assert all(len(chunk) <= request_planner.split_unit_max_tokens * RequestPlanner.CHARACTERS_PER_TOKEN for chunk in chunks)
+
+
+def test_duplicate_contents_are_planned_once(request_planner):
+    content = text_of_tokens(20)
+    assert request_planner.plan([content, content]).request_texts() == [content]
+
+
+def test_assemble_maps_responses_back_to_each_content(request_planner):
+    small_contents = [text_of_tokens(8, letter) for letter in "ab"]
+    single_content = text_of_tokens(20, "c")
+    split_content = "One sentence. " * 40
+    request_plan = request_planner.plan(small_contents + [single_content, split_content])
+    # each request is answered with its own text, a packed response keeps the unit tags
+    responses = {request_text: request_text for request_text in request_plan.request_texts()}
+    assembled = request_plan.assemble(responses, RequestPlanner.unpack_text, "".join)
+    assert assembled == {content: content for content in small_contents + [single_content, split_content]}
+
+
+def test_assemble_leaves_out_units_missing_from_a_packed_response(request_planner):
+    small_contents = [text_of_tokens(8, letter) for letter in "ab"]
+    request_plan = request_planner.plan(small_contents)
+    packed_request = next(iter(request_plan.packed_requests))
+    responses = {packed_request: f'<unit id="1">\n{small_contents[0]}\n</unit>'}
+    assert request_plan.assemble(responses, RequestPlanner.unpack_text, "".join) == {small_contents[0]: small_contents[0]}
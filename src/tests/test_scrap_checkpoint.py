@@ -0,0 +1,87 @@
+import pytest
+
+from scrapper.ScrapCheckpoint import ScrapCheckpoint
+from scrapper.course_structure.AbstractScrappable import PageScrapError
+
+
+@pytest.fixture
+def write_units(scrapped_unit_factory):
+    def record_units(journal_path, numbers, **options):
+        checkpoint = ScrapCheckpoint(journal_path, **options)
+        for number in numbers:
+            checkpoint.record_unit(scrapped_unit_factory(number))
+        checkpoint.close()
+    return record_units
+
+
+def test_resume_skips_the_units_of_the_journal(tmp_path, write_units, scrapped_unit_factory):
+    journal_path = str(tmp_path / "AZ-104.checkpoint.jsonl")
+    write_units(journal_path, [1, 2])
+    checkpoint = ScrapCheckpoint(journal_path, resume=True)
+    assert checkpoint.get_unit_content(scrapped_unit_factory(1).url) == "Content 1"
+    assert checkpoint.get_unit_content(scrapped_unit_factory(2).url) == "Content 2"
+    assert checkpoint.get_unit_content(scrapped_unit_factory(3).url) is None
+    checkpoint.close()
+
+
+def test_resume_ignores_a_truncated_last_line(tmp_path, write_units, scrapped_unit_factory):
+    journal_path = tmp_path / "AZ-104.checkpoint.jsonl"
+    write_units(str(journal_path), [1])
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        journal.write('{"url": "https://learn.microsoft.com/unit-2", "unit_con')
+    checkpoint = ScrapCheckpoint(str(journal_path), resume=True)
+    assert checkpoint.scrapped_units == {scrapped_unit_factory(1).url: "Content 1"}
+    checkpoint.close()
+
+
+def test_journal_is_kept_by_a_run_without_resume(tmp_path, write_units, scrapped_unit_factory):
+    journal_path = str(tmp_path / "AZ-104.checkpoint.jsonl")
+    write_units(journal_path, [1])
+    # a new run that is not resumed scraps every unit again but keeps what the journal holds
+    write_units(journal_path, [2])
+    checkpoint = ScrapCheckpoint(journal_path, resume=True)
+    assert sorted(checkpoint.scrapped_units) == [scrapped_unit_factory(1).url, scrapped_unit_factory(2).url]
+    checkpoint.close()
+
+
+def test_reset_empties_the_journal(tmp_path, write_units, scrapped_unit_factory):
+    journal_path = str(tmp_path / "AZ-104.checkpoint.jsonl")
+    write_units(journal_path, [1])
+    write_units(journal_path, [2], reset=True)
+    checkpoint = ScrapCheckpoint(journal_path, resume=True)
+    assert list(checkpoint.scrapped_units) == [scrapped_unit_factory(2).url]
+    checkpoint.close()
+
+
+def test_resume_and_reset_cannot_be_combined(tmp_path):
+    with pytest.raises(ValueError):
+        ScrapCheckpoint(str(tmp_path / "AZ-104.checkpoint.jsonl"), resume=True, reset=True)
+
+
+def test_every_recorded_unit_is_notified(tmp_path, write_units):
+    notified = []
+    write_units(str(tmp_path / "AZ-104.checkpoint.jsonl"), [1, 2], on_unit_scrapped=lambda unit: notified.append(unit.unit_title))
+    assert notified == ["Unit 1", "Unit 2"]
+
+
+class FlakyScrappable:
+    def __init__(self, failures):
+        self.url = "https://learn.microsoft.com/flaky"
+        self.failures = failures
+        self.attempts = 0
+
+    def scrap(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise PageScrapError(f"Unable to load {self.url}")
+
+
+def test_retry_failed_returns_the_scrappables_still_failing(tmp_path):
+    checkpoint = ScrapCheckpoint(str(tmp_path / "AZ-104.checkpoint.jsonl"))
+    recovering, failing = FlakyScrappable(failures=1), FlakyScrappable(failures=10)
+    checkpoint.queue_retry(recovering)
+    checkpoint.queue_retry(failing)
+    assert checkpoint.retry_failed(max_attempts=3) == [failing]
+    assert recovering.attempts == 2
+    assert failing.attempts == 3
+    checkpoint.close()
@@ -1,30 +1,61 @@
-import csv
 import sys
 import argparse
 import argcomplete
 
-from course import Course
-from scrapper.CertificationScrapperService import CertificationScrapperService  # Import the Course class
+from storage.course_material_store import COURSE_MATERIAL_FORMATS
+from storage.certification_catalog import CertificationCatalog
+# each command imports the subsystems it needs when it runs, courses and --help start without openai, selenium or the Azure SDKs
 
 
 
 def list_available_certifications():
-# List the content of the CSV file containing the certifications
-    with open('../microsoft_certifications/microsoft_certifications_reference_list.csv', newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        header = next(reader)  # Skip the header
-        for row in reader:
-            print(', '.join(row[:2])) 
+# List the certifications of the catalog
+    for entry in CertificationCatalog().list():
+        print(f"{entry['certification_id']}, {entry['certification_title']}")
+
+def read_url_file(url_file_path):
+    # one URL per line, blank lines and lines starting with # are ignored
+    with open(url_file_path, 'r') as file:
+        return [line.strip() for line in file if line.strip() and not line.strip().startswith('#')]
+
+def add_scrap_arguments(parser):
+    parser.add_argument("--workers", type=int, default=1, help="Number of browser sessions scraping in parallel (default: 1, serial scraping)")
+    parser.add_argument("--parallel-level", choices=["learning_path", "module"], default="learning_path", help="Distribute whole learning paths or single modules over the browser sessions (default: learning_path)")
+    parser.add_argument("--fetch-engine", choices=["selenium", "http"], default="selenium", help="Read module and unit pages in the browser or over plain HTTP, falling back to the browser when needed (default: selenium)")
+    parser.add_argument("--no-page-cache", action="store_true", help="With --fetch-engine http, download every page instead of revalidating the pages cached by a previous run")
+    parser.add_argument("--browser-profile", choices=["lean", "full"], default="lean", help="lean: headless Chrome that does not download images, fonts, stylesheets or telemetry; full: headed Chrome loading every resource (default: lean)")
+    parser.add_argument("--extraction", choices=["browser", "parse"], default="browser", help="browser: a script in the page returns only the links or the text each page is read for; parse: the whole page source is parsed in Python (default: browser)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="Processes parsing the captured unit pages while the browser loads the next ones, 0 to parse them in the scrapping thread (default: 2)")
+    checkpoint_group = parser.add_mutually_exclusive_group()
+    checkpoint_group.add_argument("--resume", action="store_true", help="Skip the units already recorded in the checkpoint journal of a previous interrupted run")
+    checkpoint_group.add_argument("--reset-checkpoint", action="store_true", help="Empty the checkpoint journal before scraping, the units recorded by previous runs are lost")
+
+def get_scrap_options(args):
+    return {
+        "workers": args.workers,
+        "parallel_level": args.parallel_level,
+        "fetch_engine": args.fetch_engine,
+        "page_cache": not args.no_page_cache,
+        "resume": args.resume,
+        "reset_checkpoint": args.reset_checkpoint,
+        "browser_profile": args.browser_profile,
+        "extraction_mode": args.extraction,
+        "parse_workers": args.parse_workers,
+    }
+
+def run_course_command(course, command, run):
+    # the run report is written even when the command fails, a failed run is the one worth looking at
+    try:
+        run()
+    finally:
+        course.write_telemetry_report(command)
 
 def get_certification_metadata(certification_code):
-    # Read the CSV file containing the certifications
-    with open('../microsoft_certifications/microsoft_certifications_reference_list.csv', newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        header = next(reader)  # Skip the header
-        for row in reader:
-            if row[0] == certification_code:
-                return row[1], row[3]
-    return None
+    # the code as written in the catalog, az-104 and AZ-104 share the same course directory
+    entry = CertificationCatalog().get(certification_code)
+    if entry is None:
+        return None, None, None
+    return entry['certification_id'], entry['certification_title'], entry['course_path']
 
 
 if __name__ == "__main__":
@@ -34,19 +65,44 @@ if __name__ == "__main__":
 
     # Add a subparser for the --test-only command
     test_only_parser = subparsers.add_parser("test-only",  help="check if the URL is the root URL for certification course and if it can be scrapped")
-    test_only_parser.add_argument("--url", required=True, help="The URL required for the --test-only command")
+    test_only_urls = test_only_parser.add_mutually_exclusive_group(required=True)
+    test_only_urls.add_argument("--url", help="The URL of the certification to check")
+    test_only_urls.add_argument("--url-file", help="A file listing the URLs of the certifications to check, one per line")
+    test_only_parser.add_argument("--workers", type=int, default=2, help="Number of browser sessions checking URLs in parallel (default: 2)")
 
     # Add a subparser for the --test-only command
     list_courses_parser = subparsers.add_parser("courses", help="Show the list of courses supported")
 
     scrap_parser = subparsers.add_parser("scrap-only", help="Scrap the course content from the url found in microsoft_certifications_reference_list.csv")
     scrap_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
+    add_scrap_arguments(scrap_parser)
 
     clean_parser = subparsers.add_parser("clean-only", help="Clean the course content to remove all artifacts not related to the course content")
     clean_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
+    clean_parser.add_argument("--batch", action="store_true", help="Submit all the units as a single Azure OpenAI batch job instead of interactive requests")
 
     generate_questions_parser = subparsers.add_parser("generate-questions", help="Generate questions with multiple answers from the cleaned course content")
     generate_questions_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
+    generate_questions_parser.add_argument("--batch", action="store_true", help="Submit all the units as a single Azure OpenAI batch job instead of interactive requests")
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Scrap, clean and generate questions at the same time, streaming each unit through the three steps")
+    pipeline_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
+    add_scrap_arguments(pipeline_parser)
+
+    refresh_parser = subparsers.add_parser("refresh", help="Scrap, clean and generate questions for several certifications of the catalog, each one in a worker process")
+    refresh_codes = refresh_parser.add_mutually_exclusive_group(required=True)
+    refresh_codes.add_argument("--all", action="store_true", help="Refresh every certification of microsoft_certifications_reference_list.csv")
+    refresh_codes.add_argument("--codes", nargs="+", metavar="CERTIFICATION_CODE", help="The certification codes to refresh")
+    refresh_parser.add_argument("--stages", nargs="+", choices=["scrap", "clean", "generate-questions", "pipeline"], default=["scrap", "clean", "generate-questions"], help="Stages run for each certification, in order, or pipeline alone to stream the three (default: scrap clean generate-questions)")
+    refresh_parser.add_argument("--processes", type=int, default=2, help="Certifications refreshed at the same time, each one in its own process (default: 2)")
+    refresh_parser.add_argument("--max-browser-sessions", type=int, default=4, help="Browser sessions open at the same time, over all the certifications (default: 4)")
+    refresh_parser.add_argument("--max-llm-concurrency", type=int, default=8, help="Azure OpenAI requests in flight at the same time, over all the certifications (default: 8)")
+    refresh_parser.add_argument("--batch", action="store_true", help="Clean and generate questions with Azure OpenAI batch jobs instead of interactive requests")
+    add_scrap_arguments(refresh_parser)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert the official and cleaned course material to another storage format, yaml to export it")
+    convert_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
+    convert_parser.add_argument("--format", choices=list(COURSE_MATERIAL_FORMATS), required=True, help="The storage format to convert to")
 
     run_questions_parser = subparsers.add_parser("run-questions", help="Run a local webserver to test the generated questions")
     run_questions_parser.add_argument("certification_code", help="The certification code for the course. --courses to list available courses.")
@@ -62,65 +118,122 @@ if __name__ == "__main__":
         sys.exit(1)
 
     if args.command == "test-only":
-        print(f"Running in test-only mode with URL: {args.url}")
-        certificationScrapperService = CertificationScrapperService(args.url)
-        certificationScrapperService.check_scrappability()
+        urls = [args.url] if args.url else read_url_file(args.url_file)
+        if not urls:
+            print(f"No URL found in {args.url_file}")
+            sys.exit(1)
+        print(f"Running in test-only mode with {len(urls)} URLs" if len(urls) > 1 else f"Running in test-only mode with URL: {urls[0]}")
+        from scrapper.CertificationScrapperService import CertificationScrapperService
+        CertificationScrapperService.check_scrappability_of_urls(urls, workers=args.workers)
         sys.exit(0)
     
     if args.command == "courses":
-        print(f"Running in test-only mode with URL: {args.url}")
+        print("Running in courses mode")
         list_available_certifications()
         sys.exit(0)  
+
+    # every other command works on a course
+    from course import Course
     
     if args.command == "scrap-only":
         print(f"Running in scrap-only mode for certification: {args.certification_code}")
-        certification_title, certification_url = get_certification_metadata(args.certification_code)
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
         if certification_url is None:
             print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
             sys.exit(1)
-        course = Course(args.certification_code, certification_title)
+        course = Course(certification_code, certification_title)
 
-        course.scrap(certification_url)
+        run_course_command(course, args.command, lambda: course.scrap(certification_url, **get_scrap_options(args)))
         sys.exit(0)
 
     if args.command == "clean-only":
         print(f"Running in clean-only mode for certification: {args.certification_code}")
-        certification_title, certification_url = get_certification_metadata(args.certification_code)
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
         if certification_title is None:
             print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
             sys.exit(1)
-        course = Course(args.certification_code, certification_title)
-        course.clean()
+        course = Course(certification_code, certification_title)
+        run_course_command(course, args.command, lambda: course.clean(batch=args.batch))
         sys.exit(0)
 
     if args.command == "generate-questions":
         print(f"Running in generate-questions mode for certification: {args.certification_code}")
-        certification_title, certification_url = get_certification_metadata(args.certification_code)
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
+        if certification_title is None:
+            print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
+            sys.exit(1)
+        course = Course(certification_code, certification_title)
+        run_course_command(course, args.command, lambda: course.generate_questions(batch=args.batch))
+        sys.exit(0)
+
+    if args.command == "pipeline":
+        print(f"Running in pipeline mode for certification: {args.certification_code}")
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
+        if certification_url is None:
+            print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
+            sys.exit(1)
+        course = Course(certification_code, certification_title)
+        run_course_command(course, args.command, lambda: course.run_pipeline(certification_url, **get_scrap_options(args)))
+        sys.exit(0)
+
+    if args.command == "refresh":
+        catalog = CertificationCatalog()
+        certification_codes = [entry["certification_id"] for entry in catalog.list()] if args.all else args.codes
+        unknown_codes = [code for code in certification_codes if catalog.get(code) is None]
+        if unknown_codes:
+            print(f"Certification codes not found: {', '.join(unknown_codes)}. Run 'python trainforcert.py courses' to list available courses")
+            sys.exit(1)
+        if not certification_codes:
+            print("No certification in the catalog")
+            sys.exit(1)
+        if "pipeline" in args.stages and len(args.stages) > 1:
+            print("The pipeline stage runs scrap, clean and generate-questions itself, it cannot be combined with other stages")
+            sys.exit(1)
+        if args.processes < 1 or args.max_browser_sessions < 1 or args.max_llm_concurrency < 1:
+            print("--processes, --max-browser-sessions and --max-llm-concurrency must be at least 1")
+            sys.exit(1)
+        from scrapper.CertificationScrapperService import CertificationScrapperService
+        scrap_options = get_scrap_options(args)
+        browser_session_count = CertificationScrapperService.browser_session_count(scrap_options["workers"], scrap_options["fetch_engine"])
+        if any(stage in args.stages for stage in ["scrap", "pipeline"]) and browser_session_count > args.max_browser_sessions:
+            print(f"A scrap with these options uses up to {browser_session_count} browser sessions, more than --max-browser-sessions {args.max_browser_sessions}")
+            sys.exit(1)
+        from orchestration.catalog_refresh import CatalogRefresh
+        print(f"Running in refresh mode for {len(certification_codes)} certifications: {', '.join(args.stages)}")
+        catalog_refresh = CatalogRefresh(certification_codes, stages=args.stages, processes=args.processes, max_browser_sessions=args.max_browser_sessions,
+                                         max_llm_concurrency=args.max_llm_concurrency, scrap_options=scrap_options, batch=args.batch)
+        results = catalog_refresh.run()
+        catalog_refresh.print_summary(results)
+        sys.exit(0 if all(result["succeeded"] for result in results) else 1)
+
+    if args.command == "convert":
+        print(f"Running in convert mode for certification: {args.certification_code}")
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
         if certification_title is None:
             print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
             sys.exit(1)
-        course = Course(args.certification_code, certification_title)
-        course.generate_questions()
+        course = Course(certification_code, certification_title)
+        course.convert_course_material(args.format)
         sys.exit(0)
 
     if args.command == "run-questions":
         print(f"Running in run-questions mode for certification: {args.certification_code}")
-        certification_title, certification_url = get_certification_metadata(args.certification_code)
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
         if certification_title is None:
             print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
             sys.exit(1)
-        course = Course(args.certification_code, certification_title)
+        course = Course(certification_code, certification_title)
         course.run_webserver_locally()
         sys.exit(0)
 
     if args.command == "deploy-questions":
         print(f"Running in deploy-questions mode for certification: {args.certification_code}")
-        certification_title, certification_url = get_certification_metadata(args.certification_code)
+        certification_code, certification_title, certification_url = get_certification_metadata(args.certification_code)
         if certification_title is None:
             print(f"Certification code {sys.argv[1]} not found. Run 'python trainforcert.py courses' to list available courses or 'python trainforcert.py test-only' to evaluate a new certification")
             sys.exit(1)
-        course = Course(args.certification_code, certification_title)
-        course.deploy_questions_on_azure()
+        course = Course(certification_code, certification_title)
+        run_course_command(course, args.command, course.deploy_questions_on_azure)
         sys.exit(0)
 
     
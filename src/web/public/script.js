@@ -1,27 +1,52 @@
 let currentQuestionIndex = 0;
 let questions = []; // learningPath questions currently loaded
 let learningPaths = []
-let learningPathQuestions = []
+let learningPathFiles = []
+let learningPathQuestions = [] // questions of each learning path, or the promise of their download
+let selectedLearningPathIndex = 0
 let title = ""
 
-document.addEventListener('DOMContentLoaded', () => {
-    fetch('questions.json')
-        .then(response => response.json())
+document.addEventListener('DOMContentLoaded', loadQuestions);
+
+function fetchJson(url) {
+    return fetch(url).then(response => {
+        // a 404 or a 5xx page is not the JSON it replaces
+        if (!response.ok) {
+            throw new Error(`${url}: HTTP ${response.status}`);
+        }
+        return response.json();
+    });
+}
+
+function loadQuestions() {
+    hideLoadError();
+    fetchJson('questions.json')
         .then(data => {
             console.log(data['certification_title'])
             title = data.certification_title;
-            // take learning_pathh_title from data.questions
-            data.questions.forEach(question => {
-                learningPaths.push(question.learning_path_title);
-                learningPathQuestions.push(question.questions);
-            });
+            if (data.learning_paths) {
+                // manifest: the questions of each learning path are downloaded when the path is selected
+                data.learning_paths.forEach(learningPath => {
+                    learningPaths.push(learningPath.learning_path_title);
+                    learningPathFiles.push(learningPath.file);
+                });
+            } else {
+                // single file with every question
+                data.questions.forEach(question => {
+                    learningPaths.push(question.learning_path_title);
+                    learningPathQuestions.push(question.questions);
+                });
+            }
             buildLearningPathsMenu();
             
             //questions = data;
             showTitle();
             loadLearningPathQuestions(0);
+        }, error => {
+            console.error(error);
+            showLoadError('Unable to load the questions.', loadQuestions);
         });
-});
+}
 
 function buildLearningPathsMenu() {
     for (let i = 0; i < learningPaths.length; i++) {
@@ -62,6 +87,14 @@ function showErrorMessage() {
 function hideErrorMessage() {
     document.getElementById('error-message').style.display = 'none';
 }
+function showLoadError(message, retry) {
+    document.getElementById('load-error-message').textContent = message;
+    document.getElementById('retry-button').onclick = () => retry();
+    document.getElementById('load-error').style.display = 'block';
+}
+function hideLoadError() {
+    document.getElementById('load-error').style.display = 'none';
+}
 function showCorrectAnswer() {
     document.getElementById('correct-answer').style.display = 'block';
 }
@@ -76,10 +109,42 @@ function hideExplanation() {
     document.getElementById('explanation').style.display = 'none';
 }
 
+function fetchLearningPathQuestions(learningPathIndex) {
+    if (!learningPathQuestions[learningPathIndex]) {
+        learningPathQuestions[learningPathIndex] = fetchJson(learningPathFiles[learningPathIndex])
+            .then(data => data.questions)
+            .catch(error => {
+                // download again on the next selection
+                learningPathQuestions[learningPathIndex] = undefined;
+                throw error;
+            });
+    }
+    return Promise.resolve(learningPathQuestions[learningPathIndex]);
+}
+
 function loadLearningPathQuestions(learningPathIndex) {
-    questions = learningPathQuestions[learningPathIndex];
-    currentQuestionIndex = 0;
-    refreshQuestion();
+    selectedLearningPathIndex = learningPathIndex;
+    hideLoadError();
+    fetchLearningPathQuestions(learningPathIndex).then(learningPathQuestionList => {
+        // another learning path may have been selected during the download
+        if (learningPathIndex !== selectedLearningPathIndex) {
+            return;
+        }
+        questions = learningPathQuestionList;
+        currentQuestionIndex = 0;
+        refreshQuestion();
+        // prefetch the next learning path while this one is played
+        if (learningPathIndex + 1 < learningPaths.length) {
+            fetchLearningPathQuestions(learningPathIndex + 1).catch(() => {});
+        }
+    }, error => {
+        console.error(error);
+        if (learningPathIndex !== selectedLearningPathIndex) {
+            return;
+        }
+        // the failed download was forgotten, retrying downloads the file again
+        showLoadError(`Unable to load the questions of ${learningPaths[learningPathIndex]}.`, () => loadLearningPathQuestions(learningPathIndex));
+    });
 }
 
 function refreshQuestion() {
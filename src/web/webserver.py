@@ -1,10 +1,138 @@
+import os
+import gzip
 import http.server
+from email.utils import parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    # gzip variants only
+    brotli = None
 
 
 PORT = 8000
 DIRECTORY = "./web/public"
+# assets worth compressing, images and fonts are already compressed
+COMPRESSIBLE_SUFFIXES = (".html", ".css", ".js", ".json", ".svg", ".txt")
+# the files are not fingerprinted, browsers keep them but revalidate them on every use
+CACHE_CONTROL = "no-cache"
+
+
+def _precompressed_variants():
+    variants = [(".gz", "gzip", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, (".br", "br", lambda data: brotli.compress(data, quality=11)))
+    return variants
+
+
+def precompress_assets(directory=DIRECTORY):
+    """
+    Writes a gzip, and brotli when available, variant next to each compressible asset whose variant is missing or older than the asset.
+    Variants that are not smaller than the asset are not kept. Returns the number of variants written.
+    """
+    written_count = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if not file.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            file_path = os.path.join(root, file)
+            file_mtime = os.path.getmtime(file_path)
+            data = None
+            for suffix, content_encoding, compress in _precompressed_variants():
+                variant_path = file_path + suffix
+                if os.path.exists(variant_path) and os.path.getmtime(variant_path) >= file_mtime:
+                    continue
+                if data is None:
+                    with open(file_path, "rb") as source:
+                        data = source.read()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    if os.path.exists(variant_path):
+                        os.remove(variant_path)
+                    continue
+                tmp_path = f"{variant_path}.tmp"
+                with open(tmp_path, "wb") as variant:
+                    variant.write(compressed)
+                os.replace(tmp_path, variant_path)
+                written_count += 1
+    return written_count
+
 
 class MyHttpRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # keep-alive connections, every response below has a Content-Length
+    protocol_version = "HTTP/1.1"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=DIRECTORY, **kwargs)
 
+    def _accepted_encodings(self):
+        accepted_encodings = set()
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, parameters = part.partition(";")
+            parameters = parameters.replace(" ", "")
+            try:
+                if parameters.startswith("q=") and float(parameters[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+            accepted_encodings.add(coding.strip().lower())
+        return accepted_encodings
+
+    def _select_variant(self, path):
+        """Returns the path of the file to send for path and its content encoding, None for the identity."""
+        accepted_encodings = self._accepted_encodings()
+        path_mtime = os.path.getmtime(path)
+        for suffix, content_encoding, compress in _precompressed_variants():
+            variant_path = path + suffix
+            # a variant older than its asset is stale until the next precompression
+            if content_encoding in accepted_encodings and os.path.isfile(variant_path) and os.path.getmtime(variant_path) >= path_mtime:
+                return variant_path, content_encoding
+        return path, None
+
+    def _is_not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            etags = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+            return "*" in etags or etag in etags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index_path = os.path.join(path, "index.html")
+            # the redirect to the trailing slash and the directory listing are left to SimpleHTTPRequestHandler
+            if not self.path.split("?", 1)[0].split("#", 1)[0].endswith("/") or not os.path.isfile(index_path):
+                return super().send_head()
+            path = index_path
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        variant_path, content_encoding = self._select_variant(path)
+        stat = os.stat(variant_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + content_encoding if content_encoding else ""}"'
+        if self._is_not_modified(etag, stat.st_mtime):
+            self.send_response(http.HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return None
+
+        file = open(variant_path, "rb")
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        if content_encoding is not None:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        self.end_headers()
+        return file